@@ -0,0 +1,92 @@
+from __future__ import annotations
+from time import sleep, monotonic
+from typing import TYPE_CHECKING, Any, Optional, Protocol
+
+if TYPE_CHECKING:
+    import numpy as np
+
+class Camera(Protocol):
+    """
+    What the frame hub needs from a camera: start/stop around a run of captures, and capture()
+    returning one frame (an RGB array, or JPEG bytes for MJPEG cameras) or None if none was ready.
+    """
+    def start(self) -> None: ...
+    def stop(self) -> None: ...
+    def capture(self) -> Any: ...
+
+class PicameraCamera:
+    def __init__(self, awb_mode: str = 'fluorescent') -> None:
+        """
+        Pi camera module returning raw RGB arrays for the software (OpenCV) encode path.
+        picamera2 is imported on start, so the app can be imported and run on machines without it.
+        """
+        self.awb_mode: str = awb_mode
+        self.picam2: Any = None
+
+    def start(self) -> None:
+        if self.picam2 is None:
+            from picamera2 import Picamera2
+            self.picam2 = Picamera2()
+            self.picam2.awb_mode = self.awb_mode
+            self.picam2.start()
+
+    def stop(self) -> None:
+        if self.picam2 is not None:
+            self.picam2.stop()
+            self.picam2.close()
+            self.picam2 = None
+
+    def capture(self) -> np.ndarray:
+        return self.picam2.capture_array()
+
+class SimulatedCamera:
+    def __init__(self, size: tuple[int, int] = (640, 480), fps: float = 15.0, jpeg: bool = False) -> None:
+        """
+        Synthetic camera for development, CI and load tests: a gradient with a block sweeping across it,
+        so motion detection and the encoders have real work to do.
+
+        Parameters:
+            size : tuple[int, int]
+                (width, height) of the frames.
+            fps : float
+                Frames per second capture() is paced to, like a real sensor.
+            jpeg : bool
+                Return JPEG bytes instead of arrays, standing in for MjpegCamera in hardware mode.
+        """
+        self.size: tuple[int, int] = size
+        self.interval: float = 1 / fps
+        self.jpeg: bool = jpeg
+        self.base: Optional[np.ndarray] = None
+        self.frame_count: int = 0
+        self.next_frame: float = 0.0
+
+    def start(self) -> None:
+        import numpy as np
+        width, height = self.size
+        self.base = np.tile(np.linspace(0, 255, width, dtype=np.uint8)[None, :, None], (height, 1, 3))
+        self.next_frame = monotonic()
+
+    def stop(self) -> None:
+        self.base = None
+
+    def capture(self) -> np.ndarray | bytes | None:
+        if self.base is None:
+            return None
+        delay: float = self.next_frame - monotonic()
+        if delay > 0:
+            sleep(delay)
+        self.next_frame = max(self.next_frame + self.interval, monotonic())
+
+        width, height = self.size
+        self.frame_count += 1
+        # Large and fast enough to change more of the frame than MotionDetector's area_threshold on every frame.
+        block: int = height // 3
+        x: int = (self.frame_count * 16) % max(1, width - block)
+        frame: np.ndarray = self.base.copy()
+        frame[(height - block) // 2:(height + block) // 2, x:x + block] = 255
+        if not self.jpeg:
+            return frame
+
+        import cv2
+        ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        return jpeg.tobytes() if ret else None
@@ -0,0 +1,223 @@
+import os, mmap, struct, bisect
+from time import time, monotonic
+from threading import Thread, Lock, current_thread
+from typing import Any, Callable, Iterator, Optional
+
+# Record header inside a segment: capture time (epoch seconds) and JPEG length.
+# A zero length header marks the end of the records written since the segment was last reused.
+HEADER: struct.Struct = struct.Struct("<dI")
+
+class ClipRing:
+    def __init__(self, path: str, segment_size: int = 32 * 1024 * 1024, segments: int = 8) -> None:
+        """
+        Bounded on-disk ring of JPEG frames for one camera.
+
+        Frames are appended to fixed-size, memory-mapped segment files (path/segment_NNN.bin). When the
+        current segment is full the oldest one is reused, so disk usage never exceeds segments * segment_size.
+        An in-memory index of (timestamp, offset, length) in time order gives O(log n) seeks by time,
+        it is rebuilt from the segment headers on startup.
+
+        Parameters:
+            path : str
+                Directory holding this camera's segment files.
+            segment_size : int
+                Bytes per segment file.
+            segments : int
+                Number of segment files in the ring.
+        """
+        self.path: str = path
+        self.segment_size: int = segment_size
+        self.lock: Lock = Lock()
+        self.maps: list[mmap.mmap] = []
+
+        os.makedirs(path, exist_ok=True)
+        for i in range(max(2, segments)):
+            fd: int = os.open(os.path.join(path, f"segment_{i:03d}.bin"), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size != segment_size:
+                    # New or resized: start empty. The file is sparse until written.
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, segment_size)
+                self.maps.append(mmap.mmap(fd, segment_size))
+            finally:
+                os.close(fd)
+
+        # Index columns, entries before self.head have been evicted. self.base counts entries
+        # removed by compaction so readers can hold a stable position (base + list index).
+        self.times: list[float] = []
+        self.offsets: list[int] = []
+        self.lengths: list[int] = []
+        self.head: int = 0
+        self.base: int = 0
+        self.segment: int = 0
+        self.position: int = 0
+        self._rebuild()
+
+        self.written: int = 0
+        self.dropped: int = 0
+
+    def _rebuild(self) -> None:
+        """
+        Scans every segment's headers and restores the index and write position.
+        """
+        entries: list[tuple[float, int, int]] = []
+        for segment, m in enumerate(self.maps):
+            offset: int = 0
+            while offset + HEADER.size <= self.segment_size:
+                timestamp, length = HEADER.unpack_from(m, offset)
+                if length == 0 or offset + HEADER.size + length > self.segment_size:
+                    break
+                entries.append((timestamp, segment * self.segment_size + offset + HEADER.size, length))
+                offset += HEADER.size + length
+
+        entries.sort()
+        for timestamp, offset, length in entries:
+            self.times.append(timestamp)
+            self.offsets.append(offset)
+            self.lengths.append(length)
+        if entries:
+            last_offset: int = entries[-1][1]
+            self.segment = last_offset // self.segment_size
+            self.position = last_offset % self.segment_size + entries[-1][2]
+
+    def _advance(self) -> None:
+        """
+        Moves writing to the next segment and evicts its (oldest) frames from the index.
+        Called with self.lock held.
+        """
+        self.segment = (self.segment + 1) % len(self.maps)
+        self.position = 0
+        while self.head < len(self.offsets) and self.offsets[self.head] // self.segment_size == self.segment:
+            self.head += 1
+        HEADER.pack_into(self.maps[self.segment], 0, 0.0, 0)
+
+        if self.head > 4096 and self.head * 2 > len(self.offsets):
+            del self.times[:self.head], self.offsets[:self.head], self.lengths[:self.head]
+            self.base += self.head
+            self.head = 0
+
+    def append(self, jpeg: bytes, timestamp: Optional[float] = None) -> bool:
+        """
+        Writes one frame. Frames larger than a segment are dropped.
+        """
+        record: int = HEADER.size + len(jpeg)
+        if record + HEADER.size > self.segment_size:
+            self.dropped += 1
+            return False
+
+        with self.lock:
+            # Keep the index sorted even if the wall clock steps backwards.
+            timestamp = max(timestamp or time(), self.times[-1] if len(self.times) > self.head else 0.0)
+            if self.position + record + HEADER.size > self.segment_size:
+                self._advance()
+
+            m: mmap.mmap = self.maps[self.segment]
+            offset: int = self.position
+            m[offset + HEADER.size:offset + record] = jpeg
+            HEADER.pack_into(m, offset + record, 0.0, 0)
+            HEADER.pack_into(m, offset, timestamp, len(jpeg))
+
+            self.times.append(timestamp)
+            self.offsets.append(self.segment * self.segment_size + offset + HEADER.size)
+            self.lengths.append(len(jpeg))
+            self.position += record
+            self.written += 1
+        return True
+
+    def frames(self, start: float, end: float) -> Iterator[tuple[float, bytes]]:
+        """
+        Yields (timestamp, JPEG) for every frame recorded between start and end, oldest first.
+        Only one frame is copied out of the map at a time. Frames overwritten while the range is being
+        read are skipped.
+        """
+        with self.lock:
+            position: int = self.base + bisect.bisect_left(self.times, start, lo=self.head)
+
+        while True:
+            with self.lock:
+                idx: int = max(position - self.base, self.head)
+                if idx >= len(self.times) or self.times[idx] > end:
+                    return
+                timestamp: float = self.times[idx]
+                offset: int = self.offsets[idx]
+                length: int = self.lengths[idx]
+                segment, local = divmod(offset, self.segment_size)
+                jpeg: bytes = self.maps[segment][local:local + length]
+                position = self.base + idx + 1
+            yield timestamp, jpeg
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            count: int = len(self.times) - self.head
+            return {
+                "frames": count,
+                "start": self.times[self.head] if count else None,
+                "end": self.times[-1] if count else None,
+                "bytes": sum(self.lengths[self.head:]),
+                "capacity_bytes": self.segment_size * len(self.maps),
+                "written": self.written,
+                "dropped": self.dropped
+            }
+
+class ClipRecorder:
+    def __init__(self, ring: ClipRing, source: Callable[[], Iterator[Optional[bytes]]], name: str = "ClipRecorder", max_fps: float = 10.0) -> None:
+        """
+        Records frames from source into ring while triggered.
+
+        Parameters:
+            ring : ClipRing
+                Destination ring.
+            source : Callable[[], Iterator[Optional[bytes]]]
+                Opens a stream of JPEG frames, yielding None as a heartbeat when no frame arrived.
+                Closed as soon as recording stops, releasing the camera or upstream connection.
+            max_fps : float
+                Frames per second written at most, faster sources are thinned.
+        """
+        self.ring: ClipRing = ring
+        self.source: Callable[[], Iterator[Optional[bytes]]] = source
+        self.name: str = name
+        self.min_interval: float = 1 / max_fps if max_fps > 0 else 0.0
+        self.lock: Lock = Lock()
+        self.until: float = 0.0
+        self.thread: Optional[Thread] = None
+        self.triggers: int = 0
+
+    def trigger(self, seconds: float) -> None:
+        """
+        Records for (at least) the next seconds, extending a recording already in progress.
+        """
+        with self.lock:
+            self.triggers += 1
+            self.until = max(self.until, monotonic() + seconds)
+            if self.thread is None:
+                self.thread = Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+
+    def _should_exit(self) -> bool:
+        with self.lock:
+            if monotonic() >= self.until:
+                self.thread = None
+                return True
+            return False
+
+    def _run(self) -> None:
+        frames: Iterator[Optional[bytes]] = self.source()
+        last: float = 0.0
+        try:
+            for jpeg in frames:
+                if self._should_exit():
+                    return
+                if jpeg is None or monotonic() - last < self.min_interval:
+                    continue
+                last = monotonic()
+                self.ring.append(jpeg=jpeg)
+        finally:
+            frames.close()
+            with self.lock:
+                if self.thread is current_thread():
+                    self.thread = None
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            recording: bool = self.thread is not None
+        return {"recording": recording, "triggers": self.triggers, **self.ring.stats()}
@@ -0,0 +1,105 @@
+import sqlite3
+from queue import LifoQueue, Empty
+from threading import Lock
+from contextlib import contextmanager
+from typing import Generator
+
+# Applied once when a connection is opened, not per query.
+PRAGMAS: tuple[str, ...] = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+class ConnectionPool:
+    def __init__(self, db: str, size: int = 4, cached_statements: int = 256) -> None:
+        """
+        Bounded pool of pre-configured SQLite connections.
+
+        Connections are opened lazily up to size, configured once with PRAGMAS (WAL so the log writer
+        and page readers no longer block each other) and handed out LIFO so the warmest connection,
+        with its prepared statement cache, is reused first.
+
+        Parameters:
+            db : str
+                Path to the SQLite database.
+            size : int
+                Maximum number of open connections. Callers block when all are in use.
+            cached_statements : int
+                Prepared statements cached per connection by the sqlite3 module.
+        """
+        self.db: str = db
+        self.size: int = max(1, size)
+        self.cached_statements: int = cached_statements
+        self.idle: LifoQueue = LifoQueue(maxsize=self.size)
+        self.opened: int = 0
+        self.lock: Lock = Lock()
+
+    @staticmethod
+    def connect(db: str, cached_statements: int = 256) -> sqlite3.Connection:
+        """
+        Opens a single autocommit connection with PRAGMAS applied.
+        check_same_thread=False since pooled connections move between Flask worker threads,
+        the pool guarantees only one thread uses a connection at a time.
+        """
+        conn: sqlite3.Connection = sqlite3.connect(
+            database=db,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=cached_statements
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self.idle.get_nowait()
+        except Empty:
+            pass
+
+        with self.lock:
+            if self.opened < self.size:
+                self.opened += 1
+                create: bool = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self.connect(db=self.db, cached_statements=self.cached_statements)
+            except Exception:
+                with self.lock:
+                    self.opened -= 1
+                raise
+        return self.idle.get()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        # Never hand out a connection with a transaction left open by a failed caller.
+        if conn.in_transaction:
+            conn.rollback()
+        self.idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Generator[sqlite3.Connection, None, None]:
+        conn: sqlite3.Connection = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn=conn)
+
+    def close(self) -> None:
+        """
+        Closes every idle connection.
+        """
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except Empty:
+                break
+            with self.lock:
+                self.opened -= 1
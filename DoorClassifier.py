@@ -0,0 +1,286 @@
+"""
+Door state (open / closed / moving) from Pi camera stills.
+
+Replay a folder of recorded JPEG frames (processed in filename order):
+    python DoorClassifier.py frames/ --roi 0.2,0.1,0.8,0.9 --references door.json
+
+Calibrate references from a folder containing open/ and closed/ subfolders of example frames:
+    python DoorClassifier.py frames/ --roi 0.2,0.1,0.8,0.9 --calibrate > door.json
+"""
+from __future__ import annotations
+import os, sys, json, argparse
+from time import time, sleep
+from threading import Thread, Lock
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+# cv2 and numpy are imported on the first classification, not when the app starts.
+if TYPE_CHECKING:
+    import numpy as np
+
+# Feature vectors (mean brightness, edge density), both 0-1, of a light coloured door seen from inside
+# the garage. Replace with the output of --calibrate for a real installation.
+REFERENCES: dict[str, tuple[float, float]] = {
+    "closed": (0.55, 0.04),
+    "open": (0.35, 0.12),
+}
+
+class DoorClassifier:
+    def __init__(
+        self,
+        roi: tuple[float, float, float, float] = (0.0, 0.0, 1.0, 1.0),
+        references: Optional[dict[str, tuple[float, float]]] = None,
+        edge_threshold: int = 24,
+        moving_threshold: float = 12.0
+    ) -> None:
+        """
+        Classifies the door region of a frame by its brightness and edge density (vectorized NumPy,
+        no model). The nearest reference wins, unless the region changed by more than moving_threshold
+        since the previous frame, which is reported as moving.
+
+        Parameters:
+            roi : tuple[float, float, float, float]
+                Door region as fractions of the frame (x0, y0, x1, y1).
+            references : Optional[dict[str, tuple[float, float]]]
+                State -> (brightness, edge density), see calibrate().
+            edge_threshold : int
+                Minimum grayscale gradient (0-255) for a pixel to count as an edge.
+            moving_threshold : float
+                Mean absolute grayscale difference against the previous frame that counts as moving.
+        """
+        self.roi: tuple[float, float, float, float] = roi
+        self.references: dict[str, tuple[float, float]] = references or REFERENCES
+        self.edge_threshold: int = edge_threshold
+        self.moving_threshold: float = moving_threshold
+        self.previous: Optional[np.ndarray] = None
+
+    @staticmethod
+    def decode(jpeg: bytes) -> Optional[np.ndarray]:
+        """
+        Decodes a JPEG straight to grayscale at a quarter of its resolution, which skips most of the decode work.
+        """
+        import cv2, numpy as np
+        return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+
+    def region(self, gray: np.ndarray) -> np.ndarray:
+        height, width = gray.shape[:2]
+        x0, y0, x1, y1 = self.roi
+        return gray[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)].astype("int16")
+
+    def features(self, region: np.ndarray) -> tuple[float, float]:
+        """
+        Returns (mean brightness, fraction of edge pixels) of a door region.
+        """
+        dx: np.ndarray = abs(region[:-1, 1:] - region[:-1, :-1])
+        dy: np.ndarray = abs(region[1:, :-1] - region[:-1, :-1])
+        edges: float = float(((dx + dy) > self.edge_threshold).mean()) if dx.size else 0.0
+        return float(region.mean()) / 255, edges
+
+    def classify(self, gray: np.ndarray) -> dict[str, Any]:
+        """
+        Classifies one grayscale frame.
+
+        Returns:
+            dict with state (open, closed or moving), brightness, edges and change.
+        """
+        region: np.ndarray = self.region(gray=gray)
+        brightness, edges = self.features(region=region)
+
+        change: float = 0.0
+        if self.previous is not None and self.previous.shape == region.shape:
+            change = float(abs(region - self.previous).mean())
+        self.previous = region
+
+        if change > self.moving_threshold:
+            state: str = "moving"
+        else:
+            state = min(
+                self.references,
+                key=lambda name: (self.references[name][0] - brightness) ** 2 + (self.references[name][1] - edges) ** 2
+            )
+        return {"state": state, "brightness": round(brightness, 3), "edges": round(edges, 3), "change": round(change, 2)}
+
+    def classify_jpeg(self, jpeg: bytes) -> Optional[dict[str, Any]]:
+        gray: Optional[np.ndarray] = self.decode(jpeg=jpeg)
+        return self.classify(gray=gray) if gray is not None else None
+
+    def classify_burst(self, jpegs: list[bytes]) -> Optional[dict[str, Any]]:
+        """
+        Classifies a burst of stills taken moments apart. Only frames of the burst are compared with
+        each other, so the door is moving if it changed between any two of them, and otherwise in the
+        state of the last frame.
+
+        Returns:
+            Optional[dict[str, Any]] : As classify(), with the largest change of the burst, None if no frame decoded.
+        """
+        self.previous = None
+        results: list[dict[str, Any]] = [r for r in (self.classify_jpeg(jpeg=jpeg) for jpeg in jpegs) if r is not None]
+        if not results:
+            return None
+        moving: list[dict[str, Any]] = [r for r in results if r["state"] == "moving"]
+        return {**(moving[-1] if moving else results[-1]), "change": max(r["change"] for r in results)}
+
+    def calibrate(self, folder: str) -> dict[str, tuple[float, float]]:
+        """
+        Averages the features of the example frames in folder/open/ and folder/closed/.
+        """
+        import cv2
+        references: dict[str, tuple[float, float]] = {}
+        for state in ("closed", "open"):
+            samples: list[tuple[float, float]] = []
+            for path in frame_paths(os.path.join(folder, state)):
+                gray: Optional[np.ndarray] = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+                if gray is not None:
+                    samples.append(self.features(region=self.region(gray=gray)))
+            if samples:
+                references[state] = tuple(round(sum(v) / len(samples), 4) for v in zip(*samples))
+        return references
+
+def frame_paths(folder: str) -> list[str]:
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
+
+class DoorMonitor:
+    def __init__(
+        self,
+        fetch: Callable[[], Optional[bytes]],
+        classifier: DoorClassifier,
+        on_transition: Optional[Callable[[str, str], None]] = None,
+        interval: float = 10.0,
+        burst: int = 3,
+        burst_gap: float = 1.0
+    ) -> None:
+        """
+        Background thread classifying a burst of stills every interval seconds. The latest result is
+        cached for /doorState, so requests never touch the camera.
+
+        Movement is only seen while a burst overlaps the door's travel: an interval shorter than the
+        travel time catches every movement but keeps the camera running, a longer one lets the camera
+        stop between checks and catches some. Once a burst sees the door moving, bursts repeat every
+        burst_gap seconds until it stops, so the open or closed state it ends in is recorded promptly.
+
+        Parameters:
+            fetch : Callable[[], Optional[bytes]]
+                Returns a new JPEG of the garage on every call (the Pi camera's FrameHub.snapshot).
+            classifier : DoorClassifier
+                Classifier configured for the door region.
+            on_transition : Optional[Callable[[str, str], None]]
+                Called with the new and previous state whenever it changes. The first classification
+                after startup is reported with a previous state of 'unknown'.
+            interval : float
+                Seconds between classifications.
+            burst : int
+                Stills per classification.
+            burst_gap : float
+                Seconds between the stills of a burst.
+        """
+        self.fetch: Callable[[], Optional[bytes]] = fetch
+        self.classifier: DoorClassifier = classifier
+        self.on_transition: Optional[Callable[[str, str], None]] = on_transition
+        self.interval: float = interval
+        self.burst: int = max(1, burst)
+        self.burst_gap: float = burst_gap
+        self.lock: Lock = Lock()
+        self.thread: Optional[Thread] = None
+        self.current: dict[str, Any] = {"state": "unknown", "since": None, "checked_at": None}
+
+        self.checks: int = 0
+        self.transitions: int = 0
+        self.failures: int = 0
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self._run, name="DoorMonitor", daemon=True)
+                self.thread.start()
+
+    def _run(self) -> None:
+        while True:
+            result: dict[str, Any] = self.check()
+            sleep(self.burst_gap if result["state"] == "moving" else self.interval)
+
+    def capture(self) -> list[bytes]:
+        jpegs: list[bytes] = []
+        for i in range(self.burst):
+            if i:
+                sleep(self.burst_gap)
+            jpeg: Optional[bytes] = self.fetch()
+            if jpeg:
+                jpegs.append(jpeg)
+        return jpegs
+
+    def check(self) -> dict[str, Any]:
+        """
+        Classifies one burst of stills and records a transition if the state changed.
+        """
+        try:
+            result: Optional[dict[str, Any]] = self.classifier.classify_burst(jpegs=self.capture())
+        except Exception:
+            result = None
+
+        now: float = time()
+        with self.lock:
+            self.checks += 1
+            if result is None:
+                self.failures += 1
+                self.current["checked_at"] = now
+                return dict(self.current)
+            previous: str = self.current["state"]
+            changed: bool = result["state"] != previous
+            if changed:
+                self.transitions += 1
+            self.current = {**result, "since": now if changed else self.current["since"], "checked_at": now}
+            current: dict[str, Any] = dict(self.current)
+
+        if changed and self.on_transition is not None:
+            self.on_transition(result["state"], previous)
+        return current
+
+    def state(self) -> dict[str, Any]:
+        with self.lock:
+            return dict(self.current)
+
+    def stats(self) -> dict[str, int | str]:
+        with self.lock:
+            return {
+                "state": self.current["state"],
+                "checks": self.checks,
+                "transitions": self.transitions,
+                "failures": self.failures
+            }
+
+def parse_roi(value: str) -> tuple[float, float, float, float]:
+    x0, y0, x1, y1 = (float(v) for v in value.split(","))
+    return x0, y0, x1, y1
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Replay or calibrate the door classifier on recorded frames.")
+    parser.add_argument("folder")
+    parser.add_argument("--roi", type=parse_roi, default=(0.0, 0.0, 1.0, 1.0))
+    parser.add_argument("--references", help="JSON file written by --calibrate")
+    parser.add_argument("--calibrate", action="store_true", help="Compute references from folder/open and folder/closed")
+    args: argparse.Namespace = parser.parse_args()
+
+    references: Optional[dict[str, tuple[float, float]]] = None
+    if args.references:
+        with open(args.references) as f:
+            references = {state: tuple(v) for state, v in json.load(f).items()}
+    classifier: DoorClassifier = DoorClassifier(roi=args.roi, references=references)
+
+    if args.calibrate:
+        print(json.dumps(classifier.calibrate(folder=args.folder), indent=2))
+        return
+
+    import cv2
+    state: Optional[str] = None
+    for path in frame_paths(args.folder):
+        gray: Optional[np.ndarray] = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if gray is None:
+            print(json.dumps({"frame": os.path.basename(path), "error": "unreadable"}), file=sys.stderr)
+            continue
+        result: dict[str, Any] = classifier.classify(gray=gray)
+        print(json.dumps({"frame": os.path.basename(path), "transition": result["state"] != state, **result}))
+        state = result["state"]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+from time import perf_counter, monotonic
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Ordered from cheapest to most expensive. width=None keeps the sensor resolution.
+PROFILES: dict[str, dict[str, Optional[int]]] = {
+    "low": {"width": 320, "quality": 40},
+    "medium": {"width": 640, "quality": 65},
+    "high": {"width": None, "quality": 90},
+}
+
+class EncodeLadder:
+    def __init__(
+        self,
+        profiles: dict[str, dict[str, Optional[int]]] = PROFILES,
+        step_down_drops: int = 3,
+        step_up_frames: int = 90
+    ) -> None:
+        """
+        JPEG quality/resolution ladder for the Pi camera live view.
+
+        Parameters:
+            profiles : dict
+                Profile name -> {"width", "quality"}, ordered from lowest to highest.
+            step_down_drops : int
+                Frames a client may skip in a row (its socket is backing up) before an
+                automatic client is moved one rung down.
+            step_up_frames : int
+                Consecutive frames delivered without a skip before an automatic client
+                is moved one rung up.
+        """
+        self.profiles: dict[str, dict[str, Optional[int]]] = profiles
+        self.order: list[str] = list(profiles)
+        self.step_down_drops: int = step_down_drops
+        self.step_up_frames: int = step_up_frames
+        self.lock: Lock = Lock()
+        self.metrics: dict[str, dict[str, float]] = {
+            name: {"frames": 0, "encode_ms": 0.0, "bytes": 0, "window_start": monotonic(), "window_bytes": 0, "kbps": 0.0}
+            for name in self.order
+        }
+
+    def resolve(self, profile: Optional[str]) -> str:
+        """
+        Maps a ?profile= query value to a ladder rung. Unknown or missing values use the top rung,
+        'auto' starts in the middle of the ladder.
+        """
+        if profile in self.profiles:
+            return profile
+        if profile == "auto":
+            return self.order[len(self.order) // 2]
+        return self.order[-1]
+
+    def encode(self, frame: np.ndarray, profile: str) -> Optional[bytes]:
+        """
+        Downscales (if required) and JPEG encodes a frame for the given profile,
+        recording encode time and output bitrate.
+        """
+        start: float = perf_counter()
+        data: Optional[bytes] = self.compress(frame=frame, profile=profile)
+        if data is None:
+            return None
+
+        elapsed_ms: float = (perf_counter() - start) * 1000
+        with self.lock:
+            m: dict[str, float] = self.metrics[profile]
+            m["frames"] += 1
+            m["bytes"] += len(data)
+            # Exponential moving average keeps the figure stable without storing history.
+            m["encode_ms"] = elapsed_ms if m["frames"] == 1 else 0.9 * m["encode_ms"] + 0.1 * elapsed_ms
+            m["window_bytes"] += len(data)
+            window: float = monotonic() - m["window_start"]
+            if window >= 1.0:
+                m["kbps"] = m["window_bytes"] * 8 / 1000 / window
+                m["window_start"] = monotonic()
+                m["window_bytes"] = 0
+        return data
+
+    def compress(self, frame: np.ndarray, profile: str) -> Optional[bytes]:
+        """
+        Encodes a frame with a profile's settings without counting it in the profile's metrics,
+        for consumers other than the live view (e.g. motion event clips).
+        cv2 is imported on the first frame rather than at startup.
+        """
+        import cv2
+        settings: dict[str, Optional[int]] = self.profiles[profile]
+
+        width: Optional[int] = settings["width"]
+        if width and frame.shape[1] > width:
+            height: int = int(frame.shape[0] * width / frame.shape[1])
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+        ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, settings["quality"]])
+        if not ret:
+            return None
+        return jpeg.tobytes()
+
+    def adaptive(self, profile: str) -> Callable[[str, int], str]:
+        """
+        Returns a per-client callback for automatic mode.
+        The callback receives the client's current profile and how many frames it skipped since
+        its last frame, and returns the profile to use for the next frame.
+        """
+        state: dict[str, int] = {"skipped": 0, "clean": 0}
+
+        def adapt(current: str, skipped: int) -> str:
+            idx: int = self.order.index(current)
+            if skipped:
+                state["skipped"] += skipped
+                state["clean"] = 0
+            else:
+                state["clean"] += 1
+
+            if state["skipped"] >= self.step_down_drops and idx > 0:
+                state["skipped"] = 0
+                return self.order[idx - 1]
+            if state["clean"] >= self.step_up_frames and idx < len(self.order) - 1:
+                state["clean"] = 0
+                state["skipped"] = 0
+                return self.order[idx + 1]
+            return current
+
+        return adapt
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        Per profile encode cost (moving average, milliseconds) and output bitrate (kbit/s).
+        """
+        with self.lock:
+            now: float = monotonic()
+            for m in self.metrics.values():
+                # Roll over windows for profiles that have stopped encoding so their bitrate decays.
+                window: float = now - m["window_start"]
+                if window >= 1.0:
+                    m["kbps"] = m["window_bytes"] * 8 / 1000 / window
+                    m["window_start"] = now
+                    m["window_bytes"] = 0
+
+            return {
+                name: {
+                    "width": self.profiles[name]["width"],
+                    "quality": self.profiles[name]["quality"],
+                    "frames": m["frames"],
+                    "encode_ms": round(m["encode_ms"], 2),
+                    "kbps": round(m["kbps"], 1),
+                    "avg_frame_bytes": int(m["bytes"] / m["frames"]) if m["frames"] else 0
+                }
+                for name, m in self.metrics.items()
+            }
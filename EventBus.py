@@ -0,0 +1,248 @@
+import json, asyncio
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+class EventBus:
+    def __init__(
+        self,
+        retain: tuple[str, ...] = (),
+        queue_depth: int = 16,
+        heartbeat: float = 15.0,
+        poll_interval: float = 1.0,
+        inbox_size: int = 1024
+    ) -> None:
+        """
+        In-process publish/subscribe behind the /events Server-Sent Events stream.
+
+        publish() only enqueues, so it is safe and cheap from any thread (request handlers, the relay
+        worker, the door monitor). A single broadcaster thread serialises each event once and offers the
+        same bytes to every client's bounded queue. When a client's queue is full its oldest message is
+        discarded, so a stalled tab never blocks publishers or the other tabs.
+
+        The last message of every retained event type is replayed to new clients, so a page starts from
+        current state instead of waiting for the next change. Sources registered with watch() (e.g. viewer
+        counts) are retained, sampled by the broadcaster while clients are connected and published only
+        when they change.
+
+        Events are per process: with several worker processes each one only sees its own.
+
+        Parameters:
+            retain : tuple[str, ...]
+                Event types describing state (e.g. door) rather than occurrences (e.g. login).
+            queue_depth : int
+                Maximum number of messages buffered per client.
+            heartbeat : float
+                Seconds of silence after which a client is sent an SSE comment, keeping proxies from
+                closing the connection and detecting disconnected clients.
+            poll_interval : float
+                Seconds between samples of the watched sources.
+            inbox_size : int
+                Events waiting for the broadcaster, further events are dropped.
+        """
+        self.queue_depth: int = max(1, queue_depth)
+        self.heartbeat: float = heartbeat
+        self.poll_interval: float = poll_interval
+        self.inbox: Queue = Queue(maxsize=inbox_size)
+
+        self.clients: set[Queue] = set()
+        # Grouped by event loop so a broadcast costs one call_soon_threadsafe per loop, not per client.
+        self.async_clients: dict[asyncio.AbstractEventLoop, set[asyncio.Queue]] = {}
+        self.lock: Lock = Lock()
+        self.thread: Optional[Thread] = None
+
+        self.retain: set[str] = set(retain)
+        self.latest: dict[str, bytes] = {}
+        self.sources: dict[str, Callable[[], Any]] = {}
+        self.sampled: dict[str, Any] = {}
+        self.sequence: int = 0
+
+        self.published: int = 0
+        self.delivered: int = 0
+        self.dropped: int = 0
+
+    def _ensure_broadcaster(self) -> None:
+        """
+        Starts the broadcaster thread if needed. Called with self.lock held.
+        """
+        if self.thread is None:
+            self.thread = Thread(target=self._run, name="EventBroadcaster", daemon=True)
+            self.thread.start()
+
+    # Publishers
+    def publish(self, event: str, data: Any) -> None:
+        """
+        Queues an event for every connected client. Never blocks, events are dropped if the broadcaster
+        has fallen inbox_size events behind.
+        """
+        try:
+            self.inbox.put_nowait((event, data))
+        except Full:
+            self.dropped += 1
+            return
+        with self.lock:
+            self._ensure_broadcaster()
+
+    def watch(self, event: str, source: Callable[[], Any]) -> None:
+        """
+        Publishes source() as event whenever its value changes (sampled every poll_interval while clients
+        are connected). Use for state that changes in many places, such as viewer counts.
+        """
+        with self.lock:
+            self.sources[event] = source
+            self.retain.add(event)
+
+    # Broadcaster
+    def _run(self) -> None:
+        while True:
+            try:
+                event, data = self.inbox.get(timeout=self.poll_interval)
+                self._broadcast(event=event, data=data)
+            except Empty:
+                pass
+            self._sample()
+
+    def _sample(self) -> None:
+        with self.lock:
+            if not self.clients and not self.async_clients:
+                return
+            sources: list[tuple[str, Callable[[], Any]]] = list(self.sources.items())
+
+        for event, source in sources:
+            try:
+                value: Any = source()
+            except Exception:
+                continue
+            if self.sampled.get(event) != value:
+                self.sampled[event] = value
+                self._broadcast(event=event, data=value)
+
+    def format(self, event: str, data: Any) -> bytes:
+        self.sequence += 1
+        payload: str = json.dumps(data, separators=(",", ":"), default=str)
+        return f"id: {self.sequence}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+    def _broadcast(self, event: str, data: Any) -> None:
+        """
+        Serialises one event and offers it to every client. Runs on the broadcaster thread only.
+        """
+        message: bytes = self.format(event=event, data=data)
+        self.published += 1
+        with self.lock:
+            if event in self.retain:
+                self.latest[event] = message
+            clients: list[Queue] = list(self.clients)
+            loops: list[tuple[asyncio.AbstractEventLoop, list[asyncio.Queue]]] = [
+                (loop, list(queues)) for loop, queues in self.async_clients.items()
+            ]
+
+        for loop, queues in loops:
+            try:
+                loop.call_soon_threadsafe(self._offer_all, queues, message)
+            except RuntimeError:
+                # The clients' event loop has already been closed.
+                pass
+
+        for q in clients:
+            try:
+                q.put_nowait(message)
+            except Full:
+                try:
+                    q.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+                try:
+                    q.put_nowait(message)
+                except Full:
+                    self.dropped += 1
+
+    def _offer_all(self, queues: list[asyncio.Queue], message: bytes) -> None:
+        """
+        Runs on the async clients' event loop, same eviction policy as the threaded queues.
+        """
+        for aq in queues:
+            if aq.full():
+                aq.get_nowait()
+                self.dropped += 1
+            aq.put_nowait(message)
+
+    # Clients
+    def _replay(self) -> list[bytes]:
+        """
+        Current state for a new client: the last message of every retained event type. Called with self.lock held.
+        """
+        return list(self.latest.values())[-self.queue_depth:]
+
+    def subscribe(self) -> Queue:
+        q: Queue = Queue(maxsize=self.queue_depth)
+        with self.lock:
+            for message in self._replay():
+                q.put_nowait(message)
+            self.clients.add(q)
+            self._ensure_broadcaster()
+        return q
+
+    def unsubscribe(self, q: Queue) -> None:
+        with self.lock:
+            self.clients.discard(q)
+
+    def stream(self) -> Iterator[bytes]:
+        """
+        SSE body for one client of the (threaded) Flask server.
+        """
+        q: Queue = self.subscribe()
+        try:
+            # Reconnect delay for the browser's EventSource.
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    message: bytes = q.get(timeout=self.heartbeat)
+                except Empty:
+                    yield b": keepalive\n\n"
+                    continue
+                self.delivered += 1
+                yield message
+        finally:
+            self.unsubscribe(q=q)
+
+    async def astream(self) -> AsyncIterator[bytes]:
+        """
+        Async equivalent of stream() for the ASGI server, an idle client is a coroutine waiting on its queue.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        aq: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        with self.lock:
+            for message in self._replay():
+                aq.put_nowait(message)
+            self.async_clients.setdefault(loop, set()).add(aq)
+            self._ensure_broadcaster()
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    message: bytes = await asyncio.wait_for(aq.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                self.delivered += 1
+                yield message
+        finally:
+            with self.lock:
+                queues: Optional[set[asyncio.Queue]] = self.async_clients.get(loop)
+                if queues is not None:
+                    queues.discard(aq)
+                    if not queues:
+                        del self.async_clients[loop]
+
+    def client_count(self) -> int:
+        with self.lock:
+            return len(self.clients) + sum(len(queues) for queues in self.async_clients.values())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "clients": self.client_count(),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,280 @@
+import asyncio
+from time import monotonic
+from threading import Thread, Condition
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+from Metrics import REGISTRY
+
+CAPTURE_SECONDS = REGISTRY.histogram("garage_capture_seconds", "Time to capture one camera frame.")
+ENCODE_SECONDS = REGISTRY.histogram("garage_encode_seconds", "Time to encode one frame for a profile.", labels=("profile",))
+
+class FrameHub:
+    def __init__(
+        self,
+        capture: Callable[[], Any],
+        encode: Callable[[Any, str], Optional[bytes]],
+        on_start: Callable[[], None],
+        on_stop: Callable[[], None],
+        buffer_size: int = 4,
+        idle_timeout: float = 30.0,
+        gate: Optional[Callable[[Any], bool]] = None
+    ) -> None:
+        """
+        Single producer, multi subscriber broadcaster for encoded camera frames.
+
+        One background thread calls capture(), encodes the frame once for every profile that
+        currently has a subscriber and publishes the result into a ring buffer.
+        Every subscriber keeps its own cursor (the sequence number of the last frame it read)
+        so a slow client skips to the newest frame instead of holding back the producer.
+
+        Parameters:
+            capture : Callable[[], Any]
+                Captures a single raw frame. Returning None skips the frame.
+            encode : Callable[[Any, str], Optional[bytes]]
+                Encodes a raw frame for the named profile. Returning None skips that profile.
+            on_start : Callable[[], None]
+                Called before the first capture when the first subscriber arrives.
+            on_stop : Callable[[], None]
+                Called once the hub has been idle (no subscribers) for idle_timeout seconds.
+            buffer_size : int
+                Number of most recent frames retained in the ring buffer.
+            idle_timeout : float
+                Seconds to keep capturing after the last subscriber leaves.
+            gate : Optional[Callable[[Any], bool]]
+                Called with every raw frame before encoding, returning False skips the frame
+                (e.g. MotionDetector throttling a static scene).
+        """
+        self.capture: Callable[[], Any] = capture
+        self.encode: Callable[[Any, str], Optional[bytes]] = encode
+        self.on_start: Callable[[], None] = on_start
+        self.on_stop: Callable[[], None] = on_stop
+        self.buffer_size: int = max(1, buffer_size)
+        self.idle_timeout: float = idle_timeout
+        self.gate: Optional[Callable[[Any], bool]] = gate
+
+        self.ring: list[Optional[dict[str, bytes]]] = [None] * self.buffer_size
+        self.seq: int = 0
+        self.subscribers: int = 0
+        self.profiles: dict[str, int] = {}
+        self.idle_since: Optional[float] = None
+        self.running: bool = False
+        self.frames_dropped: int = 0
+        self.cond: Condition = Condition()
+        self.thread: Optional[Thread] = None
+        # Async subscribers are woken through their event loop instead of the condition variable.
+        self.waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def _run(self) -> None:
+        """
+        Producer loop. Captures frames while there are subscribers (or the idle grace period has
+        not yet expired), then stops the camera and exits the thread.
+        """
+        try:
+            self.on_start()
+            while True:
+                with self.cond:
+                    if self.subscribers == 0 and monotonic() - self.idle_since >= self.idle_timeout:
+                        self.running = False
+                        break
+                    active: list[str] = [p for p, count in self.profiles.items() if count > 0]
+
+                with CAPTURE_SECONDS.time():
+                    frame: Any = self.capture()
+                if frame is None:
+                    continue
+                if self.gate is not None and not self.gate(frame):
+                    continue
+
+                # Each profile is encoded once per frame and shared by all of its subscribers.
+                encoded: dict[str, bytes] = {}
+                for profile in active:
+                    with ENCODE_SECONDS.time(profile):
+                        data: Optional[bytes] = self.encode(frame, profile)
+                    if data is not None:
+                        encoded[profile] = data
+                if encoded:
+                    self.publish(frames=encoded)
+        finally:
+            with self.cond:
+                self.running = False
+                self.cond.notify_all()
+                self._wake_async()
+            self.on_stop()
+
+    def publish(self, frames: dict[str, bytes]) -> None:
+        """
+        Writes the encoded profiles of one frame into the next ring slot and wakes every waiting subscriber.
+        """
+        with self.cond:
+            self.seq += 1
+            self.ring[self.seq % self.buffer_size] = frames
+            self.cond.notify_all()
+            self._wake_async()
+
+    def _wake_async(self) -> None:
+        """
+        Sets the event of every async subscriber from the producer thread. Called with self.cond held.
+        """
+        for loop, event in self.waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The subscriber's event loop has already been closed.
+                pass
+
+    def latest(self, profile: str, cursor: int = 0, timeout: Optional[float] = None) -> tuple[int, Optional[bytes], int]:
+        """
+        Blocks until a frame newer than cursor is available and returns it.
+        If the subscriber fell behind, intermediate frames are skipped (and counted as dropped).
+
+        Returns:
+            tuple[int, Optional[bytes], int] : The new cursor, the frame encoded for profile
+            (None on timeout or if the profile was not encoded for that frame) and the number
+            of frames skipped.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > cursor or not self.running, timeout=timeout):
+                return cursor, None, 0
+            if self.seq <= cursor:
+                return cursor, None, 0
+            skipped: int = self.seq - cursor - 1 if cursor else 0
+            self.frames_dropped += skipped
+            return self.seq, self.ring[self.seq % self.buffer_size].get(profile), skipped
+
+    def _subscribe(self, profile: str) -> None:
+        with self.cond:
+            self.subscribers += 1
+            self.profiles[profile] = self.profiles.get(profile, 0) + 1
+            self.idle_since = None
+
+            # A previous producer may still be shutting down the camera.
+            while not self.running and self.thread is not None and self.thread.is_alive():
+                thread: Thread = self.thread
+                self.cond.release()
+                try:
+                    thread.join()
+                finally:
+                    self.cond.acquire()
+
+            if not self.running:
+                self.running = True
+                self.thread = Thread(target=self._run, name="FrameHub", daemon=True)
+                self.thread.start()
+
+    def _switch(self, old: str, new: str) -> None:
+        with self.cond:
+            self.profiles[old] -= 1
+            self.profiles[new] = self.profiles.get(new, 0) + 1
+
+    def _unsubscribe(self, profile: str) -> None:
+        with self.cond:
+            self.subscribers -= 1
+            self.profiles[profile] -= 1
+            if self.subscribers == 0:
+                self.idle_since = monotonic()
+
+    def frames(self, profile: str, adapt: Optional[Callable[[str, int], str]] = None, heartbeat: bool = False) -> Iterator[Optional[bytes]]:
+        """
+        Generator of the newest frames for a single client.
+        Registers the client as a subscriber for as long as the generator is alive,
+        Flask closes the generator when the client disconnects which unregisters it.
+
+        Parameters:
+            profile : str
+                Encode profile the client receives.
+            adapt : Optional[Callable[[str, int], str]]
+                Automatic mode. Called with the current profile and the number of frames skipped
+                before each frame (a backed up socket), returns the profile to use next.
+            heartbeat : bool
+                Yield None when no frame arrived within 5 seconds, so a consumer that only stops
+                between frames (ClipRecorder) is never stuck waiting.
+        """
+        self._subscribe(profile=profile)
+        try:
+            cursor: int = self.seq
+            while True:
+                cursor, frame, skipped = self.latest(profile=profile, cursor=cursor, timeout=5.0)
+                if adapt is not None and frame is not None:
+                    new_profile: str = adapt(profile, skipped)
+                    if new_profile != profile:
+                        self._switch(old=profile, new=new_profile)
+                        profile = new_profile
+                if frame is None:
+                    if not self.running:
+                        return
+                    if heartbeat:
+                        yield None
+                    continue
+                yield frame
+        finally:
+            self._unsubscribe(profile=profile)
+
+    async def aframes(self, profile: str, adapt: Optional[Callable[[str, int], str]] = None) -> AsyncIterator[bytes]:
+        """
+        Async equivalent of frames() for the ASGI server. Waiting viewers cost a coroutine, not a thread.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        event: asyncio.Event = asyncio.Event()
+        waiter: tuple[asyncio.AbstractEventLoop, asyncio.Event] = (loop, event)
+
+        # _subscribe may briefly join a producer that is shutting down, keep that off the event loop.
+        await loop.run_in_executor(None, self._subscribe, profile)
+        with self.cond:
+            self.waiters.add(waiter)
+        try:
+            cursor: int = self.seq
+            while True:
+                event.clear()
+                cursor, frame, skipped = self.latest(profile=profile, cursor=cursor, timeout=0)
+                if frame is None:
+                    if not self.running:
+                        return
+                    try:
+                        await asyncio.wait_for(event.wait(), timeout=5.0)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                if adapt is not None:
+                    new_profile: str = adapt(profile, skipped)
+                    if new_profile != profile:
+                        self._switch(old=profile, new=new_profile)
+                        profile = new_profile
+                yield frame
+        finally:
+            with self.cond:
+                self.waiters.discard(waiter)
+            self._unsubscribe(profile=profile)
+
+    def snapshot(self, profile: str, timeout: float = 5.0) -> Optional[bytes]:
+        """
+        Returns the next frame encoded for profile, starting the camera if needed.
+        Subscribes only for one frame, the idle timeout then keeps the camera warm for the next snapshot.
+        """
+        self._subscribe(profile=profile)
+        try:
+            deadline: float = monotonic() + timeout
+            cursor: int = self.seq
+            while True:
+                remaining: float = deadline - monotonic()
+                if remaining <= 0:
+                    return None
+                cursor, frame, _ = self.latest(profile=profile, cursor=cursor, timeout=remaining)
+                if frame is not None:
+                    return frame
+                if not self.running:
+                    return None
+        finally:
+            self._unsubscribe(profile=profile)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns a snapshot of the hub state.
+        """
+        with self.cond:
+            return {
+                "running": self.running,
+                "subscribers": self.subscribers,
+                "profiles": {p: count for p, count in self.profiles.items() if count > 0},
+                "frames_published": self.seq,
+                "frames_dropped": self.frames_dropped
+            }
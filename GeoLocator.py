@@ -0,0 +1,270 @@
+import csv, bisect, ipaddress
+from time import monotonic
+from threading import Lock
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+GeoData = dict[str, str | float | None]
+
+def empty_location(ip: Optional[str]) -> GeoData:
+    return {
+        "ip_address": ip,
+        "city": None,
+        "region": None,
+        "country": None,
+        "latitude": None,
+        "longitude": None
+    }
+
+def client_ip(request: Any) -> Optional[str]:
+    """
+    Returns the client address of a Flask request, preferring the Cloudflare tunnel header,
+    then the first X-Forwarded-For hop, then the socket address.
+    """
+    ip: Optional[str] = request.headers.get("CF-Connecting-IP")
+    if not ip:
+        xff: Optional[str] = request.headers.get("X-Forwarded-For")
+        if xff:
+            ip = xff.split(",")[0].strip()
+        else:
+            ip = request.remote_addr
+    return ip
+
+def is_private(ip: Optional[str]) -> bool:
+    try:
+        return ipaddress.ip_address(ip).is_private
+    except ValueError:
+        return False
+
+class IpInfoProvider:
+    def __init__(self, timeout: float = 2.0) -> None:
+        """
+        Online provider backed by ipinfo.io with a strict (connect, read) timeout.
+        """
+        self.timeout: float = timeout
+
+    def __call__(self, ip: str) -> Optional[GeoData]:
+        import requests
+        response: requests.Response = requests.get(f"http://ipinfo.io/{ip}/json", timeout=self.timeout)
+        if response.status_code != 200:
+            return None
+        data: Any = response.json()
+        latitude, longitude = (data.get("loc") or ",").split(",")
+        return {
+            "ip_address": ip,
+            "city": data.get("city"),
+            "region": data.get("region"),
+            "country": data.get("country"),
+            "latitude": float(latitude) if latitude else None,
+            "longitude": float(longitude) if longitude else None
+        }
+
+class CsvGeoProvider:
+    def __init__(self, path: str) -> None:
+        """
+        Offline provider reading a local GeoIP file, so lookups work (and can be tested) without network.
+
+        The file is a CSV with a header row: network,city,region,country,latitude,longitude
+        where network is a CIDR block (e.g. 203.0.113.0/24). Ranges are loaded once and
+        searched with bisect.
+        """
+        self.starts: list[int] = []
+        self.ranges: list[tuple[int, int, GeoData]] = []
+
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                network: ipaddress.IPv4Network | ipaddress.IPv6Network = ipaddress.ip_network(row["network"], strict=False)
+                self.ranges.append((
+                    int(network.network_address),
+                    int(network.broadcast_address),
+                    {
+                        "city": row.get("city") or None,
+                        "region": row.get("region") or None,
+                        "country": row.get("country") or None,
+                        "latitude": float(row["latitude"]) if row.get("latitude") else None,
+                        "longitude": float(row["longitude"]) if row.get("longitude") else None
+                    }
+                ))
+        self.ranges.sort(key=lambda r: r[0])
+        self.starts = [r[0] for r in self.ranges]
+
+    def __call__(self, ip: str) -> Optional[GeoData]:
+        try:
+            value: int = int(ipaddress.ip_address(ip))
+        except ValueError:
+            return None
+        idx: int = bisect.bisect_right(self.starts, value) - 1
+        if idx >= 0 and self.ranges[idx][0] <= value <= self.ranges[idx][1]:
+            return {"ip_address": ip, **self.ranges[idx][2]}
+        return None
+
+class GeoLocator:
+    def __init__(
+        self,
+        known: Callable[[str], Optional[GeoData]],
+        store: Callable[[GeoData], None],
+        providers: list[Callable[[str], Optional[GeoData]]],
+        ttl: float = 86400.0,
+        max_entries: int = 256,
+        public_ip_url: Optional[str] = "https://api.ipify.org",
+        timeout: float = 2.0,
+        workers: int = 2
+    ) -> None:
+        """
+        Non-blocking IP geolocation for the login path.
+
+        locate() answers from an in-memory TTL/LRU cache, then from the ip_logs table (known).
+        On a miss it returns an empty location immediately and resolves the IP on a background
+        worker through providers (first non-empty answer wins), which backfills ip_logs via store.
+        LAN addresses are located by the household's public IP, which is also only ever looked up
+        on the background worker: until it is known, logins are recorded with the LAN address and
+        its ip_logs row is backfilled with the public IP's location.
+
+        Parameters:
+            known : Callable[[str], Optional[GeoData]]
+                Reads a previously resolved IP from ip_logs.
+            store : Callable[[GeoData], None]
+                Writes (upserts) a resolved IP into ip_logs.
+            providers : list
+                Lookup callables tried in order, e.g. [CsvGeoProvider(...), IpInfoProvider()].
+            ttl : float
+                Seconds a cached location (and the public IP) stays valid.
+            max_entries : int
+                LRU bound of the in-memory cache.
+            public_ip_url : Optional[str]
+                Service used to translate LAN addresses to the household's public IP, None disables it.
+            timeout : float
+                Timeout for the public IP request.
+        """
+        self.known: Callable[[str], Optional[GeoData]] = known
+        self.store: Callable[[GeoData], None] = store
+        self.providers: list[Callable[[str], Optional[GeoData]]] = providers
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self.public_ip_url: Optional[str] = public_ip_url
+        self.timeout: float = timeout
+
+        self.cache: OrderedDict[str, tuple[float, GeoData]] = OrderedDict()
+        self.pending: set[str] = set()
+        self.public_ip_cache: Optional[tuple[float, str]] = None
+        self.lock: Lock = Lock()
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="GeoLocator")
+
+        self.hits: int = 0
+        self.db_hits: int = 0
+        self.misses: int = 0
+        self.failures: int = 0
+
+    def cached_public_ip(self) -> Optional[str]:
+        """
+        Returns the household's public IP if a background lookup found it within ttl seconds, never blocks.
+        """
+        with self.lock:
+            if self.public_ip_cache and monotonic() - self.public_ip_cache[0] < self.ttl:
+                return self.public_ip_cache[1]
+        return None
+
+    def public_ip(self, fallback: str) -> str:
+        """
+        Returns the household's public IP for a LAN client, cached for ttl seconds.
+        Falls back to the LAN address if the lookup fails or times out.
+        Blocks on public_ip_url when not cached, so it is only called from the background worker.
+        """
+        if self.public_ip_url is None:
+            return fallback
+        cached: Optional[str] = self.cached_public_ip()
+        if cached is not None:
+            return cached
+        import requests
+        try:
+            ip: str = requests.get(self.public_ip_url, timeout=self.timeout).text.strip()
+            ipaddress.ip_address(ip)
+        except (requests.RequestException, ValueError):
+            return fallback
+        with self.lock:
+            self.public_ip_cache = (monotonic(), ip)
+        return ip
+
+    def _cache_get(self, ip: str) -> Optional[GeoData]:
+        with self.lock:
+            entry: Optional[tuple[float, GeoData]] = self.cache.get(ip)
+            if entry is None:
+                return None
+            if monotonic() - entry[0] >= self.ttl:
+                del self.cache[ip]
+                return None
+            self.cache.move_to_end(ip)
+            return entry[1]
+
+    def _cache_put(self, ip: str, data: GeoData) -> None:
+        with self.lock:
+            self.cache[ip] = (monotonic(), data)
+            self.cache.move_to_end(ip)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def locate(self, ip: Optional[str]) -> GeoData:
+        """
+        Returns the location for ip without blocking on the network.
+        Unknown IPs return an empty location and are resolved in the background.
+        LAN addresses are replaced by the public IP once it is known.
+        """
+        if not ip:
+            return empty_location(ip)
+        if is_private(ip):
+            ip = self.cached_public_ip() or ip
+
+        cached: Optional[GeoData] = self._cache_get(ip)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        stored: Optional[GeoData] = self.known(ip)
+        if stored is not None and stored.get("country") is not None:
+            self.db_hits += 1
+            self._cache_put(ip, stored)
+            return stored
+
+        self.misses += 1
+        with self.lock:
+            schedule: bool = ip not in self.pending
+            self.pending.add(ip)
+        if schedule:
+            self.executor.submit(self._resolve, ip)
+        return empty_location(ip)
+
+    def _resolve(self, ip: str) -> Optional[GeoData]:
+        """
+        Background task: tries each provider in turn, caches the answer and backfills ip_logs.
+        A LAN address is looked up by the household's public IP, but stored under the LAN address
+        the login was recorded with.
+        """
+        try:
+            lookup: str = self.public_ip(fallback=ip) if is_private(ip) else ip
+            for provider in self.providers:
+                try:
+                    data: Optional[GeoData] = provider(lookup)
+                except Exception:
+                    data = None
+                if data is not None:
+                    data = {**data, "ip_address": ip}
+                    self._cache_put(ip, data)
+                    self.store(data)
+                    return data
+            self.failures += 1
+            return None
+        finally:
+            with self.lock:
+                self.pending.discard(ip)
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "cached": len(self.cache),
+                "pending": len(self.pending),
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "failures": self.failures
+            }
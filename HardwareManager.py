@@ -1,61 +1,291 @@
+from flask import Response, jsonify, request, session
+import os, math
+from time import sleep, time
+from threading import Lock
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterator, Optional, Callable
+from FrameHub import FrameHub
+from EncodeLadder import EncodeLadder
+from CameraBackend import Camera, PicameraCamera, SimulatedCamera
+from SnapshotCache import SnapshotCache
+from DoorClassifier import DoorClassifier, DoorMonitor
+from ClipRecorder import ClipRing, ClipRecorder
+from MotionDetector import MotionDetector
+from RelayController import RelayController, GpioPin, FakePin, Pin
+from StreamRelay import StreamRelay
+from Metrics import REGISTRY
 
-from time import sleep
-from flask import Response
-import cv2, numpy as np, requests
-from picamera2 import Picamera2
-from gpiozero import OutputDevice
-from contextlib import contextmanager
-from typing import Iterator, Optional, Callable, Generator
+# Multipart framing around each JPEG. Written separately from the frame so the JPEG is never
+# concatenated into a new bytes object per client.
+PART_HEADER: bytes = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+PART_TRAILER: bytes = b'\r\n'
 
 class HardwareManager:
-    def __init__(self, relay_pin: int = 17, linux_ip: str = None, piZero_ip: str = None, hw_logger: Callable[[str, str], None] = None) -> None:
+    def __init__(
+        self,
+        relay_pin: int = 17,
+        linux_ip: str = None,
+        piZero_ip: str = None,
+        hw_logger: Callable[[str, str], None] = None,
+        camera_idle_timeout: float = 30.0,
+        motion_keepalive: float = 1.0,
+        relay_pin_factory: Optional[Callable[[], Pin]] = None,
+        camera_mode: str = "software",
+        camera_backend: str = "picamera2",
+        relay_backend: str = "gpio",
+        snapshot_max_age: float = 2.0,
+        door_interval: float = 60.0,
+        door_roi: tuple[float, float, float, float] = (0.0, 0.0, 1.0, 1.0),
+        door_references: Optional[dict[str, tuple[float, float]]] = None,
+        clip_dir: Optional[str] = None,
+        clip_segment_mb: int = 32,
+        clip_segments: int = 8,
+        clip_seconds: float = 60.0,
+        clip_max_fps: float = 10.0,
+        publish: Optional[Callable[[str, Any], None]] = None
+    ) -> None:
+        """
+        Parameters:
+            camera_mode : str
+                'software' captures RGB arrays and JPEG encodes them per profile with OpenCV (motion gating,
+                encode ladder). 'hardware' takes JPEGs straight from Picamera2's MJPEGEncoder, a single
+                profile with no motion gating, but almost no CPU per frame.
+            camera_backend : str
+                'picamera2' for the Pi camera module, 'simulated' for a synthetic moving picture
+                (development, CI and load tests on machines without a camera).
+            relay_backend : str
+                'gpio' drives relay_pin, 'simulated' records presses on a FakePin. Ignored if relay_pin_factory is given.
+            snapshot_max_age : float
+                Seconds a /snapshot still is served from cache before a new frame is captured.
+            door_interval : float
+                Seconds between door state classifications, 0 disables the door monitor. Below the door's
+                travel time every movement is seen, but the Pi camera never reaches camera_idle_timeout
+                and stays on (see DoorMonitor).
+            door_roi, door_references : see DoorClassifier.
+                The door monitor only runs with door_references calibrated for this garage, the built in
+                references are placeholders.
+            clip_dir : Optional[str]
+                Directory of the per camera clip rings, None disables recording.
+                Each camera uses at most clip_segments * clip_segment_mb MB of disk.
+            clip_seconds : float
+                Seconds every camera records after a /gpioToggle press.
+            clip_max_fps : float
+                Frames per second written to the clip rings at most.
+            publish : Optional[Callable[[str, Any], None]]
+                Pushes 'relay' presses and 'door' transitions to connected pages (see EventBus).
+        """
         self.relay_pin: int = relay_pin
         self.linux_ip: str = linux_ip
         self.piZero_ip: str = piZero_ip
-        self.picam2: Optional[Picamera2] = None
         self.hw_logger: Callable[[str, str], None] = hw_logger
+        self.camera_mode: str = camera_mode
+        self.camera_backend: str = camera_backend
+        self.publish: Callable[[str, Any], None] = publish or (lambda event, data: None)
+        # People watching each camera's stream route. Snapshots, the door monitor and clip recording
+        # subscribe to the same hub and relays but are not viewers.
+        self.viewers: dict[str, int] = {"pi": 0, "linux": 0, "piZero": 0}
+        self.viewers_lock: Lock = Lock()
 
-    @contextmanager
-    def get_relay(self):
-        """
-        Initialize and return the relay GPIO output device.
+        # Owns the relay pin for the life of the app and pulses it from a command queue.
+        if relay_pin_factory is None:
+            relay_pin_factory = (lambda: FakePin(pin=self.relay_pin)) if relay_backend == "simulated" else (lambda: GpioPin(pin=self.relay_pin))
+        self.relay: RelayController = RelayController(pin_factory=relay_pin_factory)
 
-        Returns:
-            OutputDevice: The initialized relay object.
-        """
-        relay: OutputDevice = OutputDevice(pin=self.relay_pin, active_high=True, initial_value=False)
+        # Hardware libraries (picamera2, OpenCV, NumPy) are imported when the camera first starts,
+        # so the app starts quickly and runs on machines without them.
+        if camera_backend == "simulated":
+            self.camera: Camera = SimulatedCamera(jpeg=self.camera_mode == "hardware")
+        elif self.camera_mode == "hardware":
+            from MjpegCamera import MjpegCamera
+            self.camera = MjpegCamera()
+        else:
+            self.camera = PicameraCamera()
 
-        try:
-            yield relay
-        finally:
-            relay.close()
+        # Single capture thread shared by every /cameraView client, encoding once per active profile.
+        # Static scenes are throttled to one frame per motion_keepalive seconds.
+        self.encode_ladder: EncodeLadder = EncodeLadder()
+        self.motion: MotionDetector = MotionDetector(
+            # Event clips use the medium settings but are not counted in the live view's profile stats.
+            encode=lambda frame: self.encode_ladder.compress(frame=frame, profile="medium"),
+            pre_roll_width=self.encode_ladder.profiles["medium"]["width"],
+            hw_logger=self.hw_logger,
+            keepalive_interval=motion_keepalive
+        )
+        if self.camera_mode == "hardware":
+            self.frame_hub: FrameHub = FrameHub(
+                capture=self.camera.capture,
+                encode=lambda frame, profile: frame,
+                on_start=self.camera.start,
+                on_stop=self.camera.stop,
+                idle_timeout=camera_idle_timeout
+            )
+        else:
+            self.frame_hub = FrameHub(
+                capture=self.camera.capture,
+                encode=self.encode_ladder.encode,
+                on_start=self.camera.start,
+                on_stop=self.stop_camera,
+                idle_timeout=camera_idle_timeout,
+                gate=self.motion
+            )
+
+        # One upstream connection per proxied camera, fanned out to every viewer.
+        self.linux_relay: StreamRelay = StreamRelay(
+            url=f"http://{self.linux_ip}:8080/?action=stream",
+            delimiter=b'--boundarydonotcross',
+            name="LinuxCamRelay",
+            idle_timeout=camera_idle_timeout
+        )
+        self.piZero_relay: StreamRelay = StreamRelay(
+            url=f"http://{self.piZero_ip}:8080/camera",
+            delimiter=b'--frame',
+            name="PiZeroCamRelay",
+            idle_timeout=camera_idle_timeout
+        )
+
+        # Cached stills for the dashboard tiles, keyed by the <camera> of /snapshot/<camera>.
+        self.snapshots: dict[str, SnapshotCache] = {
+            "pi": SnapshotCache(fetch=lambda: self.frame_hub.snapshot(profile=self.stream_profile(requested=None)[0]), max_age=snapshot_max_age),
+            "linux": SnapshotCache(fetch=self.linux_relay.snapshot, max_age=snapshot_max_age),
+            "piZero": SnapshotCache(fetch=self.piZero_relay.snapshot, max_age=snapshot_max_age)
+        }
+
+        # Classifies bursts of new Pi camera frames, the dashboard's cached still would repeat within a burst.
+        self.door: DoorMonitor = DoorMonitor(
+            fetch=lambda: self.frame_hub.snapshot(profile=self.stream_profile(requested=None)[0]),
+            classifier=DoorClassifier(roi=door_roi, references=door_references),
+            on_transition=self.door_transition,
+            interval=door_interval
+        )
+        if door_interval > 0 and door_references is not None:
+            self.door.start()
 
-    def gpioToggle(self) -> Response:
+        # Rolling on-disk recordings of every camera, triggered by relay presses.
+        self.clip_seconds: float = clip_seconds
+        sources: dict[str, Callable[[], Iterator[Optional[bytes]]]] = {
+            "pi": lambda: self.frame_hub.frames(profile=self.stream_profile(requested="medium")[0], heartbeat=True),
+            "linux": lambda: self.relay_jpegs(relay=self.linux_relay),
+            "piZero": lambda: self.relay_jpegs(relay=self.piZero_relay)
+        }
+        self.recorders: dict[str, ClipRecorder] = {
+            camera: ClipRecorder(
+                ring=ClipRing(path=os.path.join(clip_dir, camera), segment_size=clip_segment_mb * 1024 * 1024, segments=clip_segments),
+                source=source,
+                name=f"ClipRecorder-{camera}",
+                max_fps=clip_max_fps
+            )
+            for camera, source in sources.items()
+        } if clip_dir else {}
+
+        # Read from the relays' and hub's own counters at scrape time.
+        proxies: dict[str, StreamRelay] = {"linux": self.linux_relay, "piZero": self.piZero_relay}
+        REGISTRY.collector(
+            "garage_proxy_bytes_total", "Bytes read from the upstream camera.", "counter",
+            lambda: [({"camera": camera}, relay.bytes_in) for camera, relay in proxies.items()]
+        )
+        REGISTRY.collector(
+            "garage_proxy_frames_total", "Frames read from upstream (in), sent to viewers (out) or dropped for slow viewers.", "counter",
+            lambda: [
+                ({"camera": camera, "direction": direction}, getattr(relay, f"frames_{direction}"))
+                for camera, relay in proxies.items() for direction in ("in", "out", "dropped")
+            ]
+        )
+        REGISTRY.collector(
+            "garage_viewers", "Connected stream viewers.", "gauge",
+            lambda: [({"camera": camera}, count) for camera, count in self.viewer_counts().items()]
+        )
+
+    def gpioToggle(self) -> tuple[Response, int]:
         """
         Method to trigger the relay module on/off.
         Simulates physically pressing the on/off buttons.
+        The pulse is queued on self.relay and this returns immediately, presses within the debounce
+        window are coalesced into the previous command.
+
+        Every camera records for clip_seconds after a new command (see /clips), and the command is
+        published to connected pages as a 'relay' event.
 
         Returns:
             Response codes:
-                200 : No issues.
-                400 : Issue
+                202 : Command accepted, body contains the command ID to poll via /gpioToggle/<command_id>.
         """
-        try:
-            with self.get_relay() as relay:
-                relay.on()
-                sleep(0.5)
-                relay.off()
+        command, created = self.relay.press()
+        if created:
             self.hw_logger(hardware='Garage FOB')
-        except Exception:
-            return Response(status=400)
-        else:
-            return Response(status=200)
+            self.publish("relay", command)
+            for recorder in self.recorders.values():
+                recorder.trigger(seconds=self.clip_seconds)
+        return jsonify(command), 202
+
+    def gpioStatus(self, command_id: str) -> tuple[Response, int]:
+        """
+        Returns the status of a relay command (queued, running, done or failed) and its press to relay-on latency.
+
+        Returns:
+            Response codes:
+                200 : Command found.
+                404 : Unknown or expired command ID.
+        """
+        command: Optional[dict] = self.relay.status(command_id=command_id)
+        if command is None:
+            return jsonify({"status": "fail", "message": "Unknown command"}), 404
+        return jsonify(command), 200
 
-    def start_camera(self) -> None:
-        if self.picam2 is None:
-            self.picam2: Picamera2 = Picamera2()
-            self.picam2.awb_mode = 'fluorescent'
-            self.picam2.start()
+    def door_transition(self, state: str, previous: str) -> None:
+        # The first classification after startup is not a movement of the door, only publish it.
+        if previous != "unknown":
+            self.hw_logger(hardware=f'Garage Door {state.capitalize()}')
+        self.publish("door", self.door.state())
+
+    def viewer_counts(self) -> dict[str, int]:
+        """
+        Connected viewers per camera, polled for the 'viewers' event and the garage_viewers metric.
+        """
+        with self.viewers_lock:
+            return dict(self.viewers)
+
+    def _count_viewer(self, camera: str, delta: int) -> None:
+        with self.viewers_lock:
+            self.viewers[camera] += delta
+
+    def watching(self, camera: str, parts: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        Passes a stream route's parts through, counting the client as a viewer of camera until it disconnects.
+        """
+        self._count_viewer(camera=camera, delta=1)
+        try:
+            yield from parts
+        finally:
+            self._count_viewer(camera=camera, delta=-1)
+
+    async def awatching(self, camera: str, parts: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Async equivalent of watching() for the ASGI stream routes.
+        """
+        self._count_viewer(camera=camera, delta=1)
+        try:
+            async for part in parts:
+                yield part
+        finally:
+            await parts.aclose()
+            self._count_viewer(camera=camera, delta=-1)
+
+    def stop_camera(self) -> None:
+        """
+        Stops and releases the camera once the frame hub has been idle for camera_idle_timeout.
+        """
+        self.camera.stop()
+        self.motion.reset()
+
+    def stream_profile(self, requested: Optional[str]) -> tuple[str, Optional[Callable[[str, int], str]]]:
+        """
+        Resolves a ?profile= value to the profile a viewer subscribes to and, for 'auto', its adapt callback.
+        In hardware mode there is only the encoder's own stream.
+        """
+        if self.camera_mode == "hardware":
+            return "high", None
+        profile: str = self.encode_ladder.resolve(profile=requested)
+        return profile, self.encode_ladder.adaptive(profile=profile) if requested == "auto" else None
 
     def cameraView(self) -> Response:
         """
@@ -65,61 +295,198 @@ class HardwareManager:
             Response containing jpeg bytes and mimetype (Type of content contained in HTTP response)
             'multipart/x-mixed-replace' sends multiple parts of the stream in the same connection and replaces the previous one.
             'boundary=frame' is a delimiter, in this case the delimiter is frames.
+
+        Query parameters:
+            profile : low | medium | high | auto
+                JPEG quality/resolution rung. 'auto' steps down the ladder when the client falls behind
+                and back up once it keeps up. Defaults to high. Ignored in hardware mode.
         """
 
-        self.start_camera()
+        profile, adapt = self.stream_profile(requested=request.args.get("profile"))
         self.hw_logger(hardware='Garage Camera')
 
         def generate_frames() -> Iterator[bytes]:
             """
-            Function to access piCamera module on Raspberry PI :
-                1) Capture a single frame as a NumPy array.
-                2) Encode the captured NumPy array as JPEG (Skip if encoding fails).
-                3) Converts encoded JPEG frames into bytes.
-                4) Yields each captured frame and sends back to camera to display live feed.
+            Reads the newest JPEG frames from the shared frame hub and writes them as multipart parts.
+            The hub starts the camera for the first viewer and stops it once all viewers have left.
+            The shared frame is yielded as is between the part header and trailer (no per client copy).
 
             Yields to retain function state unlike 'return' which has to restart.
             Yield continues from previous yield until stoppped -> More memory efficient.
             """
-            while True:
-                frame: np.ndarray = self.picam2.capture_array()
-                ret, jpeg = cv2.imencode('.jpg', frame)
-                if not ret:
-                    continue
-                frame_bytes: bytes = jpeg.tobytes()
-                yield (b'--frame\r\n'
-                    b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            for frame_bytes in self.frame_hub.frames(profile=profile, adapt=adapt):
+                yield PART_HEADER
+                yield frame_bytes
+                yield PART_TRAILER
 
-        return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+        return Response(self.watching(camera="pi", parts=generate_frames()), mimetype='multipart/x-mixed-replace; boundary=frame')
 
     def intialiseLinuxCam(self) -> Response:
         """
         Proxy the MJPG stream from the Linux laptop.
-        Make request to linux laptop on LAN network, to retrieve video feed.
+        Every viewer shares a single upstream request to the linux laptop on LAN network.
         """
-        def generate() -> Generator[bytes, None, None]:
-            with requests.get(f"http://{self.linux_ip}:8080/?action=stream", stream=True) as r:
-                for chunk in r.iter_content(chunk_size=1024):
-                    if chunk:
-                        yield chunk
-
         self.hw_logger(hardware='Living Room Camera')
 
-        return Response(generate(), content_type='multipart/x-mixed-replace; boundary=--boundarydonotcross')
+        return Response(self.watching(camera="linux", parts=self.linux_relay.frames()), content_type='multipart/x-mixed-replace; boundary=--boundarydonotcross')
 
     def initialisePiZeroCam(self) -> Response:
         """
         Proxy the MJPG stream from the Pi Zero Camera.
+        Every viewer shares a single upstream request to the Pi Zero.
         """
+        self.hw_logger(hardware='Kitchen Camera')
 
-        def generate() -> Generator[bytes, None, None]:
-            url = f"http://{self.piZero_ip}:8080/camera"
-            with requests.get(url, stream=True) as r:
-                for chunk in r.iter_content(chunk_size=1024):
-                    if chunk:
-                        yield chunk
+        return Response(self.watching(camera="piZero", parts=self.piZero_relay.frames()),
+                        content_type='multipart/x-mixed-replace; boundary=frame')
 
-        self.hw_logger(hardware='Kitchen Camera')
+    def snapshot(self, camera: str) -> Response | tuple[Response, int]:
+        """
+        Returns a single JPEG still of camera (pi, linux or piZero) from its SnapshotCache.
+        Stills are not written to hardware_logs since the dashboard refreshes them continuously.
+
+        Returns:
+            Response codes:
+                200 : JPEG body with an ETag.
+                304 : The client's If-None-Match already matches the current still.
+                401 : Not logged in.
+                404 : Unknown camera.
+                503 : No frame could be captured.
+        """
+        if not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+        cache: Optional[SnapshotCache] = self.snapshots.get(camera)
+        if cache is None:
+            return jsonify({"status": "fail", "message": "Unknown camera"}), 404
+
+        jpeg, etag, age = cache.get()
+        if jpeg is None:
+            return jsonify({"status": "fail", "message": "Camera unavailable"}), 503
+
+        if request.if_none_match.contains(etag):
+            response: Response = Response(status=304)
+        else:
+            response = Response(jpeg, mimetype='image/jpeg')
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["Age"] = str(int(age))
+        return response
+
+    def doorState(self) -> tuple[Response, int]:
+        """
+        Returns the last classified door state (open, closed, moving or unknown), when it entered
+        that state and when it was last checked. Served from DoorMonitor's cache, never from the camera.
+        """
+        if not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+        return jsonify(self.door.state()), 200
+
+    @staticmethod
+    def relay_jpegs(relay: StreamRelay) -> Iterator[Optional[bytes]]:
+        """
+        JPEG frames of a proxied camera for ClipRecorder, None while upstream is silent.
+        """
+        parts: Iterator[Optional[bytes]] = relay.frames(heartbeat=True)
+        try:
+            for part in parts:
+                yield StreamRelay.jpeg_from_part(part=part)
+        finally:
+            parts.close()
+
+    @staticmethod
+    def parse_time(value: Optional[str], default: float) -> float:
+        """
+        Parses a ?from= / ?to= value given as epoch seconds or an ISO 8601 local time.
+        """
+        if not value:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            return datetime.fromisoformat(value).timestamp()
 
-        return Response(generate(),
-                        content_type='multipart/x-mixed-replace; boundary=frame')
\ No newline at end of file
+    def clipList(self) -> tuple[Response, int]:
+        """
+        Returns the recorded time range, frame count and disk usage of every camera's clip ring.
+        """
+        if not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+        return jsonify({camera: recorder.stats() for camera, recorder in self.recorders.items()}), 200
+
+    def clip_request(self, camera: str) -> tuple[Optional[Iterator[tuple[float, bytes]]], float, Optional[tuple[Response, int]]]:
+        """
+        Validates a /clips/<camera> request. Shared by the Flask view and the ASGI server.
+
+        Returns:
+            tuple : The (timestamp, JPEG) iterator and playback speed, or an error response.
+        """
+        if not session.get("logged_in"):
+            return None, 0.0, (jsonify({"status": "fail", "message": "Not logged in"}), 401)
+        recorder: Optional[ClipRecorder] = self.recorders.get(camera)
+        if recorder is None:
+            return None, 0.0, (jsonify({"status": "fail", "message": "Unknown camera"}), 404)
+        try:
+            start: float = self.parse_time(request.args.get("from"), default=0.0)
+            end: float = self.parse_time(request.args.get("to"), default=time())
+            speed: float = float(request.args.get("speed", 1.0))
+            # float() accepts nan and inf, which would make the playback delay NaN mid-stream.
+            if not all(math.isfinite(value) for value in (start, end, speed)):
+                raise ValueError("Non-finite from, to or speed")
+        except ValueError:
+            return None, 0.0, (jsonify({"status": "fail", "message": "Invalid from, to or speed"}), 400)
+        return recorder.ring.frames(start=start, end=end), speed, None
+
+    @staticmethod
+    def clip_delay(previous: Optional[float], timestamp: float, speed: float) -> float:
+        """
+        Seconds to wait before sending a frame so the clip plays at speed (0 sends as fast as possible).
+        Gaps between recordings are shortened to one second.
+        """
+        if previous is None or speed <= 0:
+            return 0.0
+        return min((timestamp - previous) / speed, 1.0)
+
+    def clip(self, camera: str) -> Response | tuple[Response, int]:
+        """
+        Streams recorded frames of camera as MJPEG, read from the clip ring one frame at a time.
+
+        Query parameters:
+            from, to : time range as epoch seconds or ISO 8601 (defaults to everything recorded)
+            speed : playback speed, 0 for no pacing (default 1)
+        """
+        frames, speed, error = self.clip_request(camera=camera)
+        if error is not None:
+            return error
+
+        def generate_frames() -> Iterator[bytes]:
+            previous: Optional[float] = None
+            for timestamp, jpeg in frames:
+                sleep(self.clip_delay(previous=previous, timestamp=timestamp, speed=speed))
+                previous = timestamp
+                yield PART_HEADER
+                yield jpeg
+                yield PART_TRAILER
+
+        return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+    def streamStats(self) -> tuple[Response, int]:
+        """
+        Returns viewer and frame counters for the Pi camera hub and both proxied camera relays,
+        plus per profile encode cost, bitrate and recent motion events for the Pi camera
+        and relay press counts and latency.
+        """
+        if not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+        return jsonify({
+            "cameraMode": self.camera_mode,
+            "cameraBackend": self.camera_backend,
+            "cameraView": self.frame_hub.stats(),
+            "encodeProfiles": self.encode_ladder.stats(),
+            "motion": self.motion.stats(),
+            "relay": self.relay.stats(),
+            "door": self.door.stats(),
+            "clips": {camera: recorder.stats() for camera, recorder in self.recorders.items()},
+            "snapshots": {camera: cache.stats() for camera, cache in self.snapshots.items()},
+            "linuxCam": self.linux_relay.stats(),
+            "piZeroCam": self.piZero_relay.stats()
+        }), 200
\ No newline at end of file
@@ -0,0 +1,360 @@
+"""
+Monthly, compressed archives of the logbook and hardware_logs rows moved out of SQLite by LogRetention.
+
+An archive file (<month>.<kind>.gla) is a magic number followed by append-only blocks. Each block holds
+up to batch_size rows stored column by column (one JSON array per column, so repeated values such as
+browser or hardware names compress well) and zlib compressed, behind a fixed header with the row count
+and the first and last epoch time of its rows. Readers skip blocks outside a time range from the header
+alone and never hold more than one block in memory.
+
+Dump an archive as JSON lines:
+    python LogArchive.py dump db/archive/2024-01.logbook.gla
+Archive every row older than 180 days now:
+    python LogArchive.py run --db garage.db --archive-dir db/archive --days 180
+"""
+import os, json, zlib, struct, sqlite3, argparse
+from time import time, sleep
+from datetime import datetime
+from threading import Thread, Lock
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Generator, Iterator, Optional
+
+MAGIC: bytes = b"GLA1"
+# Block header: compressed payload length, row count, first and last epoch time of the block's rows.
+BLOCK: struct.Struct = struct.Struct("<IIqq")
+
+class LogArchive:
+    def __init__(self, directory: str, level: int = 6) -> None:
+        """
+        Reads and appends the archive files in directory.
+
+        Parameters:
+            directory : str
+                Directory holding the archive files, created on first write.
+            level : int
+                zlib compression level of new blocks.
+        """
+        self.directory: str = directory
+        self.level: int = level
+
+    def path(self, month: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{month}.{kind}.gla")
+
+    def append(self, month: str, kind: str, rows: list[dict[str, Any]], at: str, committed: int) -> int:
+        """
+        Writes rows as one block at the end of the month's file and fsyncs it.
+
+        Parameters:
+            at : str
+                Column holding the rows' epoch time, recorded in the block header.
+            committed : int
+                Length of the file as last recorded in the log_archives catalog. Anything after it was
+                written by a run that failed before its rows were deleted, and is overwritten.
+
+        Returns:
+            int : The new length of the file, to be recorded in the catalog with the deletion of the rows.
+        """
+        times: list[int] = [row[at] for row in rows if row[at] is not None]
+        columns: dict[str, list[Any]] = {name: [row[name] for row in rows] for name in rows[0]}
+        payload: bytes = zlib.compress(json.dumps(columns, separators=(",", ":"), default=str).encode("utf-8"), self.level)
+
+        os.makedirs(self.directory, exist_ok=True)
+        path: str = self.path(month=month, kind=kind)
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            if committed < len(MAGIC):
+                f.truncate(0)
+                f.write(MAGIC)
+            else:
+                f.truncate(committed)
+                f.seek(committed)
+            f.write(BLOCK.pack(len(payload), len(rows), min(times, default=0), max(times, default=0)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def blocks(self, month: str, kind: str, size: int) -> list[tuple[int, int, int, int, int]]:
+        """
+        Reads the block headers within the first size bytes of a file.
+
+        Returns:
+            list of (payload offset, payload length, rows, first_at, last_at), oldest block first.
+        """
+        blocks: list[tuple[int, int, int, int, int]] = []
+        path: str = self.path(month=month, kind=kind)
+        if not os.path.exists(path):
+            return blocks
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a log archive")
+            offset: int = len(MAGIC)
+            while offset + BLOCK.size <= size:
+                f.seek(offset)
+                length, rows, first_at, last_at = BLOCK.unpack(f.read(BLOCK.size))
+                if offset + BLOCK.size + length > size:
+                    break
+                blocks.append((offset + BLOCK.size, length, rows, first_at, last_at))
+                offset += BLOCK.size + length
+        return blocks
+
+    def rows(
+        self,
+        month: str,
+        kind: str,
+        size: int,
+        newest_first: bool = False,
+        start_at: Optional[int] = None,
+        end_at: Optional[int] = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Streams the rows of a month's archive one block at a time.
+        Blocks entirely outside [start_at, end_at) are skipped without being decompressed, rows inside a
+        returned block are not filtered by time.
+        """
+        blocks: list[tuple[int, int, int, int, int]] = self.blocks(month=month, kind=kind, size=size)
+        if not blocks:
+            return
+        if newest_first:
+            blocks.reverse()
+
+        with open(self.path(month=month, kind=kind), "rb") as f:
+            for offset, length, _, first_at, last_at in blocks:
+                if (start_at is not None and last_at < start_at) or (end_at is not None and first_at >= end_at):
+                    continue
+                f.seek(offset)
+                columns: dict[str, list[Any]] = json.loads(zlib.decompress(f.read(length)))
+                names: list[str] = list(columns)
+                block_rows: list[tuple[Any, ...]] = list(zip(*columns.values()))
+                if newest_first:
+                    block_rows.reverse()
+                for values in block_rows:
+                    yield dict(zip(names, values))
+
+class LogRetention:
+    def __init__(
+        self,
+        connect: Callable[[str], ContextManager[sqlite3.Cursor]],
+        archive: LogArchive,
+        max_age_days: float,
+        interval: float = 6 * 3600,
+        batch_size: int = 2000
+    ) -> None:
+        """
+        Background job moving logbook and hardware_logs rows older than max_age_days into monthly
+        LogArchive files, so the hot tables (and every query over them) stay small.
+
+        Each batch is written to the archive and fsynced first, then its rows are deleted and the file's
+        new length recorded in log_archives in one transaction. A failure in between leaves the rows in
+        SQLite and the unrecorded block is overwritten by the next run, so rows are never lost or duplicated.
+        The daily_usage and monthly_logins rollups are not touched, they keep summarising archived months.
+
+        Parameters:
+            connect : Callable[[str], ContextManager[sqlite3.Cursor]]
+                Autocommit cursor factory taking an operation label (dbManager.db_connect).
+            archive : LogArchive
+                Destination of the archived rows.
+            max_age_days : float
+                Rows older than this are archived.
+            interval : float
+                Seconds between runs.
+            batch_size : int
+                Rows per archive block and per delete transaction.
+        """
+        self.connect: Callable[[str], ContextManager[sqlite3.Cursor]] = connect
+        self.archive: LogArchive = archive
+        self.max_age: float = max_age_days * 86400
+        self.interval: float = interval
+        self.batch_size: int = batch_size
+        self.lock: Lock = Lock()
+        self.thread: Optional[Thread] = None
+
+        self.runs: int = 0
+        self.archived: dict[str, int] = {"logbook": 0, "hardware": 0}
+        self.failures: int = 0
+        self.last_run: Optional[float] = None
+
+    def start(self) -> None:
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = Thread(target=self._run, name="LogRetention", daemon=True)
+            self.thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                self.failures += 1
+            sleep(self.interval)
+
+    def run_once(self, now: Optional[float] = None) -> dict[str, int]:
+        """
+        Archives everything older than max_age_days.
+
+        Returns:
+            dict[str, int] : Rows archived per kind (logbook, hardware).
+        """
+        cutoff: int = int((now or time()) - self.max_age)
+        with self.lock:
+            counts: dict[str, int] = {
+                "logbook": self._drain(kind="logbook", batch=self._logbook_batch, cutoff=cutoff),
+                "hardware": self._drain(kind="hardware", batch=self._hardware_batch, cutoff=cutoff)
+            }
+            self.runs += 1
+            self.last_run = time()
+            for kind, count in counts.items():
+                self.archived[kind] += count
+        return counts
+
+    def _drain(self, kind: str, batch: Callable[[sqlite3.Cursor, int], tuple[list[dict[str, Any]], str, str, str]], cutoff: int) -> int:
+        """
+        Archives batches of one table until no row is older than cutoff.
+        """
+        total: int = 0
+        while True:
+            with self.connect(operation="retention_select") as cursor:
+                rows, at, month_of, delete_sql = batch(cursor, cutoff)
+            if not rows:
+                return total
+
+            months: dict[str, list[dict[str, Any]]] = {}
+            for row in rows:
+                months.setdefault(row[month_of][:7], []).append(row)
+
+            keys: list[Any] = [row.pop("_key") for row in rows]
+            sessions: list[str] = [row["session_id"] for row in rows if kind == "logbook" and row["session_id"]]
+
+            sizes: dict[str, tuple[int, list[dict[str, Any]]]] = {}
+            with self.connect(operation="retention_archive") as cursor:
+                for month, month_rows in months.items():
+                    committed: Optional[sqlite3.Row] = cursor.execute(
+                        "SELECT bytes FROM log_archives WHERE month = ? AND kind = ?", (month, kind)
+                    ).fetchone()
+                    size: int = self.archive.append(
+                        month=month, kind=kind, rows=month_rows, at=at, committed=committed[0] if committed else 0
+                    )
+                    sizes[month] = (size, month_rows)
+
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.execute(delete_sql, (json.dumps(keys),))
+                    if sessions:
+                        # The per session rollup only serves the hot logbook, archived rows carry their own counts.
+                        cursor.execute("DELETE FROM hardware_usage WHERE session_id IN (SELECT value FROM json_each(?))", (json.dumps(sessions),))
+                    for month, (size, month_rows) in sizes.items():
+                        times: list[int] = [row[at] for row in month_rows]
+                        cursor.execute(
+                            """
+                            INSERT INTO log_archives (month, kind, path, bytes, rows, first_at, last_at, updated_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                            ON CONFLICT (month, kind) DO UPDATE SET
+                                bytes = excluded.bytes,
+                                rows = rows + excluded.rows,
+                                first_at = MIN(COALESCE(first_at, excluded.first_at), excluded.first_at),
+                                last_at = MAX(COALESCE(last_at, excluded.last_at), excluded.last_at),
+                                updated_at = excluded.updated_at
+                            """,
+                            (
+                                month, kind, self.archive.path(month=month, kind=kind), size, len(month_rows),
+                                min(times), max(times), datetime.now().isoformat(sep=" ")
+                            )
+                        )
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+            total += len(rows)
+
+    def _logbook_batch(self, cursor: sqlite3.Cursor, cutoff: int) -> tuple[list[dict[str, Any]], str, str, str]:
+        """
+        Oldest logbook rows before cutoff, with the username, location and per session hardware counts
+        they are shown with, so archived rows can be listed without the users, ip_logs or hardware_usage rows.
+        """
+        cursor.execute(
+            """
+            SELECT
+                lb.id AS _key, lb.id, lb.user_id,
+                CASE WHEN lb.user_id IS NULL THEN 'system' ELSE u.username END AS username, lb.session_id, lb.login_date, lb.login_time, lb.login_at,
+                lb.ip_address, ip.city, ip.region, ip.country,
+                lb.browser, lb.browser_version, lb.os, lb.os_version, lb.device, lb.user_agent
+            FROM logbook lb
+            LEFT JOIN users u ON lb.user_id = u.id
+            LEFT JOIN ip_logs ip ON lb.ip_address = ip.ip_address
+            WHERE lb.login_at < ?
+            ORDER BY lb.login_at, lb.id
+            LIMIT ?
+            """,
+            (cutoff, self.batch_size)
+        )
+        rows: list[dict[str, Any]] = [dict(row) for row in cursor.fetchall()]
+
+        sessions: list[str] = list(dict.fromkeys(row["session_id"] for row in rows if row["session_id"]))
+        usage: dict[str, dict[str, int]] = {}
+        if sessions:
+            cursor.execute(
+                "SELECT session_id, hardware, uses FROM hardware_usage WHERE session_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(sessions),)
+            )
+            for session_id, hardware, uses in cursor.fetchall():
+                usage.setdefault(session_id, {})[hardware] = uses
+        for row in rows:
+            row["hardware"] = usage.get(row["session_id"], {})
+
+        # Within a block rows are kept in the logbook's display order, so readers can simply reverse it.
+        rows.sort(key=lambda row: (row["login_date"], row["login_time"], row["id"]))
+        return rows, "login_at", "login_date", "DELETE FROM logbook WHERE id IN (SELECT value FROM json_each(?))"
+
+    def _hardware_batch(self, cursor: sqlite3.Cursor, cutoff: int) -> tuple[list[dict[str, Any]], str, str, str]:
+        cursor.execute(
+            """
+            SELECT rowid AS _key, session_id, user_id, timestamp, logged_at, hardware
+            FROM hardware_logs
+            WHERE logged_at < ?
+            ORDER BY logged_at
+            LIMIT ?
+            """,
+            (cutoff, self.batch_size)
+        )
+        rows: list[dict[str, Any]] = [dict(row) for row in cursor.fetchall()]
+        return rows, "logged_at", "timestamp", "DELETE FROM hardware_logs WHERE rowid IN (SELECT value FROM json_each(?))"
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_age_days": self.max_age / 86400,
+            "runs": self.runs,
+            "archived": dict(self.archived),
+            "failures": self.failures,
+            "last_run": self.last_run
+        }
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Dump log archives or run the retention job once.")
+    commands: Any = parser.add_subparsers(dest="command", required=True)
+    dump: argparse.ArgumentParser = commands.add_parser("dump", help="Print the rows of an archive file as JSON lines")
+    dump.add_argument("path")
+    run: argparse.ArgumentParser = commands.add_parser("run", help="Archive rows older than --days")
+    run.add_argument("--db", required=True)
+    run.add_argument("--archive-dir", default="db/archive")
+    run.add_argument("--days", type=float, required=True)
+    args: argparse.Namespace = parser.parse_args()
+
+    if args.command == "dump":
+        directory, filename = os.path.split(args.path)
+        month, kind, _ = filename.split(".")
+        for row in LogArchive(directory=directory).rows(month=month, kind=kind, size=os.path.getsize(args.path)):
+            print(json.dumps(row))
+        return
+
+    @contextmanager
+    def connect(operation: str) -> Generator[sqlite3.Cursor, None, None]:
+        conn: sqlite3.Connection = sqlite3.connect(args.db, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn.cursor()
+        finally:
+            conn.close()
+
+    retention: LogRetention = LogRetention(connect=connect, archive=LogArchive(directory=args.archive_dir), max_age_days=args.days)
+    print(json.dumps(retention.run_once()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import atexit, sqlite3, logging
+from time import monotonic
+from queue import Queue, Empty, Full
+from threading import Thread, Event, Lock
+from typing import Any, Optional
+from ConnectionPool import ConnectionPool
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+class LogWriter:
+    def __init__(
+        self,
+        db: str,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 5000,
+        block_timeout: float = 0.05
+    ) -> None:
+        """
+        In-process queue with a background writer thread for log INSERTs (logbook, ip_logs, hardware_logs).
+
+        Requests only enqueue (sql, params). The writer groups everything queued into one transaction
+        and commits when batch_size statements are pending, flush_interval seconds have passed,
+        flush() is called or the process exits.
+
+        When the disk is slow and the queue is full, enqueue blocks for at most block_timeout seconds
+        (backpressure) and then drops the row, counting it in stats()["dropped"].
+
+        If a batch fails, its statements are retried one at a time so only the rows SQLite rejects
+        (e.g. a foreign key violation) are lost. Those are logged and counted in stats()["failed"].
+
+        Parameters:
+            db : str
+                Path to the SQLite database.
+            batch_size : int
+                Pending statements that trigger a commit.
+            flush_interval : float
+                Maximum seconds a statement waits before being committed.
+            max_queue : int
+                Bound of the in-memory queue.
+            block_timeout : float
+                Seconds enqueue waits on a full queue before dropping.
+        """
+        self.db: str = db
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.block_timeout: float = block_timeout
+        self.queue: Queue = Queue(maxsize=max_queue)
+        # Guards the writer thread and the counters, which request threads and the writer both update.
+        self.lock: Lock = Lock()
+        self.thread: Optional[Thread] = None
+
+        self.enqueued: int = 0
+        self.written: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+        self.batches: int = 0
+
+        atexit.register(self.close)
+
+    def _start(self) -> None:
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self._run, name="LogWriter", daemon=True)
+                self.thread.start()
+
+    def enqueue(self, sql: str, params: tuple[Any, ...]) -> bool:
+        """
+        Queues a single INSERT for the writer thread.
+
+        Returns:
+            bool : False if the row was dropped because the queue stayed full.
+        """
+        self._start()
+        try:
+            self.queue.put((sql, params), timeout=self.block_timeout)
+        except Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        with self.lock:
+            self.enqueued += 1
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Synchronously commits everything queued so far. Intended for tests and shutdown.
+
+        Returns:
+            bool : True if the writer confirmed the flush within timeout, which also bounds the wait
+            for room in a full queue.
+        """
+        self._start()
+        done: Event = Event()
+        deadline: float = monotonic() + timeout
+        try:
+            self.queue.put(done, timeout=timeout)
+        except Full:
+            return False
+        return done.wait(timeout=max(0.0, deadline - monotonic()))
+
+    def close(self) -> None:
+        """
+        Flushes outstanding rows, registered with atexit so nothing queued is lost on shutdown.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            self.flush(timeout=5.0)
+
+    def _commit(self, conn: sqlite3.Connection, batch: list[tuple[str, tuple[Any, ...]]]) -> None:
+        """
+        Writes a batch inside a single transaction, grouping identical statements into executemany.
+        If the transaction fails, falls back to _commit_each so one bad row does not cost the batch.
+        """
+        if not batch:
+            return
+        grouped: dict[str, list[tuple[Any, ...]]] = {}
+        for sql, params in batch:
+            grouped.setdefault(sql, []).append(params)
+
+        try:
+            conn.execute("BEGIN")
+            for sql, rows in grouped.items():
+                conn.executemany(sql, rows)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._commit_each(conn=conn, batch=batch)
+            return
+        with self.lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def _commit_each(self, conn: sqlite3.Connection, batch: list[tuple[str, tuple[Any, ...]]]) -> None:
+        """
+        Writes every statement of a failed batch in its own autocommit statement, in queue order.
+        """
+        written: int = 0
+        for sql, params in batch:
+            try:
+                conn.execute(sql, params)
+                written += 1
+            except sqlite3.Error as e:
+                logger.warning("Dropped log row %r %r: %s", sql, params, e)
+                with self.lock:
+                    self.failed += 1
+        with self.lock:
+            self.written += written
+
+    def _run(self) -> None:
+        conn: sqlite3.Connection = ConnectionPool.connect(db=self.db)
+        try:
+            batch: list[tuple[str, tuple[Any, ...]]] = []
+            deadline: Optional[float] = None
+            while True:
+                timeout: Optional[float] = None if deadline is None else max(0.0, deadline - monotonic())
+                try:
+                    item: Any = self.queue.get(timeout=timeout)
+                except Empty:
+                    item = None
+
+                if isinstance(item, Event):
+                    self._commit(conn=conn, batch=batch)
+                    batch, deadline = [], None
+                    item.set()
+                    continue
+
+                if item is not None:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = monotonic() + self.flush_interval
+
+                if len(batch) >= self.batch_size or (deadline is not None and monotonic() >= deadline):
+                    self._commit(conn=conn, batch=batch)
+                    batch, deadline = [], None
+        finally:
+            conn.close()
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches
+            }
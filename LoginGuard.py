@@ -0,0 +1,159 @@
+import bcrypt
+from time import monotonic
+from threading import Lock, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional
+from Metrics import REGISTRY
+
+BCRYPT_SECONDS = REGISTRY.histogram("garage_bcrypt_seconds", "Time of one bcrypt password verification (including a rehash).")
+
+class LoginBusy(Exception):
+    """
+    Raised when the password verification queue is full.
+    """
+
+class TokenBucket:
+    def __init__(self, capacity: float = 5.0, refill_per_second: float = 1 / 60, max_keys: int = 10000) -> None:
+        """
+        In-memory token buckets keyed by an arbitrary string (IP address or username).
+        Each failed login takes one token, a key with no tokens left is refused until it refills.
+
+        Parameters:
+            capacity : float
+                Failed attempts allowed in a burst.
+            refill_per_second : float
+                Tokens returned per second (default one per minute).
+            max_keys : int
+                Upper bound on tracked keys, full buckets are evicted first.
+        """
+        self.capacity: float = capacity
+        self.refill_per_second: float = refill_per_second
+        self.max_keys: int = max_keys
+        self.buckets: dict[str, tuple[float, float]] = {}
+        self.lock: Lock = Lock()
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, last = self.buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - last) * self.refill_per_second)
+
+    def allowed(self, key: str) -> bool:
+        """
+        True if key has at least one token left. Does not consume a token.
+        """
+        with self.lock:
+            return self._tokens(key=key, now=monotonic()) >= 1
+
+    def consume(self, key: str) -> None:
+        """
+        Takes one token from key, called for every failed attempt.
+        """
+        with self.lock:
+            now: float = monotonic()
+            self.buckets[key] = (max(0.0, self._tokens(key=key, now=now) - 1), now)
+            if len(self.buckets) > self.max_keys:
+                self._evict(now=now)
+
+    def _evict(self, now: float) -> None:
+        for key in [k for k in self.buckets if self._tokens(key=k, now=now) >= self.capacity]:
+            del self.buckets[key]
+        while len(self.buckets) > self.max_keys:
+            self.buckets.pop(next(iter(self.buckets)))
+
+class LoginGuard:
+    def __init__(
+        self,
+        rounds: int = 12,
+        workers: int = 2,
+        max_pending: int = 8,
+        timeout: float = 10.0,
+        ip_limiter: Optional[TokenBucket] = None,
+        user_limiter: Optional[TokenBucket] = None
+    ) -> None:
+        """
+        Runs bcrypt off the Flask worker threads on a bounded pool and rate limits failed logins.
+
+        At most max_pending verifications may be queued or running, further attempts are rejected
+        immediately with LoginBusy instead of tying up request threads.
+
+        Parameters:
+            rounds : int
+                bcrypt cost for new hashes. Hashes with a different cost are rehashed on successful login.
+            workers : int
+                Threads running bcrypt concurrently (keep at or below the Pi's core count).
+            max_pending : int
+                Bound on queued + running verifications.
+            timeout : float
+                Seconds a request waits for its verification.
+            ip_limiter, user_limiter : Optional[TokenBucket]
+                Failed attempt buckets per client IP and per username.
+        """
+        self.rounds: int = rounds
+        self.timeout: float = timeout
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="LoginGuard")
+        self.slots: BoundedSemaphore = BoundedSemaphore(max_pending)
+        self.ip_limiter: TokenBucket = ip_limiter or TokenBucket(capacity=10)
+        self.user_limiter: TokenBucket = user_limiter or TokenBucket(capacity=5)
+
+        self.rejected_busy: int = 0
+        self.rejected_rate: int = 0
+
+    def allowed(self, ip: Optional[str], username: str) -> bool:
+        """
+        Checks both buckets before any bcrypt work is done.
+        """
+        if self.ip_limiter.allowed(key=f"ip:{ip}") and self.user_limiter.allowed(key=f"user:{username}"):
+            return True
+        self.rejected_rate += 1
+        return False
+
+    def failed(self, ip: Optional[str], username: str) -> None:
+        self.ip_limiter.consume(key=f"ip:{ip}")
+        self.user_limiter.consume(key=f"user:{username}")
+
+    def hash(self, password: bytes) -> bytes:
+        return bcrypt.hashpw(password, bcrypt.gensalt(rounds=self.rounds))
+
+    @staticmethod
+    def cost(hashed: bytes) -> int:
+        """
+        Returns the cost factor of a bcrypt hash ($2b$<cost>$...).
+        """
+        return int(hashed.split(b"$")[2])
+
+    def _verify(self, password: bytes, hashed: bytes) -> tuple[bool, Optional[bytes]]:
+        with BCRYPT_SECONDS.time():
+            if not bcrypt.checkpw(password=password, hashed_password=hashed):
+                return False, None
+            if self.cost(hashed=hashed) != self.rounds:
+                return True, self.hash(password=password)
+            return True, None
+
+    def verify(self, password: bytes, hashed: bytes) -> tuple[bool, Optional[bytes]]:
+        """
+        Verifies password against hashed on the worker pool.
+
+        Returns:
+            tuple[bool, Optional[bytes]] : Whether the password matched, and a replacement hash
+            at the configured cost when the stored one uses a different cost.
+
+        Raises:
+            LoginBusy : The verification queue is full.
+        """
+        if not self.slots.acquire(blocking=False):
+            self.rejected_busy += 1
+            raise LoginBusy()
+
+        try:
+            future: Future = self.executor.submit(self._verify, password, hashed)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future.result(timeout=self.timeout)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "rounds": self.rounds,
+            "rejected_busy": self.rejected_busy,
+            "rejected_rate": self.rejected_rate
+        }
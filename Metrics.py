@@ -0,0 +1,180 @@
+import bisect
+from time import perf_counter
+from threading import Lock
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Generator, Optional
+
+# Seconds, from sub-millisecond SQLite reads up to multi-second bcrypt and relay pulses.
+DEFAULT_BUCKETS: tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Samples = list[tuple[dict[str, str], float]]
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: Optional[tuple[str, str]] = None) -> str:
+    pairs: list[tuple[str, str]] = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.registry: MetricsRegistry = registry
+        self.name: str = name
+        self.help: str = help
+        self.labels: tuple[str, ...] = labels
+        self.values: dict[tuple[str, ...], float] = {}
+        self.lock: Lock = Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        if not self.registry.enabled:
+            return
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self.lock:
+            values: dict[tuple[str, ...], float] = dict(self.values)
+        return [f"{self.name}{format_labels(self.labels, key)} {value}" for key, value in values.items()]
+
+class Histogram:
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        self.registry: MetricsRegistry = registry
+        self.name: str = name
+        self.help: str = help
+        self.labels: tuple[str, ...] = labels
+        self.buckets: tuple[float, ...] = buckets
+        # Label values -> [per bucket counts (last one is +Inf), sum, count].
+        self.values: dict[tuple[str, ...], list[Any]] = {}
+        self.lock: Lock = Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        if not self.registry.enabled:
+            return
+        idx: int = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series: Optional[list[Any]] = self.values.get(label_values)
+            if series is None:
+                series = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values: str) -> ContextManager[None]:
+        """
+        Times the with block. A shared no-op context when metrics are disabled.
+        """
+        if not self.registry.enabled:
+            return nullcontext()
+        return self._timer(*label_values)
+
+    @contextmanager
+    def _timer(self, *label_values: str) -> Generator[None, None, None]:
+        start: float = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, *label_values)
+
+    def render(self) -> list[str]:
+        with self.lock:
+            values: dict[tuple[str, ...], list[Any]] = {key: [list(s[0]), s[1], s[2]] for key, s in self.values.items()}
+
+        lines: list[str] = []
+        for key, (counts, total, count) in values.items():
+            cumulative: int = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le: str = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Minimal Prometheus style registry (counters, histograms and callback collectors) rendered in the
+        text exposition format.
+
+        Metrics are declared once at import time. While disabled, observe()/inc() return immediately and
+        time() hands out a shared no-op context, so instrumented hot paths cost a single attribute check.
+
+        Each name is registered once. Declaring a counter or histogram again returns the existing one,
+        and a collector registered again replaces the previous callback, so constructing a component
+        twice (tests, app factory reloads) reports the latest instance instead of a duplicate family.
+        """
+        self.enabled: bool = enabled
+        self.metrics: list[Counter | Histogram] = []
+        self.collectors: list[tuple[str, str, str, Callable[[], Samples]]] = []
+        self.lock: Lock = Lock()
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(metric=Counter(registry=self, name=name, help=help, labels=labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(metric=Histogram(registry=self, name=name, help=help, labels=labels, buckets=buckets))
+
+    def _register(self, metric: Counter | Histogram) -> Any:
+        """
+        Adds metric, or returns the metric already registered under its name.
+
+        Raises:
+            ValueError : The name is registered with a different type or labels, or as a collector.
+        """
+        with self.lock:
+            if any(name == metric.name for name, _, _, _ in self.collectors):
+                raise ValueError(f"Metric {metric.name} is already registered as a collector")
+            for existing in self.metrics:
+                if existing.name == metric.name:
+                    if type(existing) is not type(metric) or existing.labels != metric.labels:
+                        raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+                    return existing
+            self.metrics.append(metric)
+        return metric
+
+    def collector(self, name: str, help: str, kind: str, collect: Callable[[], Samples]) -> None:
+        """
+        Registers a metric read from existing state at scrape time (e.g. StreamRelay counters),
+        so the hot path is not touched at all. Replaces an earlier collector of the same name.
+
+        Parameters:
+            kind : str
+                counter or gauge.
+            collect : Callable[[], Samples]
+                Returns (labels, value) pairs.
+        """
+        with self.lock:
+            if any(metric.name == name for metric in self.metrics):
+                raise ValueError(f"Metric {name} is already registered")
+            self.collectors = [c for c in self.collectors if c[0] != name] + [(name, help, kind, collect)]
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self.lock:
+            metrics: list[Counter | Histogram] = list(self.metrics)
+            collectors: list[tuple[str, str, str, Callable[[], Samples]]] = list(self.collectors)
+
+        for metric in metrics:
+            kind: str = "counter" if isinstance(metric, Counter) else "histogram"
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            lines.extend(metric.render())
+
+        for name, help, kind, collect in collectors:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in collect():
+                lines.append(f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+# Process wide registry, enabled by GarageAutomation when METRICS is set.
+REGISTRY: MetricsRegistry = MetricsRegistry()
@@ -0,0 +1,76 @@
+from threading import Condition
+from typing import Any, Optional
+from picamera2 import Picamera2
+from picamera2.encoders import MJPEGEncoder
+from picamera2.outputs import Output
+
+class JpegOutput(Output):
+    def __init__(self) -> None:
+        """
+        Picamera2 output that keeps only the newest encoded JPEG.
+        The encoder thread hands over each frame as a bytes object which is stored as is,
+        so it reaches every viewer without being copied again.
+        """
+        super().__init__()
+        self.frame: Optional[bytes] = None
+        self.seq: int = 0
+        self.cond: Condition = Condition()
+
+    def outputframe(self, frame: bytes, keyframe: bool = True, timestamp: Optional[int] = None, *args: Any, **kwargs: Any) -> None:
+        with self.cond:
+            self.frame = frame
+            self.seq += 1
+            self.cond.notify_all()
+
+    def wait(self, seq: int, timeout: float = 1.0) -> tuple[int, Optional[bytes]]:
+        """
+        Blocks until a frame newer than seq has been encoded.
+
+        Returns:
+            tuple[int, Optional[bytes]] : The frame's sequence number and the JPEG, None on timeout.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > seq, timeout=timeout):
+                return seq, None
+            return self.seq, self.frame
+
+class MjpegCamera:
+    def __init__(self, size: tuple[int, int] = (1280, 720), bitrate: Optional[int] = None, timeout: float = 1.0) -> None:
+        """
+        Pi camera running Picamera2's MJPEGEncoder, so frames arrive already JPEG encoded by the
+        hardware (V4L2) encoder instead of going through capture_array() and cv2.imencode on the CPU.
+
+        Parameters:
+            size : tuple[int, int]
+                Resolution of the encoded stream.
+            bitrate : Optional[int]
+                Encoder bitrate in bits per second, None lets Picamera2 pick one for the resolution.
+            timeout : float
+                Seconds capture() waits for the next frame before returning None.
+        """
+        self.size: tuple[int, int] = size
+        self.bitrate: Optional[int] = bitrate
+        self.timeout: float = timeout
+        self.picam2: Optional[Picamera2] = None
+        self.output: JpegOutput = JpegOutput()
+        self.seq: int = 0
+
+    def start(self) -> None:
+        if self.picam2 is None:
+            self.picam2 = Picamera2()
+            self.picam2.configure(self.picam2.create_video_configuration(main={"size": self.size}))
+            self.picam2.start_recording(MJPEGEncoder(bitrate=self.bitrate), self.output)
+
+    def stop(self) -> None:
+        if self.picam2 is not None:
+            self.picam2.stop_recording()
+            self.picam2.close()
+            self.picam2 = None
+
+    def capture(self) -> Optional[bytes]:
+        """
+        Returns the next encoded JPEG, or None if the encoder produced nothing within timeout.
+        Only called by the frame hub's capture thread.
+        """
+        self.seq, frame = self.output.wait(seq=self.seq, timeout=self.timeout)
+        return frame
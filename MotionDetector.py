@@ -0,0 +1,185 @@
+from __future__ import annotations
+from time import monotonic, time
+from collections import deque
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+# Only ndarray methods are used at runtime, so numpy is never imported by this module.
+if TYPE_CHECKING:
+    import numpy as np
+
+class MotionDetector:
+    def __init__(
+        self,
+        encode: Callable[[np.ndarray], Optional[bytes]],
+        hw_logger: Optional[Callable[[str], None]] = None,
+        step: int = 8,
+        pixel_threshold: int = 25,
+        area_threshold: float = 0.01,
+        keepalive_interval: float = 1.0,
+        pre_roll: int = 10,
+        pre_roll_width: Optional[int] = 640,
+        post_roll: float = 3.0,
+        max_event_frames: int = 150,
+        max_events: int = 5
+    ) -> None:
+        """
+        Frame differencing motion gate for the Pi camera.
+
+        Each captured frame is downsampled by striding (every step-th pixel) and collapsed to grayscale,
+        then compared to the previous downsampled frame. When nothing changes, only one frame per
+        keepalive_interval is let through to be encoded and streamed.
+
+        Parameters:
+            encode : Callable[[np.ndarray], Optional[bytes]]
+                Encodes a raw frame to JPEG for the in-memory event clips.
+            hw_logger : Optional[Callable[[str], None]]
+                Called with hardware='Garage Motion' when a motion event starts.
+            step : int
+                Downsample stride applied to both axes before differencing.
+            pixel_threshold : int
+                Minimum grayscale difference (0-255) for a pixel to count as changed.
+            area_threshold : float
+                Fraction of changed pixels required to count as motion.
+            keepalive_interval : float
+                Seconds between frames let through while the scene is static.
+            pre_roll : int
+                Number of frames before motion started that are kept with each event.
+            pre_roll_width : Optional[int]
+                Pre-roll frames are kept raw (encoding every idle frame would defeat the gate), striding
+                them down to about this width so they cost a fraction of a full frame. None keeps them whole.
+            post_roll : float
+                Seconds motion is considered ongoing after the last changed frame.
+            max_event_frames : int
+                Upper bound of frames stored per event.
+            max_events : int
+                Number of most recent events kept in memory.
+        """
+        self.encode: Callable[[np.ndarray], Optional[bytes]] = encode
+        self.hw_logger: Optional[Callable[[str], None]] = hw_logger
+        self.step: int = step
+        self.pixel_threshold: int = pixel_threshold
+        self.area_threshold: float = area_threshold
+        self.keepalive_interval: float = keepalive_interval
+        self.pre_roll_width: Optional[int] = pre_roll_width
+        self.post_roll: float = post_roll
+        self.max_event_frames: int = max_event_frames
+
+        self.previous: Optional[np.ndarray] = None
+        self.last_motion: Optional[float] = None
+        self.last_publish: float = 0.0
+        self.score: float = 0.0
+        self.pre_roll: deque[tuple[float, np.ndarray]] = deque(maxlen=pre_roll)
+        self.current_event: Optional[dict[str, Any]] = None
+        self.events: deque[dict[str, Any]] = deque(maxlen=max_events)
+        self.lock: Lock = Lock()
+
+    def downsample(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Strided view of the frame collapsed to a single int16 channel, cheap enough to run on every frame.
+        """
+        small: np.ndarray = frame[::self.step, ::self.step]
+        if small.ndim == 3:
+            small = small[..., :3].mean(axis=2)
+        return small.astype("int16")
+
+    def shrink(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Strided copy of the frame no wider than about pre_roll_width, owned by the pre-roll rather than the camera.
+        """
+        stride: int = -(-frame.shape[1] // self.pre_roll_width) if self.pre_roll_width else 1
+        return frame[::stride, ::stride].copy()
+
+    def detect(self, frame: np.ndarray) -> bool:
+        """
+        Returns True if the fraction of changed pixels against the previous frame exceeds area_threshold.
+        """
+        small: np.ndarray = self.downsample(frame=frame)
+        previous: Optional[np.ndarray] = self.previous
+        self.previous = small
+        if previous is None or previous.shape != small.shape:
+            return False
+
+        changed: np.ndarray = abs(small - previous) > self.pixel_threshold
+        self.score = float(changed.mean())
+        return self.score >= self.area_threshold
+
+    def __call__(self, frame: np.ndarray) -> bool:
+        """
+        Gate used by the frame hub. Returns True if the frame should be encoded and published:
+        every frame while motion (or its post-roll) is ongoing, otherwise one per keepalive_interval.
+        """
+        now: float = monotonic()
+        if self.detect(frame=frame):
+            if self.last_motion is None or now - self.last_motion > self.post_roll:
+                self._start_event()
+            self.last_motion = now
+
+        active: bool = self.last_motion is not None and now - self.last_motion <= self.post_roll
+
+        if active:
+            self._record(frame=frame)
+        else:
+            if self.current_event is not None:
+                self._end_event()
+            self.pre_roll.append((time(), self.shrink(frame=frame)))
+
+        if active or now - self.last_publish >= self.keepalive_interval:
+            self.last_publish = now
+            return True
+        return False
+
+    def _start_event(self) -> None:
+        """
+        Opens a new event seeded with the pre-roll frames and reports it to the logbook.
+        """
+        event: dict[str, Any] = {"start": time(), "end": None, "frames": []}
+        for ts, frame in self.pre_roll:
+            data: Optional[bytes] = self.encode(frame)
+            if data is not None:
+                event["frames"].append((ts, data))
+        self.pre_roll.clear()
+
+        with self.lock:
+            self.current_event = event
+            self.events.append(event)
+
+        if self.hw_logger is not None:
+            self.hw_logger(hardware='Garage Motion')
+
+    def _record(self, frame: np.ndarray) -> None:
+        event: Optional[dict[str, Any]] = self.current_event
+        if event is not None and len(event["frames"]) < self.max_event_frames:
+            data: Optional[bytes] = self.encode(frame)
+            if data is not None:
+                event["frames"].append((time(), data))
+
+    def _end_event(self) -> None:
+        with self.lock:
+            self.current_event["end"] = time()
+            self.current_event = None
+
+    def reset(self) -> None:
+        """
+        Forgets the reference frame, called when the camera stops so a restart does not compare
+        against a stale scene.
+        """
+        self.previous = None
+        self.pre_roll.clear()
+        if self.current_event is not None:
+            self._end_event()
+        self.last_motion = None
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Summary of the detector state and the events held in memory.
+        """
+        with self.lock:
+            return {
+                "motion": self.current_event is not None,
+                "score": round(self.score, 4),
+                "events": [
+                    {"start": e["start"], "end": e["end"], "frames": len(e["frames"])}
+                    for e in self.events
+                ]
+            }
@@ -0,0 +1,186 @@
+import secrets
+from time import sleep, monotonic, time
+from queue import Queue
+from threading import Thread, Lock
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Protocol
+from Metrics import REGISTRY
+
+RELAY_LATENCY_SECONDS = REGISTRY.histogram("garage_relay_latency_seconds", "Time from a relay press to the pin switching on.")
+
+class Pin(Protocol):
+    def on(self) -> None: ...
+    def off(self) -> None: ...
+    def close(self) -> None: ...
+
+class GpioPin:
+    def __init__(self, pin: int) -> None:
+        """
+        Real relay output on the Raspberry Pi. gpiozero is imported here so the controller
+        (and FakePin) can be used on machines without GPIO.
+        """
+        from gpiozero import OutputDevice
+        self.device: Any = OutputDevice(pin=pin, active_high=True, initial_value=False)
+
+    def on(self) -> None:
+        self.device.on()
+
+    def off(self) -> None:
+        self.device.off()
+
+    def close(self) -> None:
+        self.device.close()
+
+class FakePin:
+    def __init__(self, pin: int = 0) -> None:
+        """
+        In-memory pin for development and tests, records every transition as (monotonic time, state).
+        """
+        self.pin: int = pin
+        self.state: bool = False
+        self.transitions: list[tuple[float, bool]] = []
+
+    def on(self) -> None:
+        self.state = True
+        self.transitions.append((monotonic(), True))
+
+    def off(self) -> None:
+        self.state = False
+        self.transitions.append((monotonic(), False))
+
+    def close(self) -> None:
+        self.state = False
+
+class RelayController:
+    def __init__(
+        self,
+        pin_factory: Callable[[], Pin],
+        pulse: float = 0.5,
+        debounce: float = 1.0,
+        history: int = 100
+    ) -> None:
+        """
+        Long-lived owner of the relay pin. Presses are queued as commands and pulsed one at a time
+        by a single worker thread, so the HTTP request returns immediately and two phones can never
+        drive the pin at the same time.
+
+        A press is coalesced into the previous command (and gets its ID back) when that command is
+        still queued or started less than debounce seconds ago, so a double tap is one pulse.
+
+        Parameters:
+            pin_factory : Callable[[], Pin]
+                Opens the pin on first use, e.g. lambda: GpioPin(17) or FakePin.
+            pulse : float
+                Seconds the relay is held on, simulating a press of the remote's button.
+            debounce : float
+                Window in which repeated presses are coalesced.
+            history : int
+                Number of recent commands kept for status polling.
+        """
+        self.pin_factory: Callable[[], Pin] = pin_factory
+        self.pulse: float = pulse
+        self.debounce: float = debounce
+        self.history: int = history
+
+        self.pin: Optional[Pin] = None
+        self.queue: Queue = Queue()
+        self.lock: Lock = Lock()
+        self.commands: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self.last: Optional[dict[str, Any]] = None
+        self.thread: Optional[Thread] = None
+
+        self.presses: int = 0
+        self.coalesced: int = 0
+        self.latency_total_ms: float = 0.0
+        self.pulses: int = 0
+
+    def press(self) -> tuple[dict[str, Any], bool]:
+        """
+        Queues a pulse (or coalesces into the previous one).
+
+        Returns:
+            tuple[dict, bool] : The command status and whether a new command was created.
+        """
+        now: float = monotonic()
+        with self.lock:
+            self.presses += 1
+            last: Optional[dict[str, Any]] = self.last
+            if last is not None and (
+                last["status"] == "queued"
+                or (last["_started"] is not None and now - last["_started"] < self.debounce)
+            ):
+                self.coalesced += 1
+                return self._public(last), False
+
+            command: dict[str, Any] = {
+                "id": secrets.token_hex(nbytes=8),
+                "status": "queued",
+                "requested_at": time(),
+                "latency_ms": None,
+                "_requested": now,
+                "_started": None
+            }
+            self.commands[command["id"]] = command
+            while len(self.commands) > self.history:
+                self.commands.popitem(last=False)
+            self.last = command
+
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self._run, name="RelayController", daemon=True)
+                self.thread.start()
+
+        self.queue.put(command)
+        return self._public(command), True
+
+    def _run(self) -> None:
+        while True:
+            command: dict[str, Any] = self.queue.get()
+            try:
+                if self.pin is None:
+                    self.pin = self.pin_factory()
+                self.pin.on()
+                started: float = monotonic()
+                with self.lock:
+                    command["_started"] = started
+                    command["status"] = "running"
+                    command["latency_ms"] = round((started - command["_requested"]) * 1000, 2)
+                    self.latency_total_ms += command["latency_ms"]
+                    RELAY_LATENCY_SECONDS.observe(started - command["_requested"])
+                    self.pulses += 1
+                sleep(self.pulse)
+                self.pin.off()
+                status: str = "done"
+            except Exception:
+                status = "failed"
+                # Reopen the pin on the next command in case the handle went bad.
+                self._close_pin()
+            with self.lock:
+                command["status"] = status
+
+    def _close_pin(self) -> None:
+        if self.pin is not None:
+            try:
+                self.pin.close()
+            except Exception:
+                pass
+            self.pin = None
+
+    @staticmethod
+    def _public(command: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in command.items() if not k.startswith("_")}
+
+    def status(self, command_id: str) -> Optional[dict[str, Any]]:
+        with self.lock:
+            command: Optional[dict[str, Any]] = self.commands.get(command_id)
+            return self._public(command) if command else None
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "presses": self.presses,
+                "coalesced": self.coalesced,
+                "pulses": self.pulses,
+                "queued": self.queue.qsize(),
+                "avg_latency_ms": round(self.latency_total_ms / self.pulses, 2) if self.pulses else None,
+                "last_latency_ms": self.last["latency_ms"] if self.last else None
+            }
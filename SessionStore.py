@@ -0,0 +1,104 @@
+import secrets
+from time import time
+from threading import Lock
+from typing import Any, Callable, ContextManager, Optional
+import sqlite3
+
+Identity = dict[str, Any]
+
+class MemorySessionStore:
+    def __init__(self, ttl: float = 43200.0) -> None:
+        """
+        In-process session store with expiry. Only suitable for a single server process.
+
+        Parameters:
+            ttl : float
+                Seconds a login stays valid.
+        """
+        self.ttl: float = ttl
+        self.sessions: dict[str, Identity] = {}
+        self.lock: Lock = Lock()
+
+    def create(self, user_id: Optional[str], username: str, role: Optional[str]) -> Identity:
+        """
+        Creates a session for a successful login. session_id is the logbook session the user's
+        hardware usage is attributed to.
+        """
+        identity: Identity = {
+            "sid": secrets.token_urlsafe(32),
+            "user_id": user_id,
+            "username": username,
+            "role": role,
+            "session_id": secrets.token_hex(nbytes=16),
+            "expires_at": time() + self.ttl
+        }
+        with self.lock:
+            self.sessions[identity["sid"]] = identity
+            self._purge()
+        return identity
+
+    def get(self, sid: Optional[str]) -> Optional[Identity]:
+        if not sid:
+            return None
+        with self.lock:
+            identity: Optional[Identity] = self.sessions.get(sid)
+            if identity is not None and identity["expires_at"] <= time():
+                del self.sessions[sid]
+                return None
+            return identity
+
+    def delete(self, sid: Optional[str]) -> None:
+        with self.lock:
+            self.sessions.pop(sid, None)
+
+    def _purge(self) -> None:
+        now: float = time()
+        for sid in [sid for sid, identity in self.sessions.items() if identity["expires_at"] <= now]:
+            del self.sessions[sid]
+
+class SqliteSessionStore:
+    def __init__(self, connect: Callable[[str], ContextManager[sqlite3.Cursor]], ttl: float = 43200.0) -> None:
+        """
+        Session store backed by the sessions table, shared by every server process using the database.
+
+        Parameters:
+            connect : Callable[[str], ContextManager[sqlite3.Cursor]]
+                dbManager.db_connect, called with the operation label.
+            ttl : float
+                Seconds a login stays valid.
+        """
+        self.connect: Callable[[str], ContextManager[sqlite3.Cursor]] = connect
+        self.ttl: float = ttl
+
+    def create(self, user_id: Optional[str], username: str, role: Optional[str]) -> Identity:
+        """
+        Creates a session for a successful login. session_id is the logbook session the user's
+        hardware usage is attributed to. Expired sessions are purged at the same time.
+        """
+        identity: Identity = {
+            "sid": secrets.token_urlsafe(32),
+            "user_id": user_id,
+            "username": username,
+            "role": role,
+            "session_id": secrets.token_hex(nbytes=16),
+            "expires_at": time() + self.ttl
+        }
+        with self.connect(operation="session_create") as cursor:
+            cursor.execute("DELETE FROM sessions WHERE expires_at <= ?", (time(),))
+            cursor.execute(
+                "INSERT INTO sessions (sid, user_id, username, role, session_id, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (identity["sid"], user_id, username, role, identity["session_id"], identity["expires_at"])
+            )
+        return identity
+
+    def get(self, sid: Optional[str]) -> Optional[Identity]:
+        if not sid:
+            return None
+        with self.connect(operation="session_get") as cursor:
+            cursor.execute("SELECT * FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time()))
+            row: Optional[sqlite3.Row] = cursor.fetchone()
+            return dict(row) if row else None
+
+    def delete(self, sid: Optional[str]) -> None:
+        with self.connect(operation="session_delete") as cursor:
+            cursor.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
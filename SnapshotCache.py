@@ -0,0 +1,88 @@
+import hashlib
+from time import monotonic
+from threading import Lock, Event
+from typing import Callable, Optional
+
+class SnapshotCache:
+    def __init__(self, fetch: Callable[[], Optional[bytes]], max_age: float = 2.0) -> None:
+        """
+        Most recent still of a camera, served to every /snapshot request until it is max_age seconds old.
+
+        A stale cache triggers a single fetch: requests arriving while it is in flight wait for that
+        fetch instead of starting their own, so a dashboard full of tiles costs one capture.
+
+        Parameters:
+            fetch : Callable[[], Optional[bytes]]
+                Captures (or pulls from upstream) one JPEG, returning None on failure.
+            max_age : float
+                Seconds a cached still is served before a new one is fetched.
+        """
+        self.fetch: Callable[[], Optional[bytes]] = fetch
+        self.max_age: float = max_age
+        self.lock: Lock = Lock()
+        self.in_flight: Optional[Event] = None
+        self.jpeg: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.captured_at: float = 0.0
+
+        self.hits: int = 0
+        self.fetches: int = 0
+        self.collapsed: int = 0
+        self.failures: int = 0
+
+    def get(self, timeout: float = 10.0) -> tuple[Optional[bytes], Optional[str], float]:
+        """
+        Returns the cached still, fetching a new one first if it is older than max_age.
+        Falls back to the previous still if the fetch fails.
+
+        Returns:
+            tuple[Optional[bytes], Optional[str], float] : The JPEG, its ETag and its age in seconds
+            (None, None, 0.0 if no still has ever been captured).
+        """
+        with self.lock:
+            if self.jpeg is not None and monotonic() - self.captured_at < self.max_age:
+                self.hits += 1
+                return self.jpeg, self.etag, monotonic() - self.captured_at
+            if self.in_flight is None:
+                self.in_flight = Event()
+                done: Event = self.in_flight
+                leader: bool = True
+            else:
+                done = self.in_flight
+                leader = False
+                self.collapsed += 1
+
+        if leader:
+            try:
+                self.fetches += 1
+                jpeg: Optional[bytes] = self.fetch()
+            except Exception:
+                jpeg = None
+            with self.lock:
+                if jpeg is not None:
+                    self.jpeg = jpeg
+                    # Content based, so an unchanged scene keeps its ETag across captures.
+                    self.etag = hashlib.blake2b(jpeg, digest_size=12).hexdigest()
+                    self.captured_at = monotonic()
+                else:
+                    self.failures += 1
+                self.in_flight = None
+            done.set()
+        else:
+            done.wait(timeout=timeout)
+
+        with self.lock:
+            if self.jpeg is None:
+                return None, None, 0.0
+            return self.jpeg, self.etag, monotonic() - self.captured_at
+
+    def stats(self) -> dict[str, int | float | None]:
+        with self.lock:
+            return {
+                "age_s": round(monotonic() - self.captured_at, 2) if self.jpeg is not None else None,
+                "bytes": len(self.jpeg) if self.jpeg is not None else 0,
+                "hits": self.hits,
+                "fetches": self.fetches,
+                "collapsed": self.collapsed,
+                "failures": self.failures
+            }
@@ -0,0 +1,227 @@
+import os, re, gzip, json, hashlib, mimetypes
+from typing import Any, Callable, Optional
+from flask import Flask, Response, request, render_template, abort
+
+# References rewritten to fingerprinted URLs inside assets: CSS url(...) / @import url(...) and JS module imports.
+REFERENCES: dict[str, re.Pattern] = {
+    ".css": re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)"""),
+    ".js": re.compile(r"""((?:\bfrom|\bimport)\s*\(?\s*)(['"])([^'"]+)\2"""),
+}
+COMPRESSIBLE: tuple[str, ...] = ("text/", "image/svg+xml", "application/javascript", "application/json")
+
+class Asset:
+    def __init__(self, name: str, digest: str, body: bytes, mimetype: str, encodings: dict[str, bytes]) -> None:
+        """
+        One file under static/ as served: its content hashed name and the precompressed variants.
+
+        Parameters:
+            name : str
+                Path relative to the static folder, as passed to url_for('static', filename=...).
+            digest : str
+                Content hash, inserted before the extension of the fingerprinted path (CSS/main.1a2b3c4d5e6f.css).
+            encodings : dict[str, bytes]
+                Content-Encoding -> body, only for encodings that made the file smaller.
+        """
+        stem, extension = os.path.splitext(name)
+        self.name: str = name
+        self.url_name: str = f"{stem}.{digest}{extension}"
+        self.etag: str = digest
+        self.body: bytes = body
+        self.mimetype: str = mimetype
+        self.encodings: dict[str, bytes] = encodings
+
+class StaticAssets:
+    def __init__(self, app: Flask, max_age: int = 31536000, min_size: int = 512, gzip_level: int = 9) -> None:
+        """
+        Static asset pipeline built once at startup for serving over the Pi's slow uplink.
+
+        Every file under app.static_folder is read into memory, fingerprinted with a hash of its content
+        and precompressed (gzip, plus brotli when the optional brotli package is installed). References
+        inside CSS and JS files are rewritten to the fingerprinted names first, so a change to an imported
+        file changes the URL of every file importing it.
+
+        url_for('static', filename=...) returns the fingerprinted URL, which is served with an immutable
+        Cache-Control: browsers never revalidate it and a new deploy is picked up through new URLs.
+        Unfingerprinted URLs keep working with an ETag and revalidation.
+
+        Templates are compiled once here instead of on first use, and render() adds conditional GET
+        support to the HTML views.
+
+        Parameters:
+            max_age : int
+                Cache lifetime in seconds of fingerprinted assets.
+            min_size : int
+                Files smaller than this are not compressed.
+            gzip_level : int
+                gzip compression level, affordable since compression only runs at startup.
+        """
+        self.app: Flask = app
+        self.max_age: int = max_age
+        self.min_size: int = min_size
+        self.gzip_level: int = gzip_level
+        self.compressors: dict[str, Callable[[bytes], bytes]] = {"gzip": lambda data: gzip.compress(data, compresslevel=self.gzip_level, mtime=0)}
+        try:
+            import brotli
+            self.compressors = {"br": lambda data: brotli.compress(data, quality=11), **self.compressors}
+        except ImportError:
+            pass
+
+        self.assets: dict[str, Asset] = {}
+        self.urls: dict[str, Asset] = {}
+        self.build()
+
+        # Templates are not reloaded from disk, so a hash of their source identifies the rendered pages.
+        self.app.jinja_env.auto_reload = False
+        template_hash: Any = hashlib.sha256()
+        for template_name in sorted(self.app.jinja_env.list_templates()):
+            # Compiled now and kept in the environment's cache for the life of the process.
+            self.app.jinja_env.get_template(template_name)
+            source: str = self.app.jinja_env.loader.get_source(self.app.jinja_env, template_name)[0]
+            template_hash.update(template_name.encode("utf-8") + source.encode("utf-8"))
+        for asset in self.assets.values():
+            template_hash.update(asset.url_name.encode("utf-8"))
+        self.build_id: str = template_hash.hexdigest()[:16]
+
+        app.url_defaults(self.fingerprint)
+        app.view_functions["static"] = self.serve
+
+    # Build
+    def build(self) -> None:
+        root: str = self.app.static_folder
+        names: list[str] = sorted(
+            os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, "/")
+            for directory, _, filenames in os.walk(root)
+            for filename in filenames
+            if not filename.startswith(".")
+        )
+        for name in names:
+            self._build_asset(name=name, building=set())
+
+    def _build_asset(self, name: str, building: set[str]) -> Optional[Asset]:
+        """
+        Builds name after the files it references, so its hash covers their fingerprinted names.
+        """
+        if name in self.assets:
+            return self.assets[name]
+        path: str = os.path.join(self.app.static_folder, name)
+        if name in building or not os.path.isfile(path):
+            return None
+        building.add(name)
+
+        with open(path, "rb") as f:
+            body: bytes = f.read()
+        extension: str = os.path.splitext(name)[1].lower()
+        if extension in REFERENCES:
+            body = self._rewrite(name=name, text=body.decode("utf-8"), extension=extension, building=building).encode("utf-8")
+
+        mimetype: str = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+        encodings: dict[str, bytes] = {}
+        if len(body) >= self.min_size and mimetype.startswith(COMPRESSIBLE):
+            for encoding, compress in self.compressors.items():
+                compressed: bytes = compress(body)
+                if len(compressed) < len(body):
+                    encodings[encoding] = compressed
+
+        asset: Asset = Asset(name=name, digest=hashlib.sha256(body).hexdigest()[:12], body=body, mimetype=mimetype, encodings=encodings)
+        self.assets[name] = asset
+        self.urls[asset.url_name] = asset
+        return asset
+
+    def _rewrite(self, name: str, text: str, extension: str, building: set[str]) -> str:
+        base: str = os.path.dirname(name)
+        prefix: str = self.app.static_url_path.rstrip("/") + "/"
+
+        def resolve(reference: str) -> str:
+            if reference.startswith(("data:", "http:", "https:", "//", "#")):
+                return reference
+            target, hash_mark, fragment = reference.partition("#")
+            if target.startswith(prefix):
+                relative: str = target[len(prefix):]
+            elif target.startswith("/"):
+                return reference
+            else:
+                relative = os.path.normpath(os.path.join(base, target)).replace(os.sep, "/")
+            asset: Optional[Asset] = self._build_asset(name=relative, building=building)
+            if asset is None:
+                return reference
+            return prefix + asset.url_name + hash_mark + fragment
+
+        if extension == ".css":
+            return REFERENCES[extension].sub(lambda m: f"url({m.group(1)}{resolve(m.group(2))}{m.group(1)})", text)
+        return REFERENCES[extension].sub(lambda m: f"{m.group(1)}{m.group(2)}{resolve(m.group(3))}{m.group(2)}", text)
+
+    # Serving
+    def fingerprint(self, endpoint: str, values: dict[str, Any]) -> None:
+        """
+        url_defaults callback pointing url_for('static', filename=...) at the fingerprinted file.
+        """
+        if endpoint == "static":
+            asset: Optional[Asset] = self.assets.get(values.get("filename", ""))
+            if asset is not None:
+                values["filename"] = asset.url_name
+
+    def negotiate(self, encodings: dict[str, bytes]) -> Optional[str]:
+        """
+        Returns the preferred Content-Encoding among encodings accepted by the client, None for identity.
+        """
+        accepted: Any = request.accept_encodings
+        for encoding in encodings:
+            if accepted[encoding]:
+                return encoding
+        return None
+
+    def serve(self, filename: str) -> Response:
+        """
+        Replaces Flask's static view, serving from memory with the best accepted encoding.
+        """
+        immutable: bool = filename in self.urls
+        asset: Optional[Asset] = self.urls.get(filename) or self.assets.get(filename)
+        if asset is None:
+            abort(404)
+
+        encoding: Optional[str] = self.negotiate(asset.encodings)
+        response: Response = Response(asset.encodings[encoding] if encoding else asset.body, mimetype=asset.mimetype)
+        # Each representation gets its own strong ETag.
+        response.set_etag(f"{asset.etag}-{encoding}" if encoding else asset.etag)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if asset.encodings:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}, immutable" if immutable else "public, no-cache"
+        return response.make_conditional(request)
+
+    def render(self, template: str, **context: Any) -> Response:
+        """
+        Renders a page with conditional GET support. The ETag is derived from the build and the context
+        only, so a matching If-None-Match is answered 304 without rendering. Pages are private and always
+        revalidated, the view's login check runs before this on every request.
+        """
+        compress: bool = bool(request.accept_encodings["gzip"])
+        etag: str = hashlib.sha256(
+            json.dumps([self.build_id, template, context, compress], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:24]
+
+        if etag in request.if_none_match:
+            response: Response = Response(status=304)
+        else:
+            body: bytes = render_template(template_name_or_list=template, **context).encode("utf-8")
+            response = Response(body, mimetype="text/html")
+            if compress and len(body) >= self.min_size:
+                response.set_data(gzip.compress(body, compresslevel=6, mtime=0))
+                response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.update(("Accept-Encoding", "Cookie"))
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "assets": len(self.assets),
+            "bytes": sum(len(asset.body) for asset in self.assets.values()),
+            "compressed": {
+                encoding: sum(len(asset.encodings.get(encoding, asset.body)) for asset in self.assets.values())
+                for encoding in self.compressors
+            },
+            "build_id": self.build_id
+        }
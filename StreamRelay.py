@@ -0,0 +1,292 @@
+import asyncio
+from time import sleep, monotonic
+from queue import Queue, Empty, Full
+from threading import Thread, Lock, Event
+from typing import AsyncIterator, Iterator, Optional
+
+class StreamRelay:
+    def __init__(
+        self,
+        url: str,
+        delimiter: bytes,
+        name: str = "StreamRelay",
+        queue_depth: int = 2,
+        chunk_size: int = 4096,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 30.0,
+        idle_timeout: float = 30.0,
+        timeout: tuple[float, float] = (5.0, 10.0)
+    ) -> None:
+        """
+        Fan-out relay for an upstream MJPEG (multipart/x-mixed-replace) stream.
+
+        A single upstream connection is parsed into whole multipart parts (split on delimiter)
+        and each part is pushed onto every connected client's bounded queue.
+        When a client's queue is full its oldest part is discarded, so one slow client never
+        stalls the upstream reader or the other clients.
+
+        Parameters:
+            url : str
+                Upstream stream URL.
+            delimiter : bytes
+                Multipart delimiter line, e.g. b'--boundarydonotcross' or b'--frame'.
+            queue_depth : int
+                Maximum number of parts buffered per client.
+            backoff_initial, backoff_max : float
+                Exponential reconnect delay bounds in seconds.
+            idle_timeout : float
+                Seconds to keep the upstream connection open after the last client leaves.
+            timeout : tuple[float, float]
+                (connect, read) timeout for the upstream request.
+        """
+        self.url: str = url
+        self.delimiter: bytes = delimiter
+        self.name: str = name
+        self.queue_depth: int = max(1, queue_depth)
+        self.chunk_size: int = chunk_size
+        self.backoff_initial: float = backoff_initial
+        self.backoff_max: float = backoff_max
+        self.idle_timeout: float = idle_timeout
+        self.timeout: tuple[float, float] = timeout
+
+        self.clients: set[Queue] = set()
+        self.async_clients: dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self.lock: Lock = Lock()
+        self.idle_since: Optional[float] = None
+        self.thread: Optional[Thread] = None
+        self.stopped: Event = Event()
+
+        self.bytes_in: int = 0
+        self.frames_in: int = 0
+        self.frames_out: int = 0
+        self.frames_dropped: int = 0
+        self.reconnects: int = 0
+        # Resent to clients as a keep-alive while upstream is silent.
+        self.last_part: Optional[bytes] = None
+
+    # Upstream
+    def _should_exit(self) -> bool:
+        """
+        Decides (atomically with subscribe) whether the upstream thread should exit.
+        Clearing self.thread under the lock guarantees a new subscriber starts a fresh thread.
+        """
+        with self.lock:
+            idle: bool = not self.clients and not self.async_clients and self.idle_since is not None and monotonic() - self.idle_since >= self.idle_timeout
+            if self.stopped.is_set() or idle:
+                self.thread = None
+                return True
+            return False
+
+    def split_parts(self, buffer: bytearray) -> Iterator[bytes]:
+        """
+        Removes every complete multipart part from buffer and yields it (delimiter included).
+        A part is complete once the next delimiter has been received.
+        Any bytes before the first delimiter are discarded.
+        """
+        start: int = buffer.find(self.delimiter)
+        if start == -1:
+            # Keep just enough to match a delimiter split across two chunks.
+            del buffer[:max(0, len(buffer) - len(self.delimiter))]
+            return
+        if start > 0:
+            del buffer[:start]
+
+        while True:
+            end: int = buffer.find(self.delimiter, len(self.delimiter))
+            if end == -1:
+                return
+            part: bytes = bytes(buffer[:end])
+            del buffer[:end]
+            yield part
+
+    def _run(self) -> None:
+        """
+        Keeps one upstream connection open while there are clients, reconnecting with exponential backoff.
+        """
+        # Imported by the first viewer rather than at app startup.
+        import requests
+        backoff: float = self.backoff_initial
+        while not self._should_exit():
+            try:
+                with requests.get(self.url, stream=True, timeout=self.timeout) as r:
+                    r.raise_for_status()
+                    backoff = self.backoff_initial
+                    buffer: bytearray = bytearray()
+                    for chunk in r.iter_content(chunk_size=self.chunk_size):
+                        if self._should_exit():
+                            return
+                        if not chunk:
+                            continue
+                        with self.lock:
+                            self.bytes_in += len(chunk)
+                        buffer.extend(chunk)
+                        for part in self.split_parts(buffer=buffer):
+                            self.broadcast(part=part)
+            except requests.RequestException:
+                pass
+
+            if self._should_exit():
+                return
+            with self.lock:
+                self.reconnects += 1
+            sleep(backoff)
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def broadcast(self, part: bytes) -> None:
+        """
+        Pushes a complete part onto every client queue, evicting the oldest part when a queue is full.
+        """
+        with self.lock:
+            self.frames_in += 1
+            self.last_part = part
+            clients: list[Queue] = list(self.clients)
+            async_clients: list[tuple[asyncio.Queue, asyncio.AbstractEventLoop]] = list(self.async_clients.items())
+
+        for aq, loop in async_clients:
+            try:
+                loop.call_soon_threadsafe(self._offer, aq, part)
+            except RuntimeError:
+                # The client's event loop has already been closed.
+                pass
+
+        for q in clients:
+            try:
+                q.put_nowait(part)
+            except Full:
+                try:
+                    q.get_nowait()
+                    self._count_dropped()
+                except Empty:
+                    pass
+                try:
+                    q.put_nowait(part)
+                except Full:
+                    self._count_dropped()
+
+    def _offer(self, aq: asyncio.Queue, part: bytes) -> None:
+        """
+        Runs on the async client's event loop, same eviction policy as the threaded queues.
+        """
+        if aq.full():
+            aq.get_nowait()
+            self._count_dropped()
+        aq.put_nowait(part)
+
+    def _count_dropped(self) -> None:
+        with self.lock:
+            self.frames_dropped += 1
+
+    def _count_out(self) -> None:
+        with self.lock:
+            self.frames_out += 1
+
+    # Clients
+    def _ensure_upstream(self) -> None:
+        """
+        Starts the upstream thread if needed. Called with self.lock held.
+        """
+        self.idle_since = None
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = Thread(target=self._run, name=self.name, daemon=True)
+            self.thread.start()
+
+    def subscribe(self) -> Queue:
+        q: Queue = Queue(maxsize=self.queue_depth)
+        with self.lock:
+            self.clients.add(q)
+            self._ensure_upstream()
+        return q
+
+    def unsubscribe(self, q: Queue) -> None:
+        with self.lock:
+            self.clients.discard(q)
+            if not self.clients and not self.async_clients:
+                self.idle_since = monotonic()
+
+    async def aframes(self) -> AsyncIterator[bytes]:
+        """
+        Async equivalent of frames() for the ASGI server. Parts are handed to the client's event loop,
+        so a waiting viewer costs a coroutine rather than a thread.
+        """
+        aq: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        with self.lock:
+            self.async_clients[aq] = asyncio.get_running_loop()
+            self._ensure_upstream()
+        try:
+            while True:
+                part: bytes = await aq.get()
+                self._count_out()
+                yield part
+        finally:
+            with self.lock:
+                self.async_clients.pop(aq, None)
+                if not self.clients and not self.async_clients:
+                    self.idle_since = monotonic()
+
+    def frames(self, heartbeat: bool = False) -> Iterator[Optional[bytes]]:
+        """
+        Generator of whole multipart parts for a single downstream client.
+        Whenever no part arrived within the read timeout, something is still yielded so that a
+        disconnected client is noticed (the WSGI server only sees it on a write) and unsubscribed,
+        letting the upstream thread go idle: None with heartbeat, otherwise the last part again
+        (or an empty part if upstream never sent one).
+        """
+        q: Queue = self.subscribe()
+        try:
+            while True:
+                try:
+                    part: bytes = q.get(timeout=self.timeout[1])
+                except Empty:
+                    if heartbeat:
+                        yield None
+                    else:
+                        with self.lock:
+                            last: Optional[bytes] = self.last_part
+                        yield last or self.delimiter + b"\r\nContent-Type: image/jpeg\r\nContent-Length: 0\r\n\r\n\r\n"
+                    continue
+                self._count_out()
+                yield part
+        finally:
+            self.unsubscribe(q=q)
+
+    def snapshot(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        Returns the JPEG of the next part received from upstream, connecting if needed.
+        The part's multipart headers and trailing CRLF are stripped.
+        """
+        q: Queue = self.subscribe()
+        try:
+            return self.jpeg_from_part(part=q.get(timeout=timeout or self.timeout[1]))
+        except Empty:
+            return None
+        finally:
+            self.unsubscribe(q=q)
+
+    @staticmethod
+    def jpeg_from_part(part: Optional[bytes]) -> Optional[bytes]:
+        """
+        Strips the delimiter, part headers and trailing CRLF from a multipart part.
+        """
+        header_end: int = part.find(b'\r\n\r\n') if part else -1
+        if header_end == -1:
+            return None
+        return part[header_end + 4:].rstrip(b'\r\n') or None
+
+    def stop(self) -> None:
+        """
+        Closes the upstream connection at the next chunk boundary.
+        """
+        self.stopped.set()
+
+    def stats(self) -> dict[str, int | bool]:
+        with self.lock:
+            return {
+                "connected": self.thread is not None,
+                "clients": len(self.clients) + len(self.async_clients),
+                "bytes_in": self.bytes_in,
+                "frames_in": self.frames_in,
+                "frames_out": self.frames_out,
+                "frames_dropped": self.frames_dropped,
+                "reconnects": self.reconnects
+            }
@@ -0,0 +1,33 @@
+from functools import lru_cache
+from typing import Any, Optional
+
+@lru_cache(maxsize=256)
+def _parse(user_agent: str) -> tuple[tuple[str, Any], ...]:
+    """
+    Runs the (regex heavy) user_agents parser once per distinct User-Agent string.
+    Returns an immutable tuple so cached results cannot be mutated by callers.
+    The parser (and its regex tables) is imported on the first call rather than at app startup.
+    """
+    from user_agents import parse
+    ua: Any = parse(user_agent_string=user_agent)
+    return (
+        ("browser", ua.browser.family),
+        ("browser_version", ua.browser.version_string),
+        ("os", ua.os.family),
+        ("os_version", ua.os.version_string),
+        ("device", ua.device.family),
+    )
+
+def parse_user_agent(user_agent: Optional[str]) -> dict[str, Optional[str]]:
+    """
+    Function to return browser, OS and device metadata for a raw User-Agent string,
+    memoized in a bounded LRU cache keyed by the raw string.
+    """
+    return dict(_parse(user_agent or ""))
+
+def stats() -> dict[str, int]:
+    """
+    Hit/miss statistics of the parse cache.
+    """
+    info: Any = _parse.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
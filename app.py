@@ -1,33 +1,84 @@
-from user_agents import parse
+from datetime import date, timedelta
 from dotenv import load_dotenv
 from typing import Any, Optional
-import os, requests, dbManager as dbm, HardwareManager as hwm
+import os, hmac, json, dbManager as dbm, HardwareManager as hwm, UserAgentParser as uap
+from DoorClassifier import parse_roi
+from Metrics import REGISTRY
+from EventBus import EventBus
+from StaticAssets import StaticAssets
+from GeoLocator import GeoLocator, IpInfoProvider, CsvGeoProvider, client_ip
+from time import perf_counter
 from flask import (
     Flask,
+    g,
     session,
     request,
     redirect,
     Response,
-    render_template
+    jsonify
 )
 
 class GarageAutomation:
     def __init__(self) -> None:
+        start: float = perf_counter()
         self.app: Flask = Flask(__name__)
         load_dotenv()
         self.app.secret_key = os.getenv(key='SECRET_KEY')
+        # Instrumentation is a no-op unless METRICS is set.
+        REGISTRY.enabled = bool(os.getenv(key='METRICS'))
+        # Store only the raw User-Agent at login and parse it when the logbook is rendered.
+        self.ua_parse_lazy: bool = bool(os.getenv(key='UA_PARSE_LAZY'))
+        # Live state pushed to open pages over /events.
+        self.events: EventBus = EventBus(retain=("door",))
 
         # Initialise Database and Hardware Managers
         self.db: dbm.dbManager = dbm.dbManager(
             ip_dict=self.ip_find,
             user_dict=self.user_info,
-            db=os.getenv(key='DB')
+            db=os.getenv(key='DB'),
+            bcrypt_rounds=int(os.getenv(key='BCRYPT_ROUNDS', default=12)),
+            session_backend=os.getenv(key='SESSION_BACKEND', default='sqlite'),
+            session_ttl=float(os.getenv(key='SESSION_TTL', default=43200)),
+            publish=self.events.publish,
+            archive_dir=os.getenv(key='LOG_ARCHIVE_DIR', default='db/archive'),
+            retention_days=float(os.getenv(key='LOG_RETENTION_DAYS', default=0))
+        )
+        # Schema changes run once here rather than on every login.
+        self.db.migrate()
+        if self.db.retention is not None:
+            self.db.retention.start()
+
+        # IP geolocation is answered from cache/ip_logs and otherwise resolved after the login response.
+        geoip_db: Optional[str] = os.getenv(key='GEOIP_DB')
+        self.geo: GeoLocator = GeoLocator(
+            known=self.db.known_ip,
+            store=self.db.store_ip,
+            providers=([CsvGeoProvider(path=geoip_db)] if geoip_db else []) + (
+                [] if os.getenv(key='GEOIP_OFFLINE') else [IpInfoProvider()]
+            ),
+            public_ip_url=None if os.getenv(key='GEOIP_OFFLINE') else "https://api.ipify.org"
         )
         self.hw: hwm.HardwareManager = hwm.HardwareManager(
             hw_logger=self.db.hardware_logging,
             linux_ip=os.getenv(key='LINUX_IP'),
-            piZero_ip=os.getenv(key='PIZERO_IP')
+            piZero_ip=os.getenv(key='PIZERO_IP'),
+            camera_idle_timeout=float(os.getenv(key='CAMERA_IDLE_TIMEOUT', default=30)),
+            motion_keepalive=float(os.getenv(key='MOTION_KEEPALIVE', default=1)),
+            camera_mode=os.getenv(key='CAMERA_MODE', default='software'),
+            camera_backend=os.getenv(key='CAMERA_BACKEND', default='picamera2'),
+            relay_backend=os.getenv(key='RELAY_BACKEND', default='gpio'),
+            snapshot_max_age=float(os.getenv(key='SNAPSHOT_MAX_AGE', default=2)),
+            # The door monitor needs references calibrated with DoorClassifier.py --calibrate.
+            door_interval=float(os.getenv(key='DOOR_INTERVAL', default=60 if os.getenv(key='DOOR_REFERENCES') else 0)),
+            door_roi=parse_roi(os.getenv(key='DOOR_ROI', default='0,0,1,1')),
+            door_references=self.door_references(path=os.getenv(key='DOOR_REFERENCES')),
+            clip_dir=os.getenv(key='CLIP_DIR'),
+            clip_segment_mb=int(os.getenv(key='CLIP_SEGMENT_MB', default=32)),
+            clip_segments=int(os.getenv(key='CLIP_SEGMENTS', default=8)),
+            clip_seconds=float(os.getenv(key='CLIP_SECONDS', default=60)),
+            publish=self.events.publish
         )
+        self.events.watch(event="viewers", source=self.hw.viewer_counts)
 
         self.app.add_url_rule(rule='/', view_func=self.launchPage)
         self.app.add_url_rule(rule="/validateLogin", view_func=self.db.validateLogin, methods=["POST"])
@@ -36,37 +87,90 @@ class GarageAutomation:
         self.app.add_url_rule(rule="/dashboard", view_func=self.launchDashboard)
 
         self.app.add_url_rule(rule='/gpioToggle', view_func=self.hw.gpioToggle, methods=["GET"])
+        self.app.add_url_rule(rule='/gpioToggle/<command_id>', view_func=self.hw.gpioStatus, methods=["GET"])
         self.app.add_url_rule(rule='/liveView', view_func=self.launchLiveView)
         self.app.add_url_rule(rule='/logbook', view_func=self.launchLogs)
+        self.app.add_url_rule(rule='/api/logs', view_func=self.apiLogs)
+        self.app.add_url_rule(rule='/api/stats', view_func=self.apiStats)
+        self.app.add_url_rule(rule='/api/archives', view_func=self.apiArchives)
         self.app.add_url_rule(rule='/cameraView', view_func=self.hw.cameraView)
         self.app.add_url_rule('/linuxCam', view_func=self.launchLinuxCam)
         self.app.add_url_rule('/linuxCamStream', view_func=self.hw.intialiseLinuxCam)
         self.app.add_url_rule('/PIZeroCam', view_func=self.launchPIZeroCam)
         self.app.add_url_rule('/piZeroCamStream', view_func=self.hw.initialisePiZeroCam)
+        self.app.add_url_rule('/snapshot/<camera>', view_func=self.hw.snapshot)
+        self.app.add_url_rule('/clips', view_func=self.hw.clipList)
+        self.app.add_url_rule('/clips/<camera>', view_func=self.hw.clip)
+        self.app.add_url_rule('/doorState', view_func=self.hw.doorState)
+        self.app.add_url_rule('/streamStats', view_func=self.hw.streamStats)
+        self.app.add_url_rule('/events', view_func=self.eventStream)
         self.app.add_url_rule(rule='/admin', view_func=self.launchAdmin)
 
+        # Fingerprinted, precompressed static files and precompiled templates (see StaticAssets).
+        self.assets: StaticAssets = StaticAssets(app=self.app)
+
+        if REGISTRY.enabled:
+            self.request_seconds = REGISTRY.histogram(
+                "garage_request_seconds",
+                "Time from request start to the response being returned by the view (first byte for streams).",
+                labels=("route", "method", "status")
+            )
+            self.app.before_request(self.start_timer)
+            self.app.after_request(self.record_timer)
+            self.metrics_token: Optional[str] = os.getenv(key='METRICS_TOKEN') or None
+            self.app.add_url_rule('/metrics', view_func=self.metrics)
+
+        # Construction only (migrations, managers, routes). Hardware libraries load later, on first use.
+        self.startup_seconds: float = perf_counter() - start
+        REGISTRY.collector(
+            "garage_event_clients", "Pages connected to /events.", "gauge",
+            lambda: [({}, self.events.client_count())]
+        )
+        REGISTRY.collector(
+            "garage_startup_seconds", "Time taken to construct the app at startup.", "gauge",
+            lambda: [({}, self.startup_seconds)]
+        )
+        REGISTRY.collector(
+            "garage_user_agent_cache_total", "User-Agent parse cache lookups by result.", "counter",
+            lambda: [({"result": "hit"}, uap.stats()["hits"]), ({"result": "miss"}, uap.stats()["misses"])]
+        )
+        REGISTRY.collector(
+            "garage_user_agent_cache_entries", "Parsed User-Agent strings held in the cache.", "gauge",
+            lambda: [({}, uap.stats()["size"])]
+        )
+        REGISTRY.collector(
+            "garage_geoip_lookups_total", "IP geolocation lookups answered from memory (hit), ip_logs (db_hit), resolved in the background (miss) or unresolved (failure).", "counter",
+            lambda: [({"result": result}, self.geo.stats()[key]) for result, key in (("hit", "hits"), ("db_hit", "db_hits"), ("miss", "misses"), ("failure", "failures"))]
+        )
+        REGISTRY.collector(
+            "garage_geoip_entries", "IP locations cached in memory (cached) and waiting for a background lookup (pending).", "gauge",
+            lambda: [({"state": state}, self.geo.stats()[state]) for state in ("cached", "pending")]
+        )
+
     # HTML Views #
-    def launchPage(self) -> str:
+    def launchPage(self) -> Response:
         """
         Method to render the login page.
         """
-        return render_template(template_name_or_list='login.html')
+        return self.assets.render(template='login.html')
     
-    def launchDashboard(self) -> str:
+    def launchDashboard(self) -> Response:
         """
-        Method to redirect user to login page if logged_in flag is False.
+        Method to redirect user to login page if logged_in flag is False or the session has expired.
         Otherwise user will be redirected to the dashboard.
+        Revisits are answered 304 without rendering while the user, role and build are unchanged.
         """
-        if not session.get("logged_in"):
+        identity: Optional[dict[str, Any]] = self.db.current_user()
+        if not session.get("logged_in") or identity is None:
             return redirect("/")
 
-        return render_template(
-            template_name_or_list='dashboard.html',
-            user=self.db.user if hasattr(self.db, "user") else None,
-            role=self.db.role if hasattr(self.db, "role") else None
+        return self.assets.render(
+            template='dashboard.html',
+            user=identity["username"],
+            role=identity["role"]
         )
 
-    def launchLiveView(self) -> str:
+    def launchLiveView(self) -> Response:
         """
         Method to redirect user to live view page if logged_in flag is False.
         Otherwise user will be redirected to the dashboard.
@@ -74,33 +178,122 @@ class GarageAutomation:
         if not session.get("logged_in"):
             return redirect("/")
 
-        return render_template(template_name_or_list='liveView.html')
+        return self.assets.render(template='liveView.html')
 
-    def launchLogs(self) -> str:
+    def launchLogs(self) -> Response:
         """
         Method to redirect user to access log page if logged_in flag is False.
         Otherwise user will be redirected to the dashboard.
+        The page only renders the shell, rows are fetched a page at a time from /api/logs,
+        so revisits are answered 304 until the hardware filter options or the build change.
         """
         if not session.get("logged_in"):
             return redirect("/")
 
-        rows, hw_cols = self.db.retrieve_logs()
-        return render_template(template_name_or_list='logs.html', rows=rows, hw_cols=hw_cols)
+        return self.assets.render(template='logs.html', hardware=self.db.hardware_list())
+
+    def apiLogs(self) -> tuple[Response, int]:
+        """
+        JSON endpoint returning one keyset paginated page of the logbook.
+
+        Query parameters:
+            cursor : next_cursor from the previous page
+            limit : page size (default 20, max 100)
+            user, from, to, hardware : optional filters (dates as YYYY-MM-DD)
+        """
+        if not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+
+        try:
+            date_from: Optional[str] = self.date_arg(name="from")
+            date_to: Optional[str] = self.date_arg(name="to")
+        except ValueError as e:
+            return jsonify({"status": "fail", "message": str(e)}), 400
+
+        try:
+            page: dict[str, Any] = self.db.logs_page(
+                cursor_token=request.args.get("cursor"),
+                limit=request.args.get("limit", default=20, type=int),
+                username=request.args.get("user") or None,
+                date_from=date_from,
+                date_to=date_to,
+                hardware=request.args.get("hardware") or None
+            )
+        except dbm.InvalidCursor:
+            return jsonify({"status": "fail", "message": "Invalid cursor"}), 400
+
+        return jsonify(page), 200
+
+    def apiStats(self) -> tuple[Response, int]:
+        """
+        JSON endpoint returning daily hardware usage per user, read from the daily_usage rollup.
+
+        Query parameters:
+            from, to : inclusive YYYY-MM-DD range (defaults to the last 30 days)
+            user : optional username filter
+        """
+        if not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+
+        try:
+            date_from: Optional[str] = self.date_arg(name="from")
+            date_to: Optional[str] = self.date_arg(name="to")
+        except ValueError as e:
+            return jsonify({"status": "fail", "message": str(e)}), 400
+
+        today: date = date.today()
+        stats: list[dict[str, Any]] = self.db.usage_stats(
+            date_from=date_from or (today - timedelta(days=30)).isoformat(),
+            date_to=date_to or today.isoformat(),
+            username=request.args.get("user") or None
+        )
+        return jsonify({"rows": stats}), 200
+
+    def apiArchives(self) -> tuple[Response, int]:
+        """
+        JSON endpoint listing the monthly log archives written by the retention job (LOG_RETENTION_DAYS),
+        and the job's counters when it is enabled.
+        """
+        if not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+
+        return jsonify({
+            "archives": self.db.archive_list(),
+            "retention": self.db.retention.stats() if self.db.retention is not None else None
+        }), 200
+
+    def eventStream(self) -> Response | tuple[Response, int]:
+        """
+        Server-Sent Events stream of live state for the dashboard and logbook pages:
+            relay : a new /gpioToggle command
+            door : door state changes (as /doorState)
+            login : a new login (as a /api/logs row)
+            viewers : connected viewers per camera, when it changes
+        The latest door and viewers events are sent on connect. Served natively by asgi.py in production.
+        """
+        if not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+        return Response(
+            self.events.stream(),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
 
-    def launchAdmin(self) -> str|Response:
+    def launchAdmin(self) -> Response:
         """
         Method to redirect user to admin panel page if logged_in flag is False and user is admin.
         Otherwise user will be redirected to the dashboard.
         """
-        if self.db.role == 'admin':
-            return render_template(
-                template_name_or_list='admin.html',
+        identity: Optional[dict[str, Any]] = self.db.current_user()
+        if identity is not None and identity["role"] == 'admin':
+            return self.assets.render(
+                template='admin.html',
                 users=self.db.userList()
             )
         else:
             return redirect("/")
 
-    def launchLinuxCam(self) -> str:
+    def launchLinuxCam(self) -> Response:
         """
         Method to redirect user to live view from Linux Laptop if logged_in flag is False.
         Otherwise user will be redirected to the dashboard.
@@ -108,9 +301,9 @@ class GarageAutomation:
         if not session.get("logged_in"):
             return redirect("/")
 
-        return render_template(template_name_or_list='linuxCam.html')
+        return self.assets.render(template='linuxCam.html')
 
-    def launchPIZeroCam(self) -> str:
+    def launchPIZeroCam(self) -> Response:
         """
         Method to redirect user to live view from Linux Laptop if logged_in flag is False.
         Otherwise user will be redirected to the dashboard.
@@ -118,84 +311,96 @@ class GarageAutomation:
         if not session.get("logged_in"):
             return redirect("/")
 
-        return render_template(template_name_or_list='kitchenView.html')
+        return self.assets.render(template='kitchenView.html')
+
+    @staticmethod
+    def date_arg(name: str) -> Optional[str]:
+        """
+        Returns the date query parameter name as YYYY-MM-DD, None if it is missing or empty.
+        The date columns are compared as text, so other ISO 8601 forms are normalised first.
+
+        Raises:
+            ValueError : The parameter is not a date.
+        """
+        value: Optional[str] = request.args.get(name)
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value).isoformat()
+        except ValueError:
+            raise ValueError(f"Invalid date: {name}") from None
+
+    @staticmethod
+    def door_references(path: Optional[str]) -> Optional[dict[str, tuple[float, float]]]:
+        """
+        Loads door classifier references written by python DoorClassifier.py <frames> --calibrate.
+        """
+        if not path:
+            return None
+        with open(path) as f:
+            return {state: tuple(value) for state, value in json.load(f).items()}
+
+    # Metrics #
+    def start_timer(self) -> None:
+        g.request_start = perf_counter()
+
+    def record_timer(self, response: Response) -> Response:
+        """
+        Records request latency labelled by the matched route pattern, which keeps label cardinality bounded.
+        """
+        start: Optional[float] = g.get("request_start")
+        if start is not None:
+            route: str = request.url_rule.rule if request.url_rule else "unmatched"
+            self.request_seconds.observe(perf_counter() - start, route, request.method, str(response.status_code))
+        return response
+
+    def metrics(self) -> Response | tuple[Response, int]:
+        """
+        Prometheus text exposition of every registered metric.
+        Scrapers authenticate with 'Authorization: Bearer <METRICS_TOKEN>'. Without a METRICS_TOKEN
+        only logged in users can read it, like the other stats endpoints.
+        """
+        if self.metrics_token:
+            if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {self.metrics_token}"):
+                return jsonify({"status": "fail", "message": "Invalid metrics token"}), 401
+        elif not session.get("logged_in"):
+            return jsonify({"status": "fail", "message": "Not logged in"}), 401
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
     # IP & User Metadata #
     def ip_find(self) -> dict[str, str | float | None]:
         """
         Method to record metedata related to IP addresses when a user logs in.
+        Never waits on a third party lookup: unknown addresses (and the network's public address
+        for LAN clients) are resolved by self.geo in the background and backfilled into ip_logs.
 
         Returns:
             A dictionary of relevant metadata.
         """
-        ip: Optional[str] = request.headers.get("CF-Connecting-IP")
-        if not ip:
-            xff: Optional[str] = request.headers.get("X-Forwarded-For")
-            if xff:
-                ip: str = xff.split(",")[0].strip()
-            else:
-                ip: Optional[str] = request.remote_addr
-
-        # If IP is private, make a GET request to "https://api.ipify.org" to return the public address.
-        if ip.startswith("127.") or ip.startswith("192.168.") or ip.startswith("10."):
-            try:
-                ip: str = requests.get("https://api.ipify.org").text
-            except:
-                ip: str = ip
-
-        try:
-            ip_metadata: Response = requests.get(f"http://ipinfo.io/{ip}/json")
-            if ip_metadata.status_code == 200:
-                data: Optional[Any] = ip_metadata.json()
-                ip_data: dict[str, str | float] = {
-                    "ip_address": ip,
-                    "city": data.get("city"),
-                    "region": data.get("region"),
-                    "country": data.get("country"),
-                    "latitude": float(data.get("loc").split(",")[0]),
-                    "longitude": float(data.get("loc").split(",")[1])
-                }
-                return ip_data
-
-        except Exception:
-            ip_data: dict[str, str | None] = {
-                "ip": ip,
-                "city": None,
-                "region": None,
-                "country": None,
-                "latitude": None,
-                "longitude": None
-            }
-            return ip_data
+        return self.geo.locate(ip=client_ip(request=request))
 
     def user_info(self) -> dict[Optional[str]]:
         """
         Method to return metadata about the device used to access the app.
-        
+        Parsing is memoized per User-Agent string (see UserAgentParser), and skipped entirely
+        when UA_PARSE_LAZY is set, leaving it to the logbook.
+
         Returns:
             A dictionary of relevant metadata.
-        
-        """
-        user_agent: Any = parse(user_agent_string=request.headers.get("User-Agent"))
-        browser: Any = user_agent.browser.family
-        browser_version: Any = user_agent.browser.version_string
-        operating_system: Any = user_agent.os.family
-        os_version: Any = user_agent.os.version_string
-        device: Any = user_agent.device.family
-
-        return {
-            "browser": browser,
-            "browser_version": browser_version,
-            "os": operating_system,
-            "os_version": os_version,
-            "device": device
-        }
+
+        """
+        user_agent: Optional[str] = request.headers.get("User-Agent")
+        if self.ua_parse_lazy:
+            return {"user_agent": user_agent}
+
+        return {**uap.parse_user_agent(user_agent=user_agent), "user_agent": user_agent}
 
     # Run
     def run(self) -> None: 
         """
-        Method that runs the Flask website.
+        Method that runs the Flask website on the development server.
         Utilises host 0.0.0.0 to allow external access.
+        In production serve asgi.py instead (python asgi.py), which streams cameras without a thread per viewer.
         """
         self.app.run(host='0.0.0.0', port=5000, debug=False)
 
@@ -204,6 +409,8 @@ def create_app() -> Flask:
     Method to create instance of Flask app.
     """
     garage: GarageAutomation = GarageAutomation()
+    # Exposed so asgi.py can serve the streaming routes natively from the same managers.
+    garage.app.extensions["garage"] = garage
     return garage.app
 
 app: Flask = create_app()
@@ -0,0 +1,289 @@
+"""
+Production entry point: serves the Flask app under an asyncio (ASGI) server.
+
+The MJPEG routes (/cameraView, /linuxCamStream, /piZeroCamStream and the /clips/<camera> playback)
+are handled natively as async generators reading from the shared FrameHub and StreamRelay objects, so each viewer is a coroutine
+instead of a pinned OS thread. So is the /events Server-Sent Events stream, where an idle tab is a coroutine waiting on its queue. Every other route is passed through to the existing Flask views on a
+small bounded thread pool, so /gpioToggle stays responsive however many viewers are connected.
+
+Run with:
+    python asgi.py
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import io, os, sys, asyncio, uvicorn
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+from flask import session
+from app import app as flask_app, GarageAutomation
+from HardwareManager import PART_HEADER, PART_TRAILER
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+class GarageASGI:
+    def __init__(self, garage: GarageAutomation, wsgi_threads: int = 8) -> None:
+        """
+        ASGI application dispatching the streaming routes to async handlers and everything else to Flask.
+
+        Parameters:
+            garage : GarageAutomation
+                The application whose hardware managers back the streams.
+            wsgi_threads : int
+                Threads available to the (short lived) Flask requests.
+        """
+        self.garage: GarageAutomation = garage
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=wsgi_threads, thread_name_prefix="wsgi")
+        self.streams: dict[str, Callable[[Scope], tuple[AsyncIterator[bytes], str]]] = {
+            "/cameraView": self.cameraView,
+            "/linuxCamStream": self.linuxCamStream,
+            "/piZeroCamStream": self.piZeroCamStream,
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive=receive, send=send)
+            return
+
+        if scope["type"] != "http":
+            return
+
+        if scope["path"].startswith("/clips/") and scope["method"] == "GET":
+            await self.clip(scope=scope, receive=receive, send=send)
+            return
+
+        if scope["path"] == "/events" and scope["method"] == "GET":
+            await self.eventStream(scope=scope, receive=receive, send=send)
+            return
+
+        handler: Optional[Callable] = self.streams.get(scope["path"])
+        if handler is None or scope["method"] != "GET":
+            await self.wsgi(scope=scope, receive=receive, send=send)
+            return
+
+        # The handlers log the view against the requesting user, resolved from the session cookie.
+        with self.garage.app.request_context(self.environ(scope=scope, body=b"")):
+            frames, content_type = handler(scope)
+        await self.stream(frames=frames, content_type=content_type, receive=receive, send=send)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message: dict[str, Any] = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def environ(self, scope: Scope, body: bytes) -> dict[str, Any]:
+        """
+        Builds a PEP 3333 environ for the Flask app from an ASGI HTTP scope.
+        """
+        server: tuple[str, int] = scope.get("server") or ("localhost", 80)
+        client: tuple[str, int] = scope.get("client") or ("", 0)
+        environ: dict[str, Any] = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for raw_name, raw_value in scope.get("headers", []):
+            name: str = raw_name.decode("latin-1").upper().replace("-", "_")
+            value: str = raw_value.decode("latin-1")
+            if name == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif name == "CONTENT_LENGTH":
+                environ["CONTENT_LENGTH"] = value
+            else:
+                key: str = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def run_wsgi(self, environ: dict[str, Any]) -> tuple[int, list[tuple[bytes, bytes]], bytes]:
+        """
+        Runs one Flask request to completion on a worker thread.
+        Streaming routes never reach here, so buffering the body is fine.
+        """
+        response: dict[str, Any] = {}
+
+        def start_response(status: str, headers: list[tuple[str, str]], exc_info: Any = None) -> Callable[[bytes], None]:
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+            return lambda data: None
+
+        result: Iterable[bytes] = self.garage.app(environ, start_response)
+        try:
+            body: bytes = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], response["headers"], body
+
+    async def wsgi(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Passes a request through to Flask on the bounded thread pool.
+        """
+        chunks: list[bytes] = []
+        while True:
+            message: dict[str, Any] = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+
+        environ: dict[str, Any] = self.environ(scope=scope, body=b"".join(chunks))
+        status, headers, body = await asyncio.get_running_loop().run_in_executor(self.executor, self.run_wsgi, environ)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def send_response(self, response: Any, status: int, send: Send) -> None:
+        """
+        Sends a (small, buffered) Flask response, e.g. the error returned by a view's checks.
+        """
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()],
+        })
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+    async def stream(
+        self,
+        frames: AsyncIterator[bytes],
+        content_type: str,
+        receive: Receive,
+        send: Send,
+        headers: Optional[list[tuple[bytes, bytes]]] = None
+    ) -> None:
+        """
+        Sends a multipart stream until the client disconnects. await send() applies the transport's
+        flow control, so a slow client only delays its own coroutine (and skips frames in the hub).
+        """
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type.encode("latin-1")), (b"cache-control", b"no-cache")] + (headers or []),
+        })
+
+        async def pump() -> None:
+            async for part in frames:
+                await send({"type": "http.response.body", "body": part, "more_body": True})
+            # Finite streams (clip playback) end the response once the frames run out.
+            await send({"type": "http.response.body", "body": b""})
+
+        async def disconnected() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        tasks: list[asyncio.Task] = [asyncio.create_task(pump()), asyncio.create_task(disconnected())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Runs the generator's finally block, unsubscribing from the hub/relay.
+            await frames.aclose()
+
+    # Streaming routes, mirroring HardwareManager.cameraView / intialiseLinuxCam / initialisePiZeroCam.
+    def cameraView(self, scope: Scope) -> tuple[AsyncIterator[bytes], str]:
+        hw: Any = self.garage.hw
+        query: dict[str, list[str]] = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        profile, adapt = hw.stream_profile(requested=query.get("profile", [None])[0])
+        hw.hw_logger(hardware='Garage Camera')
+
+        async def generate_frames() -> AsyncIterator[bytes]:
+            # The shared frame is sent as is between the part header and trailer, rather than
+            # concatenated into a new bytes object per client.
+            async for frame_bytes in hw.frame_hub.aframes(profile=profile, adapt=adapt):
+                yield PART_HEADER
+                yield frame_bytes
+                yield PART_TRAILER
+
+        return hw.awatching(camera="pi", parts=generate_frames()), 'multipart/x-mixed-replace; boundary=frame'
+
+    def linuxCamStream(self, scope: Scope) -> tuple[AsyncIterator[bytes], str]:
+        self.garage.hw.hw_logger(hardware='Living Room Camera')
+        return self.garage.hw.awatching(camera="linux", parts=self.garage.hw.linux_relay.aframes()), 'multipart/x-mixed-replace; boundary=--boundarydonotcross'
+
+    def piZeroCamStream(self, scope: Scope) -> tuple[AsyncIterator[bytes], str]:
+        self.garage.hw.hw_logger(hardware='Kitchen Camera')
+        return self.garage.hw.awatching(camera="piZero", parts=self.garage.hw.piZero_relay.aframes()), 'multipart/x-mixed-replace; boundary=frame'
+
+    async def clip(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Mirrors HardwareManager.clip. Frames are read from the clip ring on the default executor
+        (the map may page in from disk) and paced with asyncio.sleep, so playback holds no thread.
+        """
+        hw: Any = self.garage.hw
+        with self.garage.app.request_context(self.environ(scope=scope, body=b"")):
+            frames, speed, error = hw.clip_request(camera=scope["path"][len("/clips/"):])
+            if error is not None:
+                await self.send_response(*error, send=send)
+                return
+
+        async def generate_frames() -> AsyncIterator[bytes]:
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            previous: Optional[float] = None
+            while True:
+                item: Optional[tuple[float, bytes]] = await loop.run_in_executor(None, next, frames, None)
+                if item is None:
+                    return
+                timestamp, jpeg = item
+                await asyncio.sleep(hw.clip_delay(previous=previous, timestamp=timestamp, speed=speed))
+                previous = timestamp
+                yield PART_HEADER
+                yield jpeg
+                yield PART_TRAILER
+
+        await self.stream(frames=generate_frames(), content_type='multipart/x-mixed-replace; boundary=frame', receive=receive, send=send)
+
+    async def eventStream(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Mirrors GarageAutomation.eventStream, reading from the shared EventBus.
+        """
+        with self.garage.app.request_context(self.environ(scope=scope, body=b"")):
+            if not session.get("logged_in"):
+                await self.send_response(*self.garage.eventStream(), send=send)
+                return
+
+        await self.stream(
+            frames=self.garage.events.astream(),
+            content_type='text/event-stream',
+            receive=receive,
+            send=send,
+            headers=[(b"x-accel-buffering", b"no")]
+        )
+
+application: GarageASGI = GarageASGI(garage=flask_app.extensions["garage"])
+
+def main() -> None:
+    """
+    Serves the application with uvicorn on a single asyncio event loop.
+    """
+    uvicorn.run(
+        application,
+        host=os.getenv(key='HOST', default='0.0.0.0'),
+        port=int(os.getenv(key='PORT', default=5000)),
+        lifespan="on",
+        log_level="warning",
+        # Camera and /events streams never finish on their own, cancel them instead of waiting forever on shutdown.
+        timeout_graceful_shutdown=5
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark of the Pi camera encode paths: software (capture_array + cv2.imencode + tobytes + multipart
+concatenation per viewer) against hardware (Picamera2 MJPEGEncoder, frame written between a separate
+part header and trailer).
+
+Reports frames per second, process CPU% and bytes copied per frame (raw capture, tobytes and multipart
+concatenation for the software path, the encoder buffer handed over by Picamera2 for the hardware path).
+The software path runs anywhere on synthetic frames, the hardware path needs a Pi camera and is
+skipped elsewhere.
+
+Usage (from the repository root):
+    python benchmarks/camera_encode_benchmark.py --seconds 10 --viewers 4
+"""
+import os, sys, json, argparse
+import numpy as np
+from time import perf_counter, process_time
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from EncodeLadder import EncodeLadder
+
+# Same framing as HardwareManager.PART_HEADER / PART_TRAILER, kept local so the software path runs without picamera2.
+PART_HEADER: bytes = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+PART_TRAILER: bytes = b'\r\n'
+
+def synthetic_frames(width: int, height: int) -> Callable[[], np.ndarray]:
+    """
+    Returns a capture function producing a gradient with a moving block, standing in for capture_array().
+    Each call allocates a new array like Picamera2 does.
+    """
+    base: np.ndarray = np.tile(np.linspace(0, 255, width, dtype=np.uint8)[None, :, None], (height, 1, 3))
+    state: dict[str, int] = {"x": 0}
+
+    def capture() -> np.ndarray:
+        frame: np.ndarray = base.copy()
+        state["x"] = x = (state["x"] + 16) % (width - 64)
+        frame[height // 2 - 32:height // 2 + 32, x:x + 64] = 255
+        return frame
+
+    return capture
+
+def measure(step: Callable[[], Optional[int]], seconds: float) -> dict[str, Any]:
+    """
+    Runs step until seconds have passed. step returns the bytes copied for one frame, or None if no frame was ready.
+    """
+    frames: int = 0
+    copied: int = 0
+    wall_start: float = perf_counter()
+    cpu_start: float = process_time()
+    while perf_counter() - wall_start < seconds:
+        result: Optional[int] = step()
+        if result is not None:
+            frames += 1
+            copied += result
+    wall: float = perf_counter() - wall_start
+    cpu: float = process_time() - cpu_start
+    return {
+        "fps": round(frames / wall, 1),
+        "cpu_percent": round(cpu / wall * 100, 1),
+        "bytes_copied_per_frame": int(copied / frames) if frames else None
+    }
+
+def software(seconds: float, viewers: int, width: int, height: int) -> dict[str, Any]:
+    capture: Callable[[], np.ndarray] = synthetic_frames(width=width, height=height)
+    ladder: EncodeLadder = EncodeLadder()
+    sink: list[Any] = []
+
+    def step() -> int:
+        frame: np.ndarray = capture()
+        data: Optional[bytes] = ladder.encode(frame, "high")
+        copied: int = frame.nbytes + len(data)
+        for _ in range(viewers):
+            part: bytes = PART_HEADER + data + PART_TRAILER
+            sink.append(part)
+            copied += len(part)
+        sink.clear()
+        return copied
+
+    return measure(step=step, seconds=seconds)
+
+def hardware(seconds: float, viewers: int, width: int, height: int) -> dict[str, Any]:
+    try:
+        from MjpegCamera import MjpegCamera
+        camera: MjpegCamera = MjpegCamera(size=(width, height))
+        camera.start()
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+    sink: list[Any] = []
+
+    def step() -> Optional[int]:
+        data: Optional[bytes] = camera.capture()
+        if data is None:
+            return None
+        for _ in range(viewers):
+            sink.extend((PART_HEADER, memoryview(data), PART_TRAILER))
+        sink.clear()
+        # Picamera2 copies the encoder's V4L2 buffer into bytes once, nothing after that.
+        return len(data)
+
+    try:
+        return measure(step=step, seconds=seconds)
+    finally:
+        camera.stop()
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--viewers", type=int, default=4)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args: argparse.Namespace = parser.parse_args()
+
+    report: dict[str, Any] = {
+        "resolution": f"{args.width}x{args.height}",
+        "viewers": args.viewers,
+        "software": software(seconds=args.seconds, viewers=args.viewers, width=args.width, height=args.height),
+        "hardware": hardware(seconds=args.seconds, viewers=args.viewers, width=args.width, height=args.height)
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Micro-benchmark of the pooled SQLite path (ConnectionPool) against the previous connect-per-operation path.
+
+Measures the database side of:
+    login         : user lookup done by validateLogin/store_login_data
+    log_insert    : single hardware_logs INSERT
+    retrieve_logs : the full logbook join and hardware pivot previously run by every /logbook view
+
+Usage (from the repository root):
+    python benchmarks/db_pool_benchmark.py --rows 5000 --iterations 2000
+"""
+import os, sys, json, sqlite3, argparse, tempfile
+from time import perf_counter
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Callable, Generator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ConnectionPool import ConnectionPool
+from dbManager import dbManager
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HARDWARE: tuple[str, ...] = ("Garage FOB", "Garage Camera", "Living Room Camera", "Kitchen Camera")
+LOGGED_AT: int = int(datetime(2025, 1, 1).timestamp())
+
+def seed(db: str, rows: int) -> None:
+    manager: dbManager = dbManager(ip_dict=dict, user_dict=dict, db=db)
+    manager.migrate()
+    manager.pool.close()
+
+    conn: sqlite3.Connection = sqlite3.connect(db)
+    conn.execute("INSERT INTO users (username, role, password) VALUES ('bench', 'admin', 'x')")
+    conn.execute("INSERT INTO ip_logs VALUES ('1.1.1.1', 'City', 'Region', 'AU', 0, 0)")
+    conn.executemany(
+        "INSERT INTO logbook (user_id, session_id, ip_address, login_date, login_time, browser, browser_version, os, os_version, device) VALUES (1, ?, '1.1.1.1', ?, ?, 'Safari', '17', 'iOS', '17', 'iPhone')",
+        [(f"s{i}", f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}", f"{i % 24:02d}:{i % 60:02d}:00") for i in range(rows)]
+    )
+    conn.executemany(
+        "INSERT INTO hardware_logs (session_id, user_id, timestamp, hardware, logged_at) VALUES (?, 1, '2025-01-01 00:00:00', ?, ?)",
+        [(f"s{i % rows}", HARDWARE[i % len(HARDWARE)], LOGGED_AT) for i in range(rows * 3)]
+    )
+    conn.commit()
+    conn.close()
+
+def legacy(db: str) -> Callable:
+    @contextmanager
+    def connect() -> Generator[sqlite3.Cursor, None, None]:
+        conn: sqlite3.Connection = sqlite3.connect(database=db, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn.cursor()
+        finally:
+            conn.close()
+    return connect
+
+def pooled(pool: ConnectionPool) -> Callable:
+    @contextmanager
+    def connect() -> Generator[sqlite3.Cursor, None, None]:
+        with pool.connection() as conn:
+            yield conn.cursor()
+    return connect
+
+def retrieve_logs_sql() -> str:
+    with open(os.path.join(ROOT, "db", "logs.sql")) as f:
+        main_sql: str = f.read().strip()
+    cases: str = ", ".join(f"SUM(CASE WHEN hardware = '{h}' THEN 1 ELSE 0 END) AS '{h}'" for h in HARDWARE)
+    return f"""
+        SELECT ms.*, hq.* FROM ({main_sql}) ms
+        INNER JOIN (SELECT session_id, {cases} FROM hardware_logs GROUP BY session_id) hq
+        ON ms.session_id = hq.session_id
+    """
+
+def run(connect: Callable, iterations: int, query: str) -> dict[str, float]:
+    ops: dict[str, Callable[[sqlite3.Cursor], None]] = {
+        "login": lambda c: (
+            c.execute("SELECT password, role FROM users WHERE username = ?", ("bench",)).fetchone(),
+            c.execute("SELECT id FROM users WHERE username = ?", ("bench",)).fetchone()
+        ),
+        "log_insert": lambda c: c.execute(
+            "INSERT INTO hardware_logs (session_id, user_id, timestamp, hardware, logged_at) VALUES ('bench', 1, '2025-01-01 00:00:00', 'Garage FOB', ?)",
+            (LOGGED_AT,)
+        ),
+        "retrieve_logs": lambda c: c.execute(query).fetchall(),
+    }
+    results: dict[str, float] = {}
+    for name, op in ops.items():
+        n: int = max(1, iterations // 50) if name == "retrieve_logs" else iterations
+        start: float = perf_counter()
+        for _ in range(n):
+            with connect() as cursor:
+                op(cursor)
+        results[name + "_us"] = round((perf_counter() - start) / n * 1e6, 1)
+    return results
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args: argparse.Namespace = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        query: str = retrieve_logs_sql()
+        report: dict[str, dict[str, float]] = {}
+
+        db: str = os.path.join(tmp, "legacy.db")
+        seed(db=db, rows=args.rows)
+        report["legacy"] = run(connect=legacy(db=db), iterations=args.iterations, query=query)
+
+        db = os.path.join(tmp, "pooled.db")
+        seed(db=db, rows=args.rows)
+        pool: ConnectionPool = ConnectionPool(db=db)
+        report["pooled"] = run(connect=pooled(pool=pool), iterations=args.iterations, query=query)
+        pool.close()
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
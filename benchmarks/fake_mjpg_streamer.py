@@ -0,0 +1,111 @@
+"""
+Local stand-in for the cameras proxied by the app, serving synthetic JPEG frames:
+    /?action=stream  mjpg-streamer on the Linux laptop (boundary boundarydonotcross)
+    /camera          the Pi Zero camera (boundary frame)
+
+Used by benchmarks/load_test.py, or on its own for development with LINUX_IP=PIZERO_IP=127.0.0.1
+(HardwareManager always connects to port 8080):
+    python benchmarks/fake_mjpg_streamer.py --port 8080 --fps 15
+"""
+import os, sys, argparse
+from time import sleep, monotonic, time
+from threading import Thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from CameraBackend import SimulatedCamera
+
+# Path -> multipart boundary, matching the upstream servers StreamRelay is configured for.
+BOUNDARIES: dict[str, bytes] = {
+    "/?action=stream": b"boundarydonotcross",
+    "/camera": b"frame",
+}
+
+def synthetic_jpegs(count: int, size: tuple[int, int]) -> list[bytes]:
+    camera: SimulatedCamera = SimulatedCamera(size=size, fps=1000.0, jpeg=True)
+    camera.start()
+    frames: list[bytes] = [camera.capture() for _ in range(count)]
+    camera.stop()
+    return frames
+
+class FakeMjpgStreamer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, fps: float = 15.0, size: tuple[int, int] = (640, 480)) -> None:
+        """
+        Threaded HTTP server streaming a loop of pre-encoded frames to every client at fps,
+        so the upstream side of a benchmark costs next to no CPU.
+
+        Parameters:
+            fps : float
+                Frames per second sent to each client.
+            size : tuple[int, int]
+                (width, height) of the frames.
+        """
+        self.fps: float = fps
+        self.frames: list[bytes] = synthetic_jpegs(count=30, size=size)
+        self.connections: int = 0
+        self.frames_sent: int = 0
+        self.server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        self.thread: Optional[Thread] = None
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        streamer: FakeMjpgStreamer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                boundary: Optional[bytes] = BOUNDARIES.get(self.path)
+                if boundary is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={boundary.decode()}")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                streamer.serve(wfile=self.wfile, boundary=boundary)
+
+        return Handler
+
+    def serve(self, wfile, boundary: bytes) -> None:
+        self.connections += 1
+        interval: float = 1 / self.fps
+        next_frame: float = monotonic()
+        i: int = 0
+        try:
+            while True:
+                jpeg: bytes = self.frames[i % len(self.frames)]
+                wfile.write(
+                    b"--" + boundary + b"\r\nContent-Type: image/jpeg\r\nContent-Length: " + str(len(jpeg)).encode()
+                    + b"\r\nX-Timestamp: " + f"{time():.6f}".encode() + b"\r\n\r\n" + jpeg + b"\r\n"
+                )
+                self.frames_sent += 1
+                i += 1
+                next_frame += interval
+                sleep(max(0.0, next_frame - monotonic()))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def start(self) -> None:
+        self.thread = Thread(target=self.server.serve_forever, name="FakeMjpgStreamer", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Serve synthetic MJPEG streams like the proxied cameras.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fps", type=float, default=15.0)
+    args: argparse.Namespace = parser.parse_args()
+
+    streamer: FakeMjpgStreamer = FakeMjpgStreamer(host=args.host, port=args.port, fps=args.fps)
+    print(f"Serving {', '.join(BOUNDARIES)} on http://{args.host}:{args.port}")
+    streamer.server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Load test of the whole app, served by asgi.py (uvicorn) in a subprocess with the simulated camera and
+relay backends, a temporary SQLite database and offline geolocation. A FakeMjpgStreamer on port 8080
+stands in for the Linux laptop and Pi Zero cameras.
+
+Scenarios (all by default, or pick with --scenarios):
+    login    /validateLogin throughput and latency with concurrent clients (real bcrypt at --bcrypt-rounds)
+    gpio     /gpioToggle latency with concurrent clients, plus the relay's own press to pin latency
+    logbook  /logbook and the first /api/logs page as the logbook grows to each of --logbook-sizes
+    viewers  frames per second per viewer and server CPU for 1..--max-viewers concurrent viewers of
+             /cameraView, /linuxCamStream and /piZeroCamStream
+
+Results are printed (and written to --output) as JSON. --compare previous.json adds the relative
+change of every numeric result, so regressions show up run over run.
+
+Usage (from the repository root):
+    python benchmarks/load_test.py --output results.json
+    python benchmarks/load_test.py --scenarios viewers --max-viewers 32 --compare results.json
+"""
+import os, sys, json, socket, sqlite3, argparse, platform, tempfile, subprocess, bcrypt, requests
+from time import sleep, perf_counter, monotonic, strftime
+from statistics import mean, quantiles
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fake_mjpg_streamer import FakeMjpgStreamer
+
+SCENARIOS: tuple[str, ...] = ("login", "gpio", "logbook", "viewers")
+STREAMS: dict[str, bytes] = {
+    "/cameraView": b"--frame",
+    "/linuxCamStream": b"--boundarydonotcross",
+    "/piZeroCamStream": b"--frame",
+}
+PASSWORD: str = "load-test"
+HARDWARE: tuple[str, ...] = ("Garage FOB", "Garage Camera", "Living Room Camera", "Kitchen Camera")
+LOGGED_AT: int = int(datetime(2000, 1, 1).timestamp())
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def latency_summary(samples: list[float]) -> dict[str, float]:
+    """
+    Returns mean, p50, p95, p99 and max of samples (seconds) in milliseconds.
+    """
+    if not samples:
+        return {}
+    cuts: list[float] = quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "mean_ms": round(mean(samples) * 1000, 2),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2)
+    }
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """
+    User + system CPU seconds used by pid so far (Linux /proc only, None elsewhere).
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields: list[str] = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+class AppServer:
+    def __init__(self, db: str, bcrypt_rounds: int, port: int) -> None:
+        """
+        asgi.py in a subprocess, configured for hardware free benchmarking.
+        """
+        self.db: str = db
+        self.bcrypt_rounds: int = bcrypt_rounds
+        self.url: str = f"http://127.0.0.1:{port}"
+        self.env: dict[str, str] = {
+            **os.environ,
+            "DB": db,
+            "SECRET_KEY": "load-test",
+            "HOST": "127.0.0.1",
+            "PORT": str(port),
+            "CAMERA_BACKEND": "simulated",
+            "RELAY_BACKEND": "simulated",
+            "LINUX_IP": "127.0.0.1",
+            "PIZERO_IP": "127.0.0.1",
+            "GEOIP_OFFLINE": "1",
+            "DOOR_INTERVAL": "0",
+            "BCRYPT_ROUNDS": str(bcrypt_rounds),
+        }
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 30.0) -> None:
+        self.process = subprocess.Popen([sys.executable, "asgi.py"], cwd=ROOT, env=self.env)
+        deadline: float = monotonic() + timeout
+        while monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"asgi.py exited with {self.process.returncode}")
+            try:
+                requests.get(self.url + "/", timeout=1)
+                return
+            except requests.ConnectionError:
+                sleep(0.1)
+        raise RuntimeError("asgi.py did not start listening")
+
+    def stop(self) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+
+    def add_users(self, count: int) -> list[str]:
+        """
+        Creates count users sharing PASSWORD, hashed at the server's bcrypt cost so logins never rehash.
+        """
+        hashed: str = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=self.bcrypt_rounds)).decode()
+        usernames: list[str] = [f"user{i}" for i in range(count)]
+        conn: sqlite3.Connection = sqlite3.connect(self.db)
+        conn.executemany("INSERT OR IGNORE INTO users (username, role, password) VALUES (?, 'admin', ?)", [(u, hashed) for u in usernames])
+        conn.commit()
+        conn.close()
+        return usernames
+
+    def login(self, username: str) -> requests.Session:
+        client: requests.Session = requests.Session()
+        response: requests.Response = client.post(self.url + "/validateLogin", json={"username": username, "password": PASSWORD})
+        response.raise_for_status()
+        return client
+
+def run_concurrently(clients: int, requests_per_client: int, call: Callable[[int, int], int]) -> tuple[list[float], dict[str, int], float]:
+    """
+    Runs call(client, i) requests_per_client times on each of clients threads.
+
+    Returns:
+        tuple : Per request latencies, counts per HTTP status and wall time.
+    """
+    def client(c: int) -> list[tuple[float, int]]:
+        results: list[tuple[float, int]] = []
+        for i in range(requests_per_client):
+            start: float = perf_counter()
+            status: int = call(c, i)
+            results.append((perf_counter() - start, status))
+        return results
+
+    start: float = perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results: list[tuple[float, int]] = [r for batch in pool.map(client, range(clients)) for r in batch]
+    wall: float = perf_counter() - start
+
+    statuses: dict[str, int] = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return [latency for latency, _ in results], statuses, wall
+
+def login_scenario(server: AppServer, args: argparse.Namespace) -> dict[str, Any]:
+    usernames: list[str] = server.add_users(count=args.clients)
+    user_agent: str = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
+
+    def call(c: int, i: int) -> int:
+        return requests.post(
+            server.url + "/validateLogin",
+            json={"username": usernames[c], "password": PASSWORD},
+            headers={"User-Agent": user_agent}
+        ).status_code
+
+    latencies, statuses, wall = run_concurrently(clients=args.clients, requests_per_client=args.logins, call=call)
+    return {
+        "clients": args.clients,
+        "bcrypt_rounds": args.bcrypt_rounds,
+        "logins_per_s": round(statuses.get("200", 0) / wall, 2),
+        "status": statuses,
+        "latency": latency_summary(latencies)
+    }
+
+def gpio_scenario(server: AppServer, args: argparse.Namespace) -> dict[str, Any]:
+    session: requests.Session = server.login(username=server.add_users(count=1)[0])
+    cookies: dict[str, str] = session.cookies.get_dict()
+
+    def call(c: int, i: int) -> int:
+        return requests.get(server.url + "/gpioToggle", cookies=cookies).status_code
+
+    latencies, statuses, wall = run_concurrently(clients=args.clients, requests_per_client=args.presses, call=call)
+    # Presses inside the debounce window are coalesced, so pulses is far below requests.
+    relay: dict[str, Any] = session.get(server.url + "/streamStats").json()["relay"]
+    return {
+        "clients": args.clients,
+        "requests_per_s": round(len(latencies) / wall, 2),
+        "status": statuses,
+        "latency": latency_summary(latencies),
+        "relay": relay
+    }
+
+def seed_logbook(db: str, start: int, end: int) -> None:
+    """
+    Appends logins start..end-1 (and three hardware_logs rows each) to the logbook.
+    """
+    def logins():
+        for i in range(start, end):
+            day: int = i // 100
+            yield (
+                1, f"lt{i}",
+                f"{2000 + day // 336:04d}-{1 + day // 28 % 12:02d}-{1 + day % 28:02d}",
+                f"{i % 96 // 4:02d}:{i % 60:02d}:00"
+            )
+
+    def hardware():
+        for i in range(start, end):
+            for j in range(3):
+                yield (f"lt{i}", HARDWARE[(i + j) % len(HARDWARE)], LOGGED_AT)
+
+    conn: sqlite3.Connection = sqlite3.connect(db)
+    conn.execute("INSERT OR IGNORE INTO ip_logs VALUES ('1.1.1.1', 'City', 'Region', 'AU', 0, 0)")
+    conn.executemany(
+        "INSERT INTO logbook (user_id, session_id, ip_address, login_date, login_time, browser, browser_version, os, os_version, device) VALUES (?, ?, '1.1.1.1', ?, ?, 'Safari', '17', 'iOS', '17', 'iPhone')",
+        logins()
+    )
+    conn.executemany("INSERT INTO hardware_logs (session_id, user_id, timestamp, hardware, logged_at) VALUES (?, 1, '2000-01-01 00:00:00', ?, ?)", hardware())
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+def logbook_scenario(server: AppServer, args: argparse.Namespace) -> dict[str, Any]:
+    session: requests.Session = server.login(username=server.add_users(count=1)[0])
+    with sqlite3.connect(server.db) as conn:
+        rows: int = conn.execute("SELECT COUNT(*) FROM logbook").fetchone()[0]
+
+    results: dict[str, Any] = {}
+    for size in sorted(args.logbook_sizes):
+        if size > rows:
+            seed_logbook(db=server.db, start=rows, end=size)
+            rows = size
+        timings: dict[str, list[float]] = {"/logbook": [], "/api/logs": []}
+        for _ in range(args.repeat):
+            for path, samples in timings.items():
+                start: float = perf_counter()
+                session.get(server.url + path).raise_for_status()
+                samples.append(perf_counter() - start)
+        results[str(rows)] = {path: latency_summary(samples) for path, samples in timings.items()}
+    return results
+
+def watch(url: str, delimiter: bytes, seconds: float) -> tuple[int, int]:
+    """
+    Reads a multipart stream for seconds.
+
+    Returns:
+        tuple[int, int] : Parts (frames) and bytes received.
+    """
+    frames: int = 0
+    received: int = 0
+    tail: bytes = b""
+    deadline: float = monotonic() + seconds
+    with requests.get(url, stream=True, timeout=10) as response:
+        for chunk in response.iter_content(chunk_size=65536):
+            received += len(chunk)
+            # Keep a boundary's worth of the previous chunk, in case one is split across chunks.
+            data: bytes = tail + chunk
+            frames += data.count(delimiter)
+            tail = data[-(len(delimiter) - 1):]
+            if monotonic() >= deadline:
+                break
+    return frames, received
+
+def viewers_scenario(server: AppServer, args: argparse.Namespace) -> dict[str, Any]:
+    counts: list[int] = []
+    n: int = 1
+    while n <= args.max_viewers:
+        counts.append(n)
+        n *= 2
+
+    results: dict[str, Any] = {}
+    for path, delimiter in STREAMS.items():
+        results[path] = {}
+        for count in counts:
+            cpu_start: Optional[float] = process_cpu_seconds(pid=server.process.pid)
+            with ThreadPoolExecutor(max_workers=count) as pool:
+                watched: list[tuple[int, int]] = list(pool.map(
+                    lambda _: watch(url=server.url + path, delimiter=delimiter, seconds=args.view_seconds), range(count)
+                ))
+            cpu_end: Optional[float] = process_cpu_seconds(pid=server.process.pid)
+            fps: list[float] = [frames / args.view_seconds for frames, _ in watched]
+            results[path][str(count)] = {
+                "fps_mean": round(mean(fps), 2),
+                "fps_min": round(min(fps), 2),
+                "mbit_per_s": round(sum(received for _, received in watched) * 8 / args.view_seconds / 1e6, 2),
+                "server_cpu_percent": round((cpu_end - cpu_start) / args.view_seconds * 100, 1) if cpu_start is not None and cpu_end is not None else None
+            }
+    return results
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def flatten(value: Any, prefix: str = "") -> dict[str, float]:
+    if isinstance(value, dict):
+        return {k: v for key, item in value.items() for k, v in flatten(item, f"{prefix}{key}.").items()}
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix.rstrip("."): value}
+    return {}
+
+def compare(current: dict[str, Any], previous: dict[str, Any]) -> dict[str, str]:
+    """
+    Relative change of every numeric result present in both runs, e.g. "+12.5%".
+    """
+    before: dict[str, float] = flatten(previous.get("results", {}))
+    after: dict[str, float] = flatten(current["results"])
+    return {
+        key: f"{(after[key] - before[key]) / before[key] * 100:+.1f}%"
+        for key in after if key in before and before[key]
+    }
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients for login and gpio")
+    parser.add_argument("--logins", type=int, default=5, help="Logins per client")
+    parser.add_argument("--presses", type=int, default=50, help="/gpioToggle requests per client")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--logbook-sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per logbook size")
+    parser.add_argument("--max-viewers", type=int, default=16)
+    parser.add_argument("--view-seconds", type=float, default=5.0)
+    parser.add_argument("--upstream-fps", type=float, default=15.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args: argparse.Namespace = parser.parse_args()
+
+    streamer: FakeMjpgStreamer = FakeMjpgStreamer(port=8080, fps=args.upstream_fps)
+    streamer.start()
+    scenarios: dict[str, Callable[[AppServer, argparse.Namespace], dict[str, Any]]] = {
+        "login": login_scenario,
+        "gpio": gpio_scenario,
+        "logbook": logbook_scenario,
+        "viewers": viewers_scenario,
+    }
+
+    report: dict[str, Any] = {
+        "meta": {
+            "time": strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+        },
+        "results": {}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        server: AppServer = AppServer(db=os.path.join(tmp, "load_test.db"), bcrypt_rounds=args.bcrypt_rounds, port=free_port())
+        server.start()
+        try:
+            for name in args.scenarios:
+                report["results"][name] = scenarios[name](server, args)
+        finally:
+            server.stop()
+            streamer.stop()
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["change"] = compare(current=report, previous=json.load(f))
+
+    output: str = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark of the keyset paginated logbook (dbManager.logs_page) against logbook size.
+
+Seeds a temporary database with --rows logins (and three hardware_logs rows per login), then times
+the first page, pages deep into the history, and filtered pages. Latency should stay flat as depth grows.
+
+Usage (from the repository root):
+    python benchmarks/logs_page_benchmark.py --rows 1000000
+"""
+import os, sys, json, base64, sqlite3, argparse, tempfile
+from time import perf_counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dbManager import dbManager
+
+HARDWARE: tuple[str, ...] = ("Garage FOB", "Garage Camera", "Living Room Camera", "Kitchen Camera")
+USERS: tuple[str, ...] = ("alice", "bob", "carol", "dave")
+LOGGED_AT: int = int(datetime(2000, 1, 1).timestamp())
+
+def seed(manager: dbManager, rows: int) -> None:
+    manager.migrate()
+    conn: sqlite3.Connection = sqlite3.connect(manager.db)
+    conn.executemany("INSERT INTO users (username, role, password) VALUES (?, 'read', 'x')", [(u,) for u in USERS])
+    conn.execute("INSERT INTO ip_logs VALUES ('1.1.1.1', 'City', 'Region', 'AU', 0, 0)")
+
+    def logins():
+        for i in range(rows):
+            day: int = i // 100
+            yield (
+                1 + i % len(USERS), f"s{i}",
+                f"{2000 + day // 336:04d}-{1 + day // 28 % 12:02d}-{1 + day % 28:02d}",
+                f"{i % 96 // 4:02d}:{i % 60:02d}:00"
+            )
+
+    def hardware():
+        for i in range(rows):
+            for j in range(3):
+                yield (f"s{i}", HARDWARE[(i + j) % len(HARDWARE)], LOGGED_AT)
+
+    conn.executemany(
+        "INSERT INTO logbook (user_id, session_id, ip_address, login_date, login_time, browser, browser_version, os, os_version, device) VALUES (?, ?, '1.1.1.1', ?, ?, 'Safari', '17', 'iOS', '17', 'iPhone')",
+        logins()
+    )
+    conn.executemany(
+        "INSERT INTO hardware_logs (session_id, user_id, timestamp, hardware, logged_at) VALUES (?, 1, '2000-01-01 00:00:00', ?, ?)",
+        hardware()
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+def cursor_at(manager: dbManager, offset: int) -> str:
+    """
+    Builds the cursor a client would hold after paging down to offset (computed directly, not timed).
+    """
+    with manager.db_connect(operation="benchmark") as cursor:
+        row = cursor.execute(
+            "SELECT login_date, login_time, id FROM logbook ORDER BY login_date DESC, login_time DESC, id DESC LIMIT 1 OFFSET ?",
+            (offset,)
+        ).fetchone()
+    return base64.urlsafe_b64encode(json.dumps(list(row)).encode("utf-8")).decode("ascii")
+
+def timed(fn, repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = perf_counter()
+        fn()
+        best = min(best, perf_counter() - start)
+    return round(best * 1000, 3)
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args: argparse.Namespace = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager: dbManager = dbManager(ip_dict=dict, user_dict=dict, db=os.path.join(tmp, "logs.db"))
+        start: float = perf_counter()
+        seed(manager=manager, rows=args.rows)
+        report: dict[str, object] = {"rows": args.rows, "seed_s": round(perf_counter() - start, 1), "page_ms": {}}
+
+        for depth in (0, args.rows // 100, args.rows // 2, args.rows - 2 * args.limit):
+            token: str | None = cursor_at(manager=manager, offset=depth) if depth else None
+            report["page_ms"][f"depth_{depth}"] = timed(lambda: manager.logs_page(cursor_token=token, limit=args.limit), args.repeat)
+
+        report["page_ms"]["filter_user"] = timed(lambda: manager.logs_page(limit=args.limit, username="carol"), args.repeat)
+        report["page_ms"]["filter_hardware"] = timed(lambda: manager.logs_page(limit=args.limit, hardware="Kitchen Camera"), args.repeat)
+        report["page_ms"]["filter_dates"] = timed(
+            lambda: manager.logs_page(limit=args.limit, date_from="2001-01-01", date_to="2001-06-30"), args.repeat
+        )
+        manager.pool.close()
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of app startup: wall time of a fresh interpreter importing app.py (which constructs
+GarageAutomation) with the simulated camera and relay backends, so it runs on any machine.
+
+Also lists the slowest imports from python -X importtime and whether any hardware library
+(picamera2, cv2, numpy, gpiozero) was imported at startup, which should never be the case.
+
+Usage (from the repository root):
+    python benchmarks/startup_benchmark.py --runs 5
+"""
+import os, sys, json, argparse, subprocess, tempfile
+from time import perf_counter
+from statistics import median
+from typing import Any
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HARDWARE_MODULES: tuple[str, ...] = ("picamera2", "cv2", "numpy", "gpiozero")
+
+def environment(db: str) -> dict[str, str]:
+    return {
+        **os.environ,
+        "DB": db,
+        "SECRET_KEY": "benchmark",
+        "CAMERA_BACKEND": "simulated",
+        "RELAY_BACKEND": "simulated",
+        "DOOR_INTERVAL": "0",
+        "GEOIP_OFFLINE": "1",
+    }
+
+def run_once(env: dict[str, str], importtime: bool = False) -> tuple[float, str]:
+    """
+    Imports app in a new interpreter.
+
+    Returns:
+        tuple[float, str] : Wall seconds until the interpreter exited and its stderr.
+    """
+    command: list[str] = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", "import app"]
+    start: float = perf_counter()
+    result: subprocess.CompletedProcess = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed: float = perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "app import failed")
+    return elapsed, result.stderr
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """
+    Returns module -> cumulative import time in microseconds from -X importtime output.
+    """
+    modules: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name] = int(cumulative)
+    return modules
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest top level imports to report")
+    args: argparse.Namespace = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env: dict[str, str] = environment(db=os.path.join(tmp, "benchmark.db"))
+        # First run creates and migrates the database, it is not counted.
+        run_once(env=env)
+        times: list[float] = [run_once(env=env)[0] for _ in range(args.runs)]
+        _, stderr = run_once(env=env, importtime=True)
+
+    modules: dict[str, int] = parse_importtime(stderr=stderr)
+    top_level: dict[str, int] = {name: us for name, us in modules.items() if "." not in name}
+    report: dict[str, Any] = {
+        "runs": args.runs,
+        "startup_s": {"median": round(median(times), 4), "min": round(min(times), 4), "max": round(max(times), 4)},
+        "slowest_imports_ms": {
+            name: round(us / 1000, 1) for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]
+        },
+        "hardware_imported": [name for name in HARDWARE_MODULES if name in modules]
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
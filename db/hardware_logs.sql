@@ -1,6 +0,0 @@
-CREATE TABLE IF NOT EXISTS hardware_logs (
-    session_id TEXT,
-    user_id TEXT,
-    timestamp TEXT,
-    hardware TEXT
-);
\ No newline at end of file
@@ -1,6 +1,10 @@
 SELECT
+    lb.id,
     lb.session_id,
-    u.username,
+    CASE
+        WHEN lb.user_id IS NULL THEN 'system'
+        ELSE u.username
+    END AS username,
     lb.login_date,
     lb.login_time,
     lb.ip_address,
@@ -12,11 +16,9 @@ SELECT
     CASE
         WHEN UPPER(lb.device) = 'K' then 'Android'
         ELSE lb.device
-    END AS device
+    END AS device,
+    lb.user_agent
 FROM
     logbook lb
-    INNER JOIN users u ON lb.user_id = u.id
-    INNER JOIN ip_logs ip ON lb.ip_address = ip.ip_address
-ORDER BY
-    lb.login_date DESC,
-    lb.login_time DESC
\ No newline at end of file
+    LEFT JOIN users u ON lb.user_id = u.id
+    LEFT JOIN ip_logs ip ON lb.ip_address = ip.ip_address
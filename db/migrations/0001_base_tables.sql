@@ -0,0 +1,39 @@
+-- Base tables (previously db/user_table.sql, db/login.sql, db/ip_logs.sql and db/hardware_logs.sql).
+CREATE TABLE
+    IF NOT EXISTS users (
+        id INTEGER NOT NULL UNIQUE,
+        username TEXT NOT NULL UNIQUE,
+        role TEXT,
+        password TEXT NOT NULL,
+        PRIMARY KEY ("id" AUTOINCREMENT)
+    );
+
+CREATE TABLE IF NOT EXISTS logbook (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    session_id TEXT,
+    ip_address TEXT,
+    login_date TEXT,
+    login_time TEXT,
+    browser TEXT,
+    browser_version TEXT,
+    os TEXT,
+    os_version TEXT,
+    device TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ip_logs (
+    ip_address TEXT PRIMARY KEY,
+    city TEXT,
+    region TEXT,
+    country TEXT,
+    latitude REAL,
+    longitude REAL
+);
+
+CREATE TABLE IF NOT EXISTS hardware_logs (
+    session_id TEXT,
+    user_id TEXT,
+    timestamp TEXT,
+    hardware TEXT
+);
\ No newline at end of file
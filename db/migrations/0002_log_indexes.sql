@@ -0,0 +1,5 @@
+-- Indexes for the logbook/hardware_logs joins in db/logs.sql and dbManager.retrieve_logs.
+CREATE INDEX IF NOT EXISTS idx_logbook_session_id ON logbook (session_id);
+CREATE INDEX IF NOT EXISTS idx_logbook_login_date_time ON logbook (login_date, login_time);
+CREATE INDEX IF NOT EXISTS idx_hardware_logs_session_id ON hardware_logs (session_id);
+CREATE INDEX IF NOT EXISTS idx_hardware_logs_timestamp ON hardware_logs (timestamp);
@@ -0,0 +1,4 @@
+-- Keyset pagination for /api/logs: ORDER BY login_date DESC, login_time DESC, id DESC.
+-- id is the rowid, so every logbook index already ends in it.
+CREATE INDEX IF NOT EXISTS idx_logbook_user_login ON logbook (user_id, login_date, login_time);
+CREATE INDEX IF NOT EXISTS idx_hardware_logs_hardware_session ON hardware_logs (hardware, session_id);
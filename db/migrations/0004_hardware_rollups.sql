@@ -0,0 +1,51 @@
+-- Hardware usage rollups, maintained incrementally by a trigger on hardware_logs so the logbook
+-- and stats endpoints never aggregate the raw history.
+CREATE TABLE IF NOT EXISTS hardware (
+    hardware TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS hardware_usage (
+    session_id TEXT NOT NULL,
+    hardware TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, hardware)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_usage (
+    day TEXT NOT NULL,
+    user_id TEXT NOT NULL DEFAULT '',
+    hardware TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_id, hardware)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_hardware_usage_hardware ON hardware_usage (hardware, session_id);
+
+-- Backfill from existing history.
+INSERT OR IGNORE INTO hardware (hardware)
+SELECT DISTINCT hardware FROM hardware_logs WHERE hardware IS NOT NULL;
+
+INSERT INTO hardware_usage (session_id, hardware, uses)
+SELECT session_id, hardware, COUNT(*) FROM hardware_logs
+WHERE session_id IS NOT NULL AND hardware IS NOT NULL
+GROUP BY session_id, hardware;
+
+INSERT INTO daily_usage (day, user_id, hardware, uses)
+SELECT substr(timestamp, 1, 10), COALESCE(user_id, ''), hardware, COUNT(*) FROM hardware_logs
+WHERE timestamp IS NOT NULL AND hardware IS NOT NULL
+GROUP BY substr(timestamp, 1, 10), COALESCE(user_id, ''), hardware;
+
+CREATE TRIGGER IF NOT EXISTS trg_hardware_logs_rollup
+AFTER INSERT ON hardware_logs
+WHEN NEW.hardware IS NOT NULL
+BEGIN
+    INSERT OR IGNORE INTO hardware (hardware) VALUES (NEW.hardware);
+
+    INSERT INTO hardware_usage (session_id, hardware, uses)
+    SELECT NEW.session_id, NEW.hardware, 1 WHERE NEW.session_id IS NOT NULL
+    ON CONFLICT (session_id, hardware) DO UPDATE SET uses = uses + 1;
+
+    INSERT INTO daily_usage (day, user_id, hardware, uses)
+    SELECT substr(NEW.timestamp, 1, 10), COALESCE(NEW.user_id, ''), NEW.hardware, 1 WHERE NEW.timestamp IS NOT NULL
+    ON CONFLICT (day, user_id, hardware) DO UPDATE SET uses = uses + 1;
+END;
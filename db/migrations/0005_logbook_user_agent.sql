@@ -0,0 +1,2 @@
+-- Raw User-Agent string, so parsing can be deferred from login to logbook render time.
+ALTER TABLE logbook ADD COLUMN user_agent TEXT;
@@ -0,0 +1,11 @@
+-- Server-side login sessions, keyed by the random sid stored in the signed Flask session cookie.
+CREATE TABLE IF NOT EXISTS sessions (
+    sid TEXT PRIMARY KEY,
+    user_id TEXT,
+    username TEXT NOT NULL,
+    role TEXT,
+    session_id TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at);
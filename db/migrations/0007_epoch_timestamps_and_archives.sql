@@ -0,0 +1,72 @@
+-- Integer epoch (seconds) copies of the text timestamps, for cheap range scans by the retention job
+-- and the archive reader. The text columns stay for display and the logbook's keyset order.
+ALTER TABLE logbook ADD COLUMN login_at INTEGER;
+ALTER TABLE hardware_logs ADD COLUMN logged_at INTEGER;
+
+-- The text columns hold local time, the 'utc' modifier converts them to UTC before taking the epoch.
+UPDATE logbook
+SET login_at = CAST(strftime('%s', login_date || ' ' || login_time, 'utc') AS INTEGER)
+WHERE login_date IS NOT NULL AND login_time IS NOT NULL;
+
+UPDATE hardware_logs
+SET logged_at = CAST(strftime('%s', substr(timestamp, 1, 19), 'utc') AS INTEGER)
+WHERE timestamp IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_logbook_login_at ON logbook (login_at);
+CREATE INDEX IF NOT EXISTS idx_hardware_logs_logged_at ON hardware_logs (logged_at);
+
+-- The app writes the epoch columns itself, these only fill them in for rows inserted by other tools.
+CREATE TRIGGER IF NOT EXISTS trg_logbook_login_at
+AFTER INSERT ON logbook
+WHEN NEW.login_at IS NULL AND NEW.login_date IS NOT NULL AND NEW.login_time IS NOT NULL
+BEGIN
+    UPDATE logbook
+    SET login_at = CAST(strftime('%s', NEW.login_date || ' ' || NEW.login_time, 'utc') AS INTEGER)
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hardware_logs_logged_at
+AFTER INSERT ON hardware_logs
+WHEN NEW.logged_at IS NULL AND NEW.timestamp IS NOT NULL
+BEGIN
+    UPDATE hardware_logs
+    SET logged_at = CAST(strftime('%s', substr(NEW.timestamp, 1, 19), 'utc') AS INTEGER)
+    WHERE rowid = NEW.rowid;
+END;
+
+-- Monthly archive files written by LogRetention. bytes is the committed length of the file:
+-- anything past it was written by a run that failed before deleting the rows, and is discarded.
+CREATE TABLE IF NOT EXISTS log_archives (
+    month TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    first_at INTEGER,
+    last_at INTEGER,
+    updated_at TEXT,
+    PRIMARY KEY (month, kind)
+) WITHOUT ROWID;
+
+-- Logins per user and month, maintained on insert like daily_usage so it survives the logbook rows
+-- being archived. Hardware usage is already summarised per day in daily_usage, which archiving never touches.
+CREATE TABLE IF NOT EXISTS monthly_logins (
+    month TEXT NOT NULL,
+    user_id TEXT NOT NULL DEFAULT '',
+    logins INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, user_id)
+) WITHOUT ROWID;
+
+INSERT INTO monthly_logins (month, user_id, logins)
+SELECT substr(login_date, 1, 7), COALESCE(user_id, ''), COUNT(*) FROM logbook
+WHERE login_date IS NOT NULL
+GROUP BY substr(login_date, 1, 7), COALESCE(user_id, '');
+
+CREATE TRIGGER IF NOT EXISTS trg_logbook_monthly_logins
+AFTER INSERT ON logbook
+WHEN NEW.login_date IS NOT NULL
+BEGIN
+    INSERT INTO monthly_logins (month, user_id, logins)
+    VALUES (substr(NEW.login_date, 1, 7), COALESCE(NEW.user_id, ''), 1)
+    ON CONFLICT (month, user_id) DO UPDATE SET logins = logins + 1;
+END;
@@ -0,0 +1,32 @@
+-- Hardware events from background stages (motion detection, the door monitor) have no logged in user.
+-- They are attributed to one system session per day, with a logbook row of its own (user_id NULL)
+-- so they are listed in the logbook like any login's hardware usage.
+UPDATE hardware_logs
+SET session_id = 'system-' || substr(timestamp, 1, 10)
+WHERE session_id IS NULL AND user_id IS NULL AND timestamp IS NOT NULL;
+
+INSERT INTO logbook (session_id, login_date, login_time)
+SELECT session_id, substr(MIN(timestamp), 1, 10), substr(MIN(timestamp), 12, 8)
+FROM hardware_logs
+WHERE session_id LIKE 'system-%'
+AND session_id NOT IN (SELECT session_id FROM logbook WHERE session_id IS NOT NULL)
+GROUP BY session_id;
+
+INSERT INTO hardware_usage (session_id, hardware, uses)
+SELECT session_id, hardware, COUNT(*) FROM hardware_logs
+WHERE session_id LIKE 'system-%' AND hardware IS NOT NULL
+GROUP BY session_id, hardware
+ON CONFLICT (session_id, hardware) DO UPDATE SET uses = excluded.uses;
+
+-- System sessions are not logins.
+DELETE FROM monthly_logins WHERE user_id = '';
+
+DROP TRIGGER IF EXISTS trg_logbook_monthly_logins;
+CREATE TRIGGER trg_logbook_monthly_logins
+AFTER INSERT ON logbook
+WHEN NEW.login_date IS NOT NULL AND NEW.user_id IS NOT NULL
+BEGIN
+    INSERT INTO monthly_logins (month, user_id, logins)
+    VALUES (substr(NEW.login_date, 1, 7), NEW.user_id, 1)
+    ON CONFLICT (month, user_id) DO UPDATE SET logins = logins + 1;
+END;
@@ -1,47 +1,173 @@
 from datetime import datetime
-import sqlite3, bcrypt, secrets
+import os, json, base64, sqlite3, itertools
+from time import perf_counter
 from contextlib import contextmanager
-from flask import Response, jsonify, request, session
-from typing import Generator, Optional, Any, Callable
+from flask import Response, jsonify, request, session, has_request_context
+from typing import Generator, Iterator, Optional, Any, Callable
+from LogWriter import LogWriter
+from LogArchive import LogArchive, LogRetention
+from ConnectionPool import ConnectionPool
+from UserAgentParser import parse_user_agent
+from GeoLocator import client_ip
+from LoginGuard import LoginGuard, LoginBusy
+from SessionStore import MemorySessionStore, SqliteSessionStore
+from Metrics import REGISTRY
+from concurrent.futures import TimeoutError as VerifyTimeout
+
+DB_SECONDS = REGISTRY.histogram("garage_db_seconds", "Time a pooled SQLite connection is held, by operation.", labels=("operation",))
+
+class InvalidCursor(ValueError):
+    """
+    Raised by dbManager.logs_page for a cursor that is not a next_cursor it returned.
+    """
+
+# Versioned schema changes, applied in filename order by dbManager.migrate() (NNNN_description.sql).
+MIGRATIONS_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "migrations")
 
 class dbManager:
-    def __init__(self, ip_dict: Callable[[], dict], user_dict: Callable[[], dict], db: str) -> None:
+    def __init__(
+        self,
+        ip_dict: Callable[[], dict],
+        user_dict: Callable[[], dict],
+        db: str,
+        bcrypt_rounds: int = 12,
+        session_backend: str = "sqlite",
+        session_ttl: float = 43200.0,
+        publish: Optional[Callable[[str, Any], None]] = None,
+        archive_dir: Optional[str] = None,
+        retention_days: float = 0
+    ) -> None:
         self.db: str = db
         self.ip_dict: Callable[[], dict] = ip_dict
         self.user_dict: Callable[[], dict] = user_dict
-        self.user_id: Optional[str] = None
-        self.user: Optional[str] = None
-        self.role: Optional[str] = None
-        self.session_id: str = secrets.token_hex(nbytes=16)
+        # Pushes new logins to connected pages (see EventBus).
+        self.publish: Callable[[str, Any], None] = publish or (lambda event, data: None)
+
+        # Pre-configured (WAL) connections reused across requests instead of a connect per query.
+        self.pool: ConnectionPool = ConnectionPool(db=db)
+
+        # bcrypt runs on a bounded worker pool, failed attempts are rate limited per IP and username.
+        self.login_guard: LoginGuard = LoginGuard(rounds=bcrypt_rounds)
+        REGISTRY.collector(
+            "garage_login_rejected_total", "Logins rejected before verifying the password, busy bcrypt pool or rate limited.", "counter",
+            lambda: [({"reason": "busy"}, self.login_guard.stats()["rejected_busy"]), ({"reason": "rate"}, self.login_guard.stats()["rejected_rate"])]
+        )
+
+        # Log INSERTs are batched by a background thread so requests never wait on a disk fsync.
+        self.log_writer: LogWriter = LogWriter(db=db)
+        REGISTRY.collector(
+            "garage_log_writer_rows_total", "Log rows queued (enqueued), committed (written), dropped when the queue was full or rejected by SQLite (failed).", "counter",
+            lambda: [({"outcome": outcome}, self.log_writer.stats()[outcome]) for outcome in ("enqueued", "written", "dropped", "failed")]
+        )
+        REGISTRY.collector(
+            "garage_log_writer_batches_total", "Batches committed by the log writer.", "counter",
+            lambda: [({}, self.log_writer.stats()["batches"])]
+        )
+        REGISTRY.collector(
+            "garage_log_writer_queued", "Log rows waiting for the writer thread.", "gauge",
+            lambda: [({}, self.log_writer.stats()["queued"])]
+        )
+
+        # Who is logged in lives server side, keyed by the sid in the signed session cookie.
+        # The sqlite backend is shared by every worker process, memory only suits a single process.
+        self.sessions: MemorySessionStore | SqliteSessionStore = (
+            MemorySessionStore(ttl=session_ttl) if session_backend == "memory"
+            else SqliteSessionStore(connect=self.db_connect, ttl=session_ttl)
+        )
+
+        # Days whose system session (see system_identity) already has its logbook row.
+        self.system_sessions: set[str] = set()
+
+        # Logbook and hardware_logs rows older than retention_days move to compressed monthly archives,
+        # which logs_page keeps reading once the hot rows run out. 0 keeps every row in SQLite.
+        self.archive: Optional[LogArchive] = LogArchive(directory=archive_dir) if archive_dir else None
+        self.retention: Optional[LogRetention] = (
+            LogRetention(connect=self.db_connect, archive=self.archive, max_age_days=retention_days)
+            if self.archive is not None and retention_days > 0 else None
+        )
 
     @contextmanager
-    def db_connect(self) -> Generator[sqlite3.Cursor, None, None]:
+    def db_connect(self, operation: str) -> Generator[sqlite3.Cursor, None, None]:
         """
-        Creates connection to self.db as an isolated method for scalability.
+        Borrows a connection from self.pool as an isolated method for scalability.
         Usaes @contextmanager decorator to allow this top function as a pythonic context manager.
-        This approach avoids having to manully call conn.close() each time.
-        isolation_level=None sets autocommit.
-        conn.row_factory = sqlite3.Row transforms rows into Python like dictionaries for easier access.
+        This approach avoids having to manully return the connection to the pool each time.
+        Pooled connections are autocommit (isolation_level=None), run in WAL mode and
+        use sqlite3.Row to transform rows into Python like dictionaries for easier access.
+
+        Parameters:
+            operation : str
+                Label of the time from borrowing to release in garage_db_seconds, usually the calling method's name.
+        """
+        start: float = perf_counter()
+        with self.pool.connection() as conn:
+            cursor: sqlite3.Cursor = conn.cursor()
+
+            try:
+                # yield pauses the code and gives control to context manager when called via with.
+                # Once done, return control to this method which always closes the cursor and
+                # hands the connection back to the pool.
+                yield cursor
+            finally:
+                cursor.close()
+                DB_SECONDS.observe(perf_counter() - start, operation)
+
+    def migrate(self) -> list[int]:
         """
-        conn: sqlite3.Connection = sqlite3.connect(database=self.db, isolation_level=None)
-        conn.row_factory = sqlite3.Row
-        cursor: sqlite3.Cursor = conn.cursor()
+        Applies every migration in MIGRATIONS_DIR that has not yet been recorded in schema_migrations.
+        Called once at startup so DDL never runs on the request path.
+        Each migration and its schema_migrations row are committed in one transaction.
 
-        try:
-            # yield pauses the code and gives control to context manager when called via with.
-            # Once done, return control to this method which always calls conn.close() 
-            yield cursor
-        finally:
-            conn.close()
+        Returns:
+            list[int] : Versions applied by this call.
+        """
+        applied_now: list[int] = []
+        with self.db_connect(operation="migrate") as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TEXT NOT NULL
+                )
+            """)
+            applied: set[int] = {row[0] for row in cursor.execute("SELECT version FROM schema_migrations")}
+
+            for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+                if not filename.endswith(".sql"):
+                    continue
+                version: int = int(filename.split("_", 1)[0])
+                if version in applied:
+                    continue
+
+                with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+                    migration_sql: str = f.read()
+
+                name: str = filename.replace("'", "''")
+                cursor.executescript(f"""
+                    BEGIN;
+                    {migration_sql}
+                    ;
+                    INSERT INTO schema_migrations (version, name, applied_at)
+                    VALUES ({version}, '{name}', '{datetime.now().isoformat(sep=" ")}');
+                    COMMIT;
+                """)
+                applied_now.append(version)
+
+        return applied_now
 
     # Information Storage
     def validateLogin(self) -> Response:
         """
         Method to validate login credentials against a sqlite database.
-        Password is encoded with bcrypt.
+        Password is encoded with bcrypt, verified on self.login_guard's worker pool so a burst of
+        attempts cannot occupy every Flask worker. Hashes with an outdated cost are replaced on success.
 
         Returns:
             Response containing login status.
+                200 : Success.
+                400 : Missing or invalid credentials.
+                429 : Too many failed attempts from this IP or for this username.
+                503 : Verification queue full, retry shortly.
         """
         data: Any = request.get_json()
         username: str = data.get("username")
@@ -50,32 +176,58 @@ class dbManager:
         if not username or not password_raw:
             return jsonify({"status": "fail", "message": "Missing username or password"}), 400
 
+        ip: Optional[str] = client_ip(request=request)
+        if not self.login_guard.allowed(ip=ip, username=username):
+            return jsonify({"status": "fail", "message": "Too many attempts, try again later"}), 429
+
         pwd_attempted: bytes = password_raw.encode('utf-8')
 
-        # Take control from self.db_connect()
-        with self.db_connect() as cursor:
+        # The connection is returned to the pool before bcrypt runs.
+        with self.db_connect(operation="validateLogin") as cursor:
             cursor.execute("SELECT password, role FROM users WHERE username = ?", (username,))
             result: Any = cursor.fetchone()
 
-            if result is None:
-                return jsonify({"status": "fail", "message": "Invalid credentials"}), 400
+        if result is None:
+            self.login_guard.failed(ip=ip, username=username)
+            return jsonify({"status": "fail", "message": "Invalid credentials"}), 400
 
-            stored_hash: bytes = result[0].encode('utf-8')
+        stored_hash: bytes = result[0].encode('utf-8')
 
-            is_valid: bool = bcrypt.checkpw(password=pwd_attempted, hashed_password=stored_hash)
-            if is_valid:
-                cursor.executescript(open("db/login.sql").read())
-                cursor.executescript(open("db/ip_logs.sql").read())
-                cursor.executescript(open("db/hardware_logs.sql").read())
-                self.user: str = username
-                self.role: str = result[1]
-                session["logged_in"] = True
-                self.store_login_data(cursor=cursor)
-                return jsonify({"status": "success"}), 200
-            else:
-                return jsonify({"status": "fail", "message": "Invalid credentials"}), 400
-            
-            # Return control to self.db_connect()
+        try:
+            is_valid, new_hash = self.login_guard.verify(password=pwd_attempted, hashed=stored_hash)
+        except (LoginBusy, VerifyTimeout):
+            return jsonify({"status": "fail", "message": "Server busy, try again"}), 503
+
+        if not is_valid:
+            self.login_guard.failed(ip=ip, username=username)
+            return jsonify({"status": "fail", "message": "Invalid credentials"}), 400
+
+        with self.db_connect(operation="validateLogin") as cursor:
+            if new_hash is not None:
+                cursor.execute("UPDATE users SET password = ? WHERE username = ?", (new_hash.decode('utf-8'), username))
+            user_id: Any = cursor.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+
+        # Each login gets its own logbook session_id so hardware usage is attributed to the right person.
+        identity: dict[str, Any] = self.sessions.create(
+            user_id=user_id[0] if user_id else None,
+            username=username,
+            role=result[1]
+        )
+        session["sid"] = identity["sid"]
+        session["logged_in"] = True
+        self.store_login_data(identity=identity)
+        return jsonify({"status": "success"}), 200
+
+    def current_user(self) -> Optional[dict[str, Any]]:
+        """
+        Method to look up the identity of the current request from the session store.
+
+        Returns:
+            dict with user_id, username, role and session_id, or None when not logged in or expired.
+        """
+        if not has_request_context():
+            return None
+        return self.sessions.get(sid=session.get("sid"))
 
     def user_metadata(self) -> dict:
         """
@@ -89,26 +241,23 @@ class dbManager:
         """
         return self.ip_dict()
 
-    def store_login_data(self, cursor: sqlite3.Cursor) -> None:
+    def store_login_data(self, identity: dict[str, Any]) -> None:
         """
         Method to write login data to database.
+        The logbook and ip_logs rows are queued on self.log_writer, and the login is published
+        as a 'login' event shaped like a /api/logs row.
 
         Parameters:
-            cursor : sqlite3.Cursor
-                Cursor object to perfrom write operations.
+            identity : dict
+                Session created for this login by self.sessions.
         """
-        user_id: Any = cursor.execute(
-            "SELECT id FROM users WHERE username = ?",
-            (self.user,)
-        ).fetchone()
-
-        self.user_id: str | None = user_id[0] if user_id else None
         user_data: dict[str, str | float | None] = self.user_metadata()
         ip_data: dict[str, str | float | None] = self.ip_metadata()
-        loginTime: list[str] = datetime.now().isoformat(sep=" ").split(" ")
+        now: datetime = datetime.now()
+        loginTime: list[str] = now.isoformat(sep=" ").split(" ")
 
         # Store login details
-        cursor.execute(
+        self.log_writer.enqueue(
             """
             INSERT INTO logbook (
                 user_id,
@@ -116,30 +265,34 @@ class dbManager:
                 ip_address,
                 login_date,
                 login_time,
+                login_at,
                 browser,
                 browser_version,
                 os,
                 os_version,
-                device
+                device,
+                user_agent
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
-                self.user_id,
-                self.session_id,
+                identity["user_id"],
+                identity["session_id"],
                 ip_data.get("ip_address"),
                 loginTime[0],
                 loginTime[1].split(".")[0],
+                int(now.timestamp()),
                 user_data.get("browser"),
                 user_data.get("browser_version"),
                 user_data.get("os"),
                 user_data.get("os_version"),
                 user_data.get("device"),
+                user_data.get("user_agent"),
             ),
         )
 
         # Store unique IP address details
-        cursor.execute("""
+        self.log_writer.enqueue("""
             INSERT OR IGNORE INTO ip_logs (
                 ip_address,
                 city,
@@ -159,95 +312,382 @@ class dbManager:
             ),
         )
 
+        self.publish("login", {
+            "username": identity["username"],
+            "login_date": loginTime[0],
+            "login_time": loginTime[1].split(".")[0],
+            "ip_address": ip_data.get("ip_address"),
+            "city": ip_data.get("city"),
+            "region": ip_data.get("region"),
+            "country": ip_data.get("country"),
+            "browser": f"{user_data['browser']} {user_data.get('browser_version')}" if user_data.get("browser") else None,
+            "os": f"{user_data['os']} {user_data.get('os_version')}" if user_data.get("os") else None,
+            "device": user_data.get("device"),
+            "hardware": {}
+        })
+
+    def known_ip(self, ip: str) -> Optional[dict[str, Any]]:
+        """
+        Method to read a previously geolocated IP address from ip_logs.
+        """
+        with self.db_connect(operation="known_ip") as cursor:
+            cursor.execute("SELECT * FROM ip_logs WHERE ip_address = ?", (ip,))
+            row: Optional[sqlite3.Row] = cursor.fetchone()
+            return dict(row) if row else None
+
+    def store_ip(self, ip_data: dict[str, Any]) -> None:
+        """
+        Method to backfill ip_logs once a background geolocation lookup completes.
+        Replaces the empty row written at login time.
+        """
+        self.log_writer.enqueue("""
+            INSERT INTO ip_logs (
+                ip_address,
+                city,
+                region,
+                country,
+                latitude,
+                longitude
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (ip_address) DO UPDATE SET
+                city = excluded.city,
+                region = excluded.region,
+                country = excluded.country,
+                latitude = excluded.latitude,
+                longitude = excluded.longitude
+            """, (
+                ip_data.get("ip_address"),
+                ip_data.get("city"),
+                ip_data.get("region"),
+                ip_data.get("country"),
+                ip_data.get("latitude"),
+                ip_data.get("longitude"),
+            ),
+        )
+
     def hardware_logging(self, hardware: str) -> None:
         """
         Method to write hardware access to database.
 
         Parameters:
             hardware : str
-                Hardware that is triggered via front end pages.
+                Hardware that is triggered via front end pages (or by background stages such as motion detection).
+
+        Safe to call outside of a request context. The row is attributed to the requesting user's session,
+        background stages have no user and are logged to the day's system session (see system_identity).
+        The row is queued on self.log_writer and committed in a batch by its background thread,
+        so logging never adds disk latency to a request.
         """
-        try:
-            with self.db_connect() as cursor:
-                cursor.execute("""
-                    INSERT INTO hardware_logs (
-                        session_id,
-                        user_id,
-                        timestamp,
-                        hardware
-                    )
-                    VALUES
-                    (?, ?, ?, ?)
-                    """,
-                    (
-                        self.session_id,
-                        self.user_id,
-                        datetime.now().isoformat(sep=" "),
-                        hardware
-                    )
-                )
-                return jsonify({"status": "success"}), 200
-        except Exception:
-            return jsonify({"status": "fail", "message": Exception}), 400
+        now: datetime = datetime.now()
+        identity: dict[str, Any] = self.current_user() or self.system_identity(now=now)
+        self.log_writer.enqueue("""
+            INSERT INTO hardware_logs (
+                session_id,
+                user_id,
+                timestamp,
+                logged_at,
+                hardware
+            )
+            VALUES
+            (?, ?, ?, ?, ?)
+            """,
+            (
+                identity.get("session_id"),
+                identity.get("user_id"),
+                now.isoformat(sep=" "),
+                int(now.timestamp()),
+                hardware
+            )
+        )
+
+    def system_identity(self, now: datetime) -> dict[str, Any]:
+        """
+        Method to return the identity hardware events without a logged in user are attributed to.
+
+        Background stages (motion detection, the door monitor) share one session per day, listed in the
+        logbook as a 'system' row (user_id NULL) so their events show up with its hardware counts.
+        The row is written with the first event of the day, queued ahead of it on self.log_writer.
+        """
+        session_id: str = f"system-{now.date().isoformat()}"
+        if session_id not in self.system_sessions:
+            self.system_sessions.add(session_id)
+            # Other worker processes may have written the row already.
+            self.log_writer.enqueue(
+                """
+                INSERT INTO logbook (session_id, login_date, login_time, login_at)
+                SELECT ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM logbook WHERE session_id = ?)
+                """,
+                (session_id, now.date().isoformat(), now.strftime("%H:%M:%S"), int(now.timestamp()), session_id)
+            )
+        return {"session_id": session_id, "user_id": None}
 
     # User Management Functions
-    def retrieve_logs(self) -> tuple[list[Any], list[str]]:
+    def logs_page(
+        self,
+        cursor_token: Optional[str] = None,
+        limit: int = 20,
+        username: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        hardware: Optional[str] = None
+    ) -> dict[str, Any]:
         """
-        Method to query database for relevant information to show in a HTML card.
+        Method to query a single page of the logbook, newest first.
+
+        Uses keyset pagination on (login_date, login_time, id): the next page starts strictly after the
+        last row of the previous one, so the cost of a page does not depend on how deep it is or how
+        many years of history are stored. Hardware counts are only computed for the sessions on the page.
+        Once the hot rows run out the page continues, in the same order, into the rows moved to
+        self.archive by the retention job (see archived_logs).
+
+        Parameters:
+            cursor_token : Optional[str]
+                Opaque next_cursor returned by the previous page, InvalidCursor is raised for anything else.
+            limit : int
+                Page size (1 - 100).
+            username, date_from, date_to, hardware : Optional[str]
+                Filters. Dates are inclusive YYYY-MM-DD strings, hardware keeps logins that used it.
 
         Returns
-            rows : list[Any]
-                A list of values returned by SQL.
+            dict with rows, the hardware columns present on the page and next_cursor (None on the last page).
+        """
+        limit = max(1, min(int(limit), 100))
+        # Logins of removed users are not listed, system sessions have no user.
+        clauses: list[str] = ["(lb.user_id IS NULL OR u.id IS NOT NULL)"]
+        params: list[Any] = []
+
+        if cursor_token:
+            try:
+                last: list[Any] = json.loads(base64.urlsafe_b64decode(cursor_token.encode("ascii")))
+                if not isinstance(last, list) or len(last) != 3 or not isinstance(last[0], str) or not isinstance(last[1], str) or not isinstance(last[2], int):
+                    raise InvalidCursor(cursor_token)
+                # The archive reader turns the position into a time range.
+                datetime.fromisoformat(f"{last[0]} {last[1]}")
+            except ValueError as e:
+                raise InvalidCursor(cursor_token) from e
+            clauses.append("(lb.login_date, lb.login_time, lb.id) < (?, ?, ?)")
+            params.extend(last)
+        if username:
+            clauses.append("u.username = ?")
+            params.append(username)
+        if date_from:
+            clauses.append("lb.login_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("lb.login_date <= ?")
+            params.append(date_to)
+        if hardware:
+            clauses.append("EXISTS (SELECT 1 FROM hardware_usage hu WHERE hu.session_id = lb.session_id AND hu.hardware = ?)")
+            params.append(hardware)
+
+        with open("db/logs.sql") as f:
+            main_sql: str = f.read().strip()
+
+        page_query: str = f"""
+            {main_sql}
+            WHERE {" AND ".join(clauses)}
+            ORDER BY
+                lb.login_date DESC,
+                lb.login_time DESC,
+                lb.id DESC
+            LIMIT ?
         """
-        with self.db_connect() as cursor:
-            with open("db/logs.sql") as f:
-                main_sql: str = f.read().strip()
 
-            cursor.execute("SELECT DISTINCT hardware FROM hardware")
-            hardware_types: list[str] = [row[0] for row in cursor.fetchall()]
+        with self.db_connect(operation="logs_page") as cursor:
+            # Fetch one extra row to know whether another page exists.
+            cursor.execute(page_query, (*params, limit + 1))
+            rows: list[dict[str, Any]] = [dict(row) for row in cursor.fetchall()]
+            has_more: bool = len(rows) > limit
+            rows = rows[:limit]
+
+            usage: dict[str, dict[str, int]] = self.hardware_usage(cursor=cursor, session_ids=[r["session_id"] for r in rows])
+
+        for row in rows:
+            row["hardware"] = usage.get(row.pop("session_id"), {})
+            self.parse_agent(row=row, user_agent=row.pop("user_agent"))
+
+        if not has_more and self.archive is not None:
+            # Continue after the last row shown, either on this page or on the previous one.
+            start: Optional[list[Any]] = None
+            if rows:
+                start = [rows[-1]["login_date"], rows[-1]["login_time"], rows[-1]["id"]]
+            elif cursor_token:
+                start = last
+            rows.extend(itertools.islice(
+                self.archived_logs(
+                    last=start, username=username, date_from=date_from, date_to=date_to, hardware=hardware
+                ),
+                limit + 1 - len(rows)
+            ))
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+        hw_cols: list[str] = sorted({hw for row in rows for hw in row["hardware"]})
+
+        next_cursor: Optional[str] = None
+        if has_more:
+            last_row: dict[str, Any] = rows[-1]
+            next_cursor = base64.urlsafe_b64encode(
+                json.dumps([last_row["login_date"], last_row["login_time"], last_row["id"]]).encode("utf-8")
+            ).decode("ascii")
+
+        return {"rows": rows, "hw_cols": hw_cols, "next_cursor": next_cursor}
+
+    @staticmethod
+    def parse_agent(row: dict[str, Any], user_agent: Optional[str]) -> None:
+        """
+        Logins stored with UA_PARSE_LAZY only have the raw User-Agent, parse it now (memoized).
+        """
+        if row["browser"] is None and user_agent:
+            ua: dict[str, Optional[str]] = parse_user_agent(user_agent=user_agent)
+            row["browser"] = f"{ua['browser']} {ua['browser_version']}"
+            row["os"] = f"{ua['os']} {ua['os_version']}"
+            row["device"] = "Android" if (ua["device"] or "").upper() == "K" else ua["device"]
+
+    def archived_logs(
+        self,
+        last: Optional[list[Any]],
+        username: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        hardware: Optional[str] = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Method to stream archived logbook rows newest first, shaped like the rows of logs_page.
 
-            # Escape single quotes in hardware names
-            def esc(h: str) -> str:
-                return h.replace("'", "''")
+        Only the months and blocks that can hold rows before the keyset position last and within the
+        date filters are decompressed, and rows are produced lazily so a page stops reading as soon as
+        it is full.
 
-            sum_cases: str = ",\n".join(
-                f"SUM(CASE WHEN hardware = '{esc(h)}' THEN 1 ELSE 0 END) AS '{esc(h)}'"
-                for h in hardware_types
+        Parameters:
+            last : Optional[list[Any]]
+                (login_date, login_time, id) of the last row already returned, rows start strictly after it.
+            username, date_from, date_to, hardware : Optional[str]
+                Same filters as logs_page.
+        """
+        with self.db_connect(operation="archived_logs") as cursor:
+            cursor.execute("SELECT month, bytes FROM log_archives WHERE kind = 'logbook' ORDER BY month DESC")
+            archives: list[sqlite3.Row] = cursor.fetchall()
+
+        start_at: Optional[int] = int(datetime.fromisoformat(date_from).timestamp()) if date_from else None
+        end_at: Optional[int] = None
+        if last:
+            end_at = int(datetime.fromisoformat(f"{last[0]} {last[1]}").timestamp()) + 1
+        if date_to:
+            day_end: int = int(datetime.fromisoformat(date_to).timestamp()) + 86400
+            end_at = min(end_at, day_end) if end_at is not None else day_end
+        key: Optional[tuple[Any, ...]] = tuple(last) if last else None
+
+        for month, size in archives:
+            if (key and month > key[0][:7]) or (date_to and month > date_to[:7]):
+                continue
+            if date_from and month < date_from[:7]:
+                break
+            for row in self.archive.rows(month=month, kind="logbook", size=size, newest_first=True, start_at=start_at, end_at=end_at):
+                # Like the hot query, rows of users removed since are not listed.
+                if row["username"] is None:
+                    continue
+                if key and (row["login_date"], row["login_time"], row["id"]) >= key:
+                    continue
+                if (username and row["username"] != username) or (hardware and hardware not in row["hardware"]):
+                    continue
+                if (date_from and row["login_date"] < date_from) or (date_to and row["login_date"] > date_to):
+                    continue
+
+                page_row: dict[str, Any] = {
+                    "id": row["id"],
+                    "username": row["username"],
+                    "login_date": row["login_date"],
+                    "login_time": row["login_time"],
+                    "ip_address": row["ip_address"],
+                    "city": row["city"],
+                    "region": row["region"],
+                    "country": row["country"],
+                    # Same as the || concatenation in db/logs.sql, NULL when either part is.
+                    "browser": None if row["browser"] is None or row["browser_version"] is None else f"{row['browser']} {row['browser_version']}",
+                    "os": None if row["os"] is None or row["os_version"] is None else f"{row['os']} {row['os_version']}",
+                    "device": "Android" if (row["device"] or "").upper() == "K" else row["device"],
+                    "hardware": row["hardware"]
+                }
+                self.parse_agent(row=page_row, user_agent=row["user_agent"])
+                yield page_row
+
+    def archive_list(self) -> list[dict[str, Any]]:
+        """
+        Method to return the log_archives catalog with the logins of each archived month from monthly_logins.
+        """
+        with self.db_connect(operation="archive_list") as cursor:
+            cursor.execute(
+                """
+                SELECT la.month, la.kind, la.bytes, la.rows, la.first_at, la.last_at, la.updated_at,
+                    (SELECT SUM(ml.logins) FROM monthly_logins ml WHERE ml.month = la.month) AS month_logins
+                FROM log_archives la
+                ORDER BY la.month DESC, la.kind
+                """
             )
+            return [dict(row) for row in cursor.fetchall()]
 
-            hardware_query: str = f"""
-                SELECT
-                    session_id,
-                    {sum_cases}
-                FROM hardware_logs
-                GROUP BY session_id
-            """
+    def hardware_usage(self, cursor: sqlite3.Cursor, session_ids: list[str]) -> dict[str, dict[str, int]]:
+        """
+        Method to read hardware usage per session for the given sessions only,
+        from the hardware_usage rollup maintained by the hardware_logs insert trigger.
 
-            # Exclude session_id columns from both queries
-            cursor.execute(f"SELECT * FROM ({main_sql}) LIMIT 1")
-            main_cols: list[str] = [c[0] for c in cursor.description if c[0] != "session_id"]
-
-            cursor.execute(f"SELECT * FROM ({hardware_query}) LIMIT 1")
-            hw_cols: list[str] = [c[0] for c in cursor.description if c[0] != "session_id"]
-
-            final_query: str = f"""
-                SELECT
-                    {', '.join(['ms.' + c for c in main_cols] + [f'hq."{c}"' for c in hw_cols])}
-                FROM
-                    ({main_sql}) ms
-                INNER JOIN
-                    ({hardware_query}) hq
-                ON
-                    ms.session_id = hq.session_id
-                ORDER BY
-                    ms.login_date DESC,
-                    ms.login_time DESC
-            """
+        Returns
+            dict[str, dict[str, int]] : session_id -> {hardware: count}
+        """
+        usage: dict[str, dict[str, int]] = {}
+        unique: list[str] = list(dict.fromkeys(s for s in session_ids if s))
+        if not unique:
+            return usage
 
-            cursor.execute(final_query)
-            rows: list[Any] = cursor.fetchall()
+        cursor.execute(
+            f"""
+            SELECT session_id, hardware, uses
+            FROM hardware_usage
+            WHERE session_id IN ({", ".join("?" * len(unique))})
+            """,
+            unique
+        )
+        for row in cursor.fetchall():
+            usage.setdefault(row["session_id"], {})[row["hardware"]] = row["uses"]
+        return usage
+
+    def hardware_list(self) -> list[str]:
+        """
+        Method to return every hardware name that has been logged, used for the logbook filter.
+        """
+        with self.db_connect(operation="hardware_list") as cursor:
+            cursor.execute("SELECT hardware FROM hardware ORDER BY hardware")
+            return [row[0] for row in cursor.fetchall()]
+
+    def usage_stats(self, date_from: str, date_to: str, username: Optional[str] = None) -> list[dict[str, Any]]:
+        """
+        Method to return daily hardware usage per user from the daily_usage rollup.
+
+        Parameters:
+            date_from, date_to : str
+                Inclusive YYYY-MM-DD range.
+            username : Optional[str]
+                Restrict to a single user.
 
-            return rows, hw_cols
+        Returns
+            list[dict[str, Any]] : One row per day, user and hardware with its number of uses.
+        """
+        with self.db_connect(operation="usage_stats") as cursor:
+            cursor.execute(
+                """
+                SELECT du.day, u.username, du.hardware, du.uses
+                FROM daily_usage du
+                LEFT JOIN users u ON du.user_id = u.id
+                WHERE du.day BETWEEN ? AND ?
+                AND (? IS NULL OR u.username = ?)
+                ORDER BY du.day DESC, u.username, du.hardware
+                """,
+                (date_from, date_to, username, username)
+            )
+            return [dict(row) for row in cursor.fetchall()]
 
     def userList(self) -> list[str]:
         """
@@ -256,7 +696,7 @@ class dbManager:
         Returns
             list[str]
         """
-        with self.db_connect() as cursor:
+        with self.db_connect(operation="userList") as cursor:
             cursor.execute("SELECT username FROM users WHERE LOWER(role)<>'admin' ORDER BY username ASC")
             return [row[0] for row in cursor.fetchall()]
 
@@ -269,12 +709,11 @@ class dbManager:
         password: str = data.get("password")
 
         pwd_bytes: Any = password.encode("utf-8")
-        salt: bytes = bcrypt.gensalt(rounds=12)
-        hashed: bytes = bcrypt.hashpw(pwd_bytes, salt)
+        hashed: bytes = self.login_guard.hash(password=pwd_bytes)
         hashed_str: str = hashed.decode("utf-8")
 
         try:
-            with self.db_connect() as cursor:
+            with self.db_connect(operation="addUser") as cursor:
                 cursor.execute(
                     "INSERT INTO users (username, role, password) VALUES (?, 'read', ?)",
                     (username, hashed_str)
@@ -291,7 +730,7 @@ class dbManager:
         username: str = data.get("Remove")
 
         try:
-            with self.db_connect() as cursor:
+            with self.db_connect(operation="removeUser") as cursor:
                 cursor.execute(
                     "DELETE FROM users WHERE username = ?",
                     (username,)
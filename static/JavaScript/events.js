@@ -0,0 +1,9 @@
+// Subscribes to the /events Server-Sent Events stream, calling handlers[event](data) for each event.
+// A single EventSource per page; the browser reconnects on its own after network drops or restarts.
+export default function listen(handlers) {
+    const source = new EventSource('/events');
+    Object.entries(handlers).forEach(([event, handler]) => {
+        source.addEventListener(event, message => handler(JSON.parse(message.data)));
+    });
+    return source;
+}
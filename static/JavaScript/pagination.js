@@ -1,64 +1,132 @@
 const logContainer = document.querySelector(".log-container");
-const cards = Array.from(document.querySelectorAll(".log-card"));
 const pagination = document.querySelector(".pagination");
-
-function setupPagination() {
-    pagination.innerHTML = "";
-
+const filters = document.querySelector(".log-filters");
+const cardTemplate = document.getElementById("log-card-template");
+
+const DETAILS = [
+    ["IP Address", "ip_address"],
+    ["City", "city"],
+    ["Region", "region"],
+    ["Country", "country"],
+    ["Browser", "browser"],
+    ["OS", "os"],
+    ["Device", "device"]
+];
+
+// Keyset pagination: cursors[i] is the cursor that loads page i (page 0 has none).
+let cursors = [null];
+let page = 0;
+let nextCursor = null;
+let cardsPerPage = 10;
+let hwCols = [];
+
+function estimateCardsPerPage() {
     const header = document.querySelector(".card-header");
     const containerStyle = getComputedStyle(logContainer);
 
-    const containerPaddingTop = parseFloat(containerStyle.paddingTop);
-    const containerPaddingBottom = parseFloat(containerStyle.paddingBottom);
-
     const headerBottom = header.getBoundingClientRect().bottom + window.scrollY;
-    const paginationTop = pagination.getBoundingClientRect().top + window.scrollY;
-
-    const availableHeight = paginationTop - headerBottom - containerPaddingTop - containerPaddingBottom;
+    const availableHeight = window.innerHeight - headerBottom
+        - parseFloat(containerStyle.paddingTop) - parseFloat(containerStyle.paddingBottom)
+        - pagination.offsetHeight - filters.offsetHeight;
 
     const gap = parseFloat(containerStyle.gap) || 0;
-    const baseHeight = cards[0]?.offsetHeight || 100;
-
-    let cardsPerPage = Math.floor((availableHeight + gap) / (baseHeight + gap));
-    cardsPerPage = Math.max(1, cardsPerPage) - 1;
+    const baseHeight = logContainer.querySelector(".log-card")?.offsetHeight || 48;
 
-    const totalGapSpace = gap * (cardsPerPage);
-    const cardHeight = (availableHeight - totalGapSpace) / cardsPerPage;
+    return Math.max(1, Math.floor((availableHeight + gap) / (baseHeight + gap)) - 1);
+}
 
-    const totalPages = Math.ceil(cards.length / cardsPerPage);
+function detailRow(label, value) {
+    const div = document.createElement("div");
+    const labelSpan = document.createElement("span");
+    const valueSpan = document.createElement("span");
+    labelSpan.className = "label";
+    valueSpan.className = "value";
+    labelSpan.textContent = `${label}:`;
+    valueSpan.textContent = value ?? "";
+    div.append(labelSpan, " ", valueSpan);
+    return div;
+}
 
-    function showPage(page) {
-        cards.forEach(card => (card.style.display = "none"));
+function renderCard(row, hwCols) {
+    const card = cardTemplate.content.firstElementChild.cloneNode(true);
+    card.querySelector(".username").textContent = row.username;
+    card.querySelector(".login-time").textContent = `${row.login_date} ${row.login_time}`;
 
-        const start = page * cardsPerPage;
-        const end = start + cardsPerPage;
-        const currentCards = cards.slice(start, end);
+    const details = card.querySelector(".log-details");
+    DETAILS.forEach(([label, key]) => details.appendChild(detailRow(label, row[key])));
+    hwCols.forEach(hw => details.appendChild(detailRow(hw, row.hardware[hw] ?? 0)));
+    return card;
+}
 
-        currentCards.forEach(card => (card.style.display = "flex"));
+function renderPagination() {
+    pagination.innerHTML = "";
 
-        if (page === totalPages - 1) {
-            logContainer.classList.remove("space-between");
-            logContainer.classList.add("no-space");
-        } else {
-            logContainer.classList.remove("no-space");
-            logContainer.classList.add("space-between");
-        }
+    const newer = document.createElement("span");
+    newer.textContent = "Newer";
+    newer.classList.toggle("disabled", page === 0);
+    newer.addEventListener("click", () => page > 0 && loadPage(page - 1));
+
+    const current = document.createElement("span");
+    current.textContent = page + 1;
+    current.classList.add("active");
+
+    const older = document.createElement("span");
+    older.textContent = "Older";
+    older.classList.toggle("disabled", nextCursor === null);
+    older.addEventListener("click", () => {
+        if (nextCursor === null) return;
+        cursors[page + 1] = nextCursor;
+        loadPage(page + 1);
+    });
+
+    pagination.append(newer, current, older);
+}
 
-        logContainer.style.overflowY = "hidden";
+async function loadPage(target) {
+    const params = new URLSearchParams(new FormData(filters));
+    params.set("limit", cardsPerPage);
+    if (cursors[target]) params.set("cursor", cursors[target]);
 
-        pagination.querySelectorAll("span").forEach((btn, idx) => {
-            btn.classList.toggle("active", idx === page);
-        });
+    const response = await fetch(`/api/logs?${params}`);
+    if (!response.ok) {
+        console.error("Failed to load logs.");
+        return;
     }
+    const data = await response.json();
 
-    for (let i = 0; i < totalPages; i++) {
-        const span = document.createElement("span");
-        span.textContent = i + 1;
-        span.addEventListener("click", () => showPage(i));
-        pagination.appendChild(span);
+    page = target;
+    nextCursor = data.next_cursor;
+    hwCols = data.hw_cols;
+    logContainer.replaceChildren(...data.rows.map(row => renderCard(row, hwCols)));
+
+    const lastPage = nextCursor === null;
+    logContainer.classList.toggle("no-space", lastPage);
+    logContainer.classList.toggle("space-between", !lastPage);
+    logContainer.style.overflowY = "hidden";
+
+    renderPagination();
+}
+
+// Called for each login event from /events. Only the newest, unfiltered page changes: the card is
+// inserted at the top and the oldest card moves to the next page, without reloading or re-laying out the rest.
+function prependLogin(row) {
+    const filtered = Array.from(new FormData(filters).values()).some(value => value);
+    if (page !== 0 || filtered) return;
+
+    logContainer.prepend(renderCard(row, hwCols));
+    const cards = logContainer.querySelectorAll(".log-card");
+    if (cards.length > cardsPerPage) {
+        cards[cards.length - 1].remove();
+        if (nextCursor === null) {
+            // The removed card now starts a second page, reload once so "Older" gets a cursor.
+            reload();
+        }
     }
+}
 
-    showPage(0);
+function reload() {
+    cursors = [null];
+    loadPage(0);
 }
 
 document.addEventListener("click", e => {
@@ -68,9 +136,29 @@ document.addEventListener("click", e => {
     const isExpanded = card.classList.toggle("expanded");
 
     card.style.height = isExpanded ? "auto" : "";
-    const anyExpanded = cards.some(c => c.classList.contains("expanded"));
+    const anyExpanded = Array.from(logContainer.querySelectorAll(".log-card")).some(c => c.classList.contains("expanded"));
     logContainer.style.overflowY = anyExpanded ? "auto" : "hidden";
 });
 
-window.addEventListener("resize", setupPagination);
-window.addEventListener("load", setupPagination);
\ No newline at end of file
+filters.addEventListener("change", reload);
+filters.addEventListener("submit", e => {
+    e.preventDefault();
+    reload();
+});
+
+let resizeTimer = null;
+window.addEventListener("resize", () => {
+    clearTimeout(resizeTimer);
+    resizeTimer = setTimeout(() => {
+        const perPage = estimateCardsPerPage();
+        if (perPage !== cardsPerPage) {
+            cardsPerPage = perPage;
+            reload();
+        }
+    }, 200);
+});
+
+window.addEventListener("load", () => {
+    cardsPerPage = estimateCardsPerPage();
+    reload();
+});
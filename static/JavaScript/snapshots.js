@@ -0,0 +1,28 @@
+// Refreshes the dashboard camera tiles from /snapshot/<camera>.
+// cache: 'no-cache' revalidates with If-None-Match, so an unchanged still costs a 304 and no image data.
+export default function refreshSnapshots(images, interval = 5000) {
+    const refresh = () => {
+        if (document.hidden) {
+            return;
+        }
+        images.forEach(img => {
+            fetch(`/snapshot/${img.dataset.camera}`, { cache: 'no-cache' })
+            .then(response => response.ok ? response.blob() : null)
+            .then(blob => {
+                if (!blob) {
+                    return;
+                }
+                const previous = img.src;
+                img.src = URL.createObjectURL(blob);
+                if (previous.startsWith('blob:')) {
+                    URL.revokeObjectURL(previous);
+                }
+            })
+            .catch(error => console.error('Error:', error));
+        });
+    };
+
+    refresh();
+    setInterval(refresh, interval);
+    document.addEventListener('visibilitychange', refresh);
+}